@@ -9,8 +9,9 @@ from typing import Dict, List
 # Add backend to path
 sys.path.insert(0, os.path.dirname(__file__))
 
-from backend.graph.pipeline_graph import create_pipeline
-from backend.memory.vector_store import VectorStoreFAISS
+from backend.shared import get_pipeline, get_vector_store
+
+INDEX_PATH = "backend/memory/streamlit_faiss_index"
 
 # Page configuration
 st.set_page_config(
@@ -200,22 +201,20 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state
-if 'pipeline' not in st.session_state:
-    st.session_state.pipeline = None
-    st.session_state.vector_store = None
+# Initialize session state (per browser session; the index and pipelines are shared)
+if 'result' not in st.session_state:
     st.session_state.result = None
     st.session_state.processing = False
-    st.session_state.pipeline_initialized = False
 
-def initialize_pipeline():
-    """Initialize the research pipeline (called automatically on first research)"""
-    if st.session_state.pipeline is None:
-        st.session_state.vector_store = VectorStoreFAISS(
-            index_path="backend/memory/streamlit_faiss_index"
-        )
-        st.session_state.pipeline = create_pipeline(st.session_state.vector_store)
-        st.session_state.pipeline_initialized = True
+def initialize_pipeline(max_workers: int = 1):
+    """
+    Attach to the shared vector store and compiled pipeline.
+    
+    Every session of this process uses the same loaded index and one
+    compiled graph per worker count (see backend/shared.py).
+    """
+    vector_store = get_vector_store(INDEX_PATH)
+    return vector_store, get_pipeline(vector_store, max_workers=max_workers)
 
 def run_research(query: str):
     """Run the research pipeline"""
@@ -226,32 +225,49 @@ def run_research(query: str):
     status_text = st.empty()
     
     try:
-        # Auto-initialize pipeline on first run
-        if st.session_state.pipeline is None:
-            status_text.text("🔧 Initializing pipeline (first time only)...")
-            progress_bar.progress(5)
-            initialize_pipeline()
+        # Attach to the shared pipeline (built once per process and worker count)
+        status_text.text("🔧 Initializing pipeline...")
+        progress_bar.progress(5)
+        vector_store, pipeline = initialize_pipeline(st.session_state.get("max_workers", 1))
         
-        # Stage 1: Execute pipeline
+        # Execute pipeline, advancing the progress bar as each node finishes
         status_text.text("🔍 Searching papers...")
-        progress_bar.progress(20)
+        progress_bar.progress(10)
         
-        result = st.session_state.pipeline.invoke({
+        node_status = {
+            "recall": "🧠 Checked memory",
+            "search": "🔍 Papers found",
+            "extract": "📊 Information extracted",
+            "analyze": "🔬 Analyses complete",
+            "fuse": "🔬 Papers extracted and analyzed",
+            "process": "🔬 Papers extracted, analyzed and stored",
+            "memory": "💾 Stored in memory",
+            "report": "📝 Report written",
+        }
+        completed = 0
+        result = {}
+        for mode, chunk in pipeline.stream({
             "query": query,
             "papers": [],
             "extractions": [],
             "analyses": [],
             "final_report": ""
-        })
+        }, stream_mode=["updates", "values"]):
+            if mode == "values":
+                result = chunk
+                continue
+            for node in chunk:
+                completed += 1
+                progress_bar.progress(min(10 + completed * 18, 95))
+                status_text.text(f"{node_status.get(node, node)}...")
         
         progress_bar.progress(100)
         status_text.text("✅ Research complete!")
         
         st.session_state.result = result
         
-        # Save vector store
-        if st.session_state.vector_store:
-            st.session_state.vector_store.save_index()
+        # Save vector store (saves from concurrent sessions are serialized)
+        vector_store.save_index()
         
     except Exception as e:
         st.error(f"❌ Error during research: {str(e)}")
@@ -323,6 +339,19 @@ def main():
         
         st.markdown("---")
         
+        # Pipeline settings
+        st.markdown("### ⚙️ Pipeline")
+        st.slider(
+            "Parallel workers",
+            min_value=1,
+            max_value=10,
+            value=4,
+            key="max_workers",
+            help="Number of papers extracted and analyzed concurrently"
+        )
+        
+        st.markdown("---")
+        
         # About
         with st.expander("ℹ️ About"):
             st.markdown("""
@@ -435,6 +464,24 @@ def main():
                 report_words = len(result.get("final_report", "").split())
                 st.metric("Report Words", report_words)
             
+            # Run timings and cost
+            run_report = result.get("run_report")
+            if run_report:
+                st.markdown("#### ⏱️ Run Timings")
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.metric("Wall Time", f"{run_report['wall_time_s']:.1f}s")
+                with col2:
+                    st.metric("Estimated Cost", f"${run_report['total_cost_usd']:.4f}")
+                for node, seconds in run_report["nodes"].items():
+                    st.write(f"- **{node}**: {seconds:.2f}s")
+                for call in run_report["calls"]:
+                    st.write(
+                        f"- {call['kind']} `{call['name']}`: {call['calls']} calls "
+                        f"({call['cache_hits']} cached), {call['duration_s']:.2f}s, "
+                        f"{call['input_tokens'] + call['output_tokens']} tokens"
+                    )
+            
             # Paper categories
             if result.get("papers"):
                 st.markdown("#### 📊 Paper Categories")
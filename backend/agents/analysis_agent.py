@@ -1,22 +1,25 @@
 from backend.llm_client import ask_mini
+from backend.agents.parallel import run_parallel
 
 class AnalysisAgentNode:
     """Analysis agent node - performs deep analysis of extracted information"""
     
-    def __init__(self):
-        pass
+    def __init__(self, max_workers=1):
+        """
+        Args:
+            max_workers: number of papers processed concurrently (1 = sequential)
+        """
+        self.max_workers = max_workers
     
-    def run(self, extractions):
+    def analyze_one(self, item):
         """
-        Analyze extracted information from papers
+        Analyze the extracted information of a single paper
         Args:
-            extractions: list of extracted paper information
+            item: extracted paper information
         Returns:
-            list of papers with analysis
+            paper with analysis
         """
-        analyses = []
-        for item in extractions:
-            prompt = f"""
+        prompt = f"""
 Perform a critical analysis of this research paper:
 
 Title: {item['title']}
@@ -34,14 +37,25 @@ Provide:
 
 Be analytical and constructive.
 """
-            analysis = ask_mini(prompt)
-            analyses.append({
-                'paper_id': item['paper_id'],
-                'title': item['title'],
-                'authors': item['authors'],
-                'extraction': item['extraction'],
-                'analysis': analysis,
-                'pdf_url': item['pdf_url'],
-                'published': item['published']
-            })
-        return analyses
+        analysis = ask_mini(prompt)
+        return {
+            'paper_id': item['paper_id'],
+            'title': item['title'],
+            'authors': item['authors'],
+            'extraction': item['extraction'],
+            'analysis': analysis,
+            'pdf_url': item['pdf_url'],
+            'published': item['published'],
+            'categories': item.get('categories', [])
+        }
+    
+    def run(self, extractions):
+        """
+        Analyze extracted information from papers
+        Args:
+            extractions: list of extracted paper information
+        Returns:
+            list of papers with analysis (input order, failed papers dropped)
+        """
+        results = run_parallel(self.analyze_one, extractions, self.max_workers, label="ANALYSIS")
+        return [item for item in results if item is not None]
@@ -1,28 +1,37 @@
 from backend.llm_client import ask_mini
+from backend.agents.parallel import run_parallel
+
+def passages_section(paper):
+    """Full-text passages retrieved for a paper (see ChunkStore), formatted for a prompt"""
+    if not paper.get('passages'):
+        return ""
+    return f"\nRelevant full-text passages:\n{paper['passages']}\n"
 
 class ExtractionAgentNode:
     """Extraction agent node - extracts key information from papers"""
     
-    def __init__(self):
-        pass
+    def __init__(self, max_workers=1):
+        """
+        Args:
+            max_workers: number of papers processed concurrently (1 = sequential)
+        """
+        self.max_workers = max_workers
     
-    def run(self, papers):
+    def extract_one(self, paper):
         """
-        Extract key information from each paper
+        Extract key information from a single paper
         Args:
-            papers: list of paper dictionaries
+            paper: paper dictionary
         Returns:
-            list of papers with extracted information
+            paper with extracted information
         """
-        extracted = []
-        for paper in papers:
-            prompt = f"""
+        prompt = f"""
 Extract the key information from this research paper:
 
 Title: {paper['title']}
 Authors: {', '.join(paper['authors'])}
 Summary: {paper['summary']}
-
+{passages_section(paper)}
 Provide:
 1. Main research question
 2. Methodology
@@ -31,13 +40,24 @@ Provide:
 
 Be concise and structured.
 """
-            extraction = ask_mini(prompt)
-            extracted.append({
-                'paper_id': paper['entry_id'],
-                'title': paper['title'],
-                'authors': paper['authors'],
-                'extraction': extraction,
-                'pdf_url': paper['pdf_url'],
-                'published': paper['published']
-            })
-        return extracted
+        extraction = ask_mini(prompt)
+        return {
+            'paper_id': paper['entry_id'],
+            'title': paper['title'],
+            'authors': paper['authors'],
+            'extraction': extraction,
+            'pdf_url': paper['pdf_url'],
+            'published': paper['published'],
+            'categories': paper.get('categories', [])
+        }
+    
+    def run(self, papers):
+        """
+        Extract key information from each paper
+        Args:
+            papers: list of paper dictionaries
+        Returns:
+            list of papers with extracted information (input order, failed papers dropped)
+        """
+        results = run_parallel(self.extract_one, papers, self.max_workers, label="EXTRACTION")
+        return [item for item in results if item is not None]
@@ -0,0 +1,117 @@
+import json
+from typing import List
+from pydantic import BaseModel, ValidationError
+from backend.llm_client import ask_mini
+from backend.agents.parallel import run_parallel
+from backend.agents.extraction_agent import ExtractionAgentNode, passages_section
+from backend.agents.analysis_agent import AnalysisAgentNode
+
+class PaperInsights(BaseModel):
+    """Structured extraction and analysis of a paper"""
+    research_question: str
+    methodology: str
+    key_findings: List[str]
+    contributions: List[str]
+    strengths: List[str]
+    limitations: List[str]
+    significance: str
+    relation_to_field: str
+    future_directions: List[str]
+
+def _bullets(items):
+    return "\n".join(f"- {item}" for item in items)
+
+class FusedAgentNode:
+    """Fused agent node - extracts and analyzes a paper in a single LLM call"""
+
+    def __init__(self, max_workers=1):
+        """
+        Args:
+            max_workers: number of papers processed concurrently (1 = sequential)
+        """
+        self.max_workers = max_workers
+        self.extractor = ExtractionAgentNode()
+        self.analyzer = AnalysisAgentNode()
+
+    @staticmethod
+    def parse(response):
+        """
+        Parse and validate the JSON response of the fused prompt
+        Args:
+            response: raw LLM response
+        Returns:
+            PaperInsights
+        Raises:
+            ValueError: if the response is not valid JSON matching the schema
+        """
+        text = response.strip()
+        if text.startswith("```"):
+            text = text.split("\n", 1)[1] if "\n" in text else ""
+            text = text.rsplit("```", 1)[0]
+        try:
+            return PaperInsights.model_validate(json.loads(text))
+        except (json.JSONDecodeError, ValidationError) as e:
+            raise ValueError(f"Invalid structured response: {e}") from e
+
+    def process_one(self, paper):
+        """
+        Extract and analyze a single paper, falling back to the two-call path
+        when the structured response cannot be parsed
+        Args:
+            paper: paper dictionary
+        Returns:
+            paper with extraction, analysis and structured fields
+        """
+        prompt = f"""
+Extract the key information from this research paper and critically analyze it:
+
+Title: {paper['title']}
+Authors: {', '.join(paper['authors'])}
+Summary: {paper['summary']}
+{passages_section(paper)}
+Respond with a single JSON object (no markdown) matching this JSON schema:
+{json.dumps(PaperInsights.model_json_schema())}
+
+Be concise, analytical and constructive.
+"""
+        try:
+            insights = self.parse(ask_mini(prompt))
+        except ValueError as e:
+            print(f"[FUSED] Falling back to two calls for '{paper['title']}': {e}")
+            return self.analyzer.analyze_one(self.extractor.extract_one(paper))
+
+        extraction = (
+            f"1. Main research question: {insights.research_question}\n"
+            f"2. Methodology: {insights.methodology}\n"
+            f"3. Key findings:\n{_bullets(insights.key_findings)}\n"
+            f"4. Contributions:\n{_bullets(insights.contributions)}"
+        )
+        analysis = (
+            f"1. Strengths:\n{_bullets(insights.strengths)}\n"
+            f"2. Limitations and weaknesses:\n{_bullets(insights.limitations)}\n"
+            f"3. Significance and impact: {insights.significance}\n"
+            f"4. Relation to the broader field: {insights.relation_to_field}\n"
+            f"5. Future research directions:\n{_bullets(insights.future_directions)}"
+        )
+        return {
+            'paper_id': paper['entry_id'],
+            'title': paper['title'],
+            'authors': paper['authors'],
+            'extraction': extraction,
+            'analysis': analysis,
+            'structured': insights.model_dump(),
+            'pdf_url': paper['pdf_url'],
+            'published': paper['published'],
+            'categories': paper.get('categories', [])
+        }
+
+    def run(self, papers):
+        """
+        Extract and analyze each paper
+        Args:
+            papers: list of paper dictionaries
+        Returns:
+            list of papers with analysis (input order, failed papers dropped)
+        """
+        results = run_parallel(self.process_one, papers, self.max_workers, label="FUSED")
+        return [item for item in results if item is not None]
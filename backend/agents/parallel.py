@@ -0,0 +1,36 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+
+def run_parallel(func: Callable, items: List, max_workers: int = 1, label: str = "AGENT") -> List[Optional[object]]:
+    """
+    Apply func to every item with bounded concurrency.
+
+    Results are returned in input order. An item whose call raises is
+    logged and yields None, so one bad paper never fails the whole batch.
+    Each call runs in a copy of the caller's context, so context variables
+    (e.g. the active instrumentation recorder) reach the worker threads.
+
+    Args:
+        func: Callable applied to each item
+        items: Items to process
+        max_workers: Maximum number of concurrent calls (1 = sequential)
+        label: Prefix used when logging failures
+
+    Returns:
+        List of results (None for failed items), same order as items
+    """
+    def safe_call(item):
+        try:
+            return func(item)
+        except Exception as e:
+            print(f"[{label}] Failed to process item: {e}")
+            return None
+
+    if max_workers <= 1 or len(items) <= 1:
+        return [safe_call(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, safe_call, item) for item in items]
+        return [future.result() for future in futures]
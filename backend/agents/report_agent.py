@@ -0,0 +1,138 @@
+from backend.llm_client import ask_mini, ask_standard, stream_standard
+from backend.agents.parallel import run_parallel
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token for English text)"""
+    return len(text) // 4 + 1
+
+class ReportAgentNode:
+    """Report agent node - synthesizes analyses into a literature review"""
+
+    def __init__(self, max_workers=1, token_budget=12000, group_token_budget=6000):
+        """
+        Args:
+            max_workers: number of groups summarized concurrently
+            token_budget: largest input sent to the final GPT-4o call; bigger
+                inputs are condensed with map-reduce first
+            group_token_budget: input size of each map (GPT-4o-mini) call
+        """
+        self.max_workers = max_workers
+        self.token_budget = token_budget
+        self.group_token_budget = group_token_budget
+
+    def group(self, texts):
+        """
+        Pack texts into consecutive groups that fit the group token budget
+        Args:
+            texts: list of strings
+        Returns:
+            list of groups (lists of strings)
+        """
+        max_chars = self.group_token_budget * 4
+        groups = []
+        current = []
+        current_tokens = 0
+        for text in texts:
+            # A single oversized text is truncated to fit a group on its own
+            text = text[:max_chars]
+            tokens = estimate_tokens(text)
+            if current and current_tokens + tokens > self.group_token_budget:
+                groups.append(current)
+                current = []
+                current_tokens = 0
+            current.append(text)
+            current_tokens += tokens
+        if current:
+            groups.append(current)
+        return groups
+
+    def summarize_group(self, texts):
+        """
+        Map step: condense a group of analyses (or partial summaries)
+        Args:
+            texts: list of strings
+        Returns:
+            partial summary
+        """
+        combined = "\n\n---\n\n".join(texts)
+        prompt = f"""
+Summarize the following research paper analyses for a literature review.
+
+{combined}
+
+Keep every paper title, the main findings, methods, strengths and limitations,
+and note agreements or contradictions between papers. Be dense and factual.
+"""
+        return ask_mini(prompt)
+
+    def reduce(self, texts):
+        """
+        Condense texts with parallel map rounds until they fit the token budget
+        Args:
+            texts: list of strings
+        Returns:
+            list of strings fitting the token budget
+        """
+        total = sum(estimate_tokens(text) for text in texts)
+        while total > self.token_budget:
+            groups = self.group(texts)
+            print(f"[REPORT] Summarizing {len(texts)} texts in {len(groups)} groups")
+            summaries = run_parallel(self.summarize_group, groups, self.max_workers, label="REPORT")
+            summaries = [summary for summary in summaries if summary]
+            summary_total = sum(estimate_tokens(summary) for summary in summaries)
+            # Stop if a round fails or no longer shrinks the input
+            if not summaries or summary_total >= total:
+                break
+            texts, total = summaries, summary_total
+        if total > self.token_budget:
+            texts = self.truncate(texts)
+        return texts
+
+    def truncate(self, texts):
+        """
+        Cut the longest texts to a common length so that all of them fit the token budget
+        Args:
+            texts: list of strings
+        Returns:
+            list of strings fitting the token budget (texts cut to nothing are dropped)
+        """
+        # Every text costs at least one token, so more texts than that can never fit
+        texts = texts[:self.token_budget]
+
+        def tokens(length):
+            return sum(estimate_tokens(text[:length]) for text in texts)
+
+        # Longest common length that fits (binary search; short texts stay whole)
+        low, high = 0, max(len(text) for text in texts)
+        while low < high:
+            length = (low + high + 1) // 2
+            if tokens(length) <= self.token_budget:
+                low = length
+            else:
+                high = length - 1
+        print(f"[REPORT] Truncating texts to {low} characters to fit {self.token_budget} tokens")
+        return [text[:low] for text in texts if text[:low]]
+
+    def run(self, analyses, on_token=None):
+        """
+        Generate the final literature review
+        Args:
+            analyses: list of paper analyses
+            on_token: optional callback receiving report tokens as they stream
+        Returns:
+            final report
+        """
+        texts = [a['analysis'] for a in analyses]
+        if sum(estimate_tokens(text) for text in texts) > self.token_budget:
+            texts = self.reduce([f"Title: {a['title']}\n{a['analysis']}" for a in analyses])
+
+        combined = "\n\n".join(texts)
+        prompt = f"Produce a final literature review:\n{combined}"
+        if on_token is None:
+            return ask_standard(prompt)
+
+        tokens = []
+        for token in stream_standard(prompt):
+            tokens.append(token)
+            on_token(token)
+        return "".join(tokens)
@@ -3,16 +3,27 @@ from backend.tools.search_api import search_papers
 class SearchAgentNode:
     """Search agent node for the pipeline - searches arXiv for papers"""
     
-    def __init__(self):
-        pass
+    def __init__(self, max_results=10):
+        """
+        Args:
+            max_results: number of papers to return
+        """
+        self.max_results = max_results
     
-    def run(self, query):
+    def run(self, query, max_results=None, exclude_ids=None):
         """
         Search for papers on arXiv
         Args:
             query: str - search query
+            max_results: int - overrides the configured number of papers
+            exclude_ids: entry_ids of papers that must not be returned
         Returns:
             list of paper dictionaries
         """
-        results = search_papers(query, max_results=10)
-        return results
+        max_results = self.max_results if max_results is None else max_results
+        exclude_ids = set(exclude_ids or [])
+        if max_results <= 0:
+            return []
+        # Fetch extra results so excluded papers can be replaced
+        results = search_papers(query, max_results=max_results + len(exclude_ids))
+        return [paper for paper in results if paper['entry_id'] not in exclude_ids][:max_results]
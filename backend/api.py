@@ -0,0 +1,215 @@
+"""
+AI Research Assistant - HTTP service
+
+Accepts research jobs over HTTP and runs them on a bounded worker pool that
+shares one vector store and one set of LLM clients.
+
+Run with:
+    uvicorn backend.api:app --host 0.0.0.0 --port 8000
+"""
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from fastapi import FastAPI, HTTPException, Query
+from pydantic import BaseModel, Field
+from backend.memory.vector_store import VectorStoreFAISS
+from backend.shared import get_pipeline, get_vector_store
+
+INDEX_PATH = os.getenv("RESEARCH_INDEX_PATH", "backend/memory/faiss_index")
+MAX_JOBS = int(os.getenv("RESEARCH_MAX_JOBS", "4"))
+PAPER_WORKERS = int(os.getenv("RESEARCH_PAPER_WORKERS", "4"))
+KEEP_FINISHED_JOBS = int(os.getenv("RESEARCH_KEEP_FINISHED_JOBS", "100"))
+FINISHED_JOB_TTL = float(os.getenv("RESEARCH_FINISHED_JOB_TTL", "3600"))
+
+class JobRequest(BaseModel):
+    """Research job submitted by a client"""
+    query: str = Field(..., min_length=1)
+    max_results: int = Field(10, ge=1, le=200)
+    streaming: bool = False
+    fused: bool = False
+    reuse_threshold: Optional[float] = Field(None, ge=-1.0, le=1.0)
+
+class Job(BaseModel):
+    """State of a research job"""
+    job_id: str
+    status: str
+    request: JobRequest
+    submitted_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    result: Optional[Dict] = None
+
+class ResearchService:
+    """Bounded job queue running research pipelines over a shared vector store"""
+
+    def __init__(self, vector_store: VectorStoreFAISS, max_jobs: int = 4, paper_workers: int = 4,
+                 keep_finished: int = 100, finished_ttl: float = 3600):
+        """
+        Args:
+            vector_store: Vector store shared by every job
+            max_jobs: Number of jobs running concurrently (others wait queued)
+            paper_workers: Papers processed concurrently within a job
+            keep_finished: Most finished jobs (and their results) kept for polling
+            finished_ttl: Seconds a finished job is kept after it ended
+        """
+        self.vector_store = vector_store
+        self.paper_workers = paper_workers
+        self.keep_finished = keep_finished
+        self.finished_ttl = finished_ttl
+        self.executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="research-job")
+        self.jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def _pipeline(self, request: JobRequest):
+        """
+        Get the shared compiled pipeline for a job's graph shape.
+
+        Only the options that change the graph select a pipeline, so at most
+        eight are ever compiled; max_results and reuse_threshold are passed
+        in each job's initial state instead.
+        """
+        return get_pipeline(
+            self.vector_store,
+            max_workers=self.paper_workers,
+            streaming=request.streaming,
+            fused=request.fused,
+            # Adds the recall node; the job's own threshold comes with its state
+            reuse_threshold=None if request.reuse_threshold is None else 0.0
+        )
+
+    def submit(self, request: JobRequest) -> Job:
+        """Queue a research job"""
+        job = Job(job_id=uuid.uuid4().hex, status="queued", request=request, submitted_at=time.time())
+        with self._lock:
+            self._evict_finished()
+            self.jobs[job.job_id] = job
+        self.executor.submit(self._run, job)
+        return job
+
+    def _evict_finished(self) -> None:
+        """Forget finished jobs past finished_ttl or beyond the newest keep_finished (lock held)"""
+        finished = sorted((job for job in self.jobs.values() if job.finished_at is not None),
+                          key=lambda job: job.finished_at, reverse=True)
+        expired = time.time() - self.finished_ttl
+        for rank, job in enumerate(finished):
+            if rank >= self.keep_finished or job.finished_at < expired:
+                del self.jobs[job.job_id]
+
+    def _run(self, job: Job) -> None:
+        """Execute a job on a worker thread"""
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            result = self._pipeline(job.request).invoke({
+                "query": job.request.query,
+                "papers": [],
+                "extractions": [],
+                "analyses": [],
+                "final_report": "",
+                "max_results": job.request.max_results,
+                **({"reuse_threshold": job.request.reuse_threshold}
+                   if job.request.reuse_threshold is not None else {})
+            })
+            self.vector_store.save_index()
+            job.result = dict(result)
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._evict_finished()
+            return self.jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            self._evict_finished()
+            return list(self.jobs.values())
+
+    def shutdown(self) -> None:
+        """Wait for running jobs and persist the index"""
+        self.executor.shutdown(wait=True)
+        self.vector_store.save_index()
+
+service: Optional[ResearchService] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global service
+    service = ResearchService(
+        get_vector_store(INDEX_PATH),
+        max_jobs=MAX_JOBS,
+        paper_workers=PAPER_WORKERS,
+        keep_finished=KEEP_FINISHED_JOBS,
+        finished_ttl=FINISHED_JOB_TTL
+    )
+    yield
+    service.shutdown()
+
+app = FastAPI(title="AI Research Assistant", lifespan=lifespan)
+
+def _summary(job: Job) -> Dict:
+    """Job fields without the (potentially large) result"""
+    return job.model_dump(exclude={"result"})
+
+@app.get("/health")
+def health():
+    return {"status": "ok", "jobs": len(service.jobs)}
+
+@app.post("/jobs", status_code=202)
+def submit_job(request: JobRequest):
+    """Submit a research job; poll GET /jobs/{job_id} for its result"""
+    return _summary(service.submit(request))
+
+@app.get("/jobs")
+def list_jobs():
+    return [_summary(job) for job in service.list()]
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = service.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.model_dump()
+
+@app.get("/search")
+def search(q: str = Query(..., min_length=1), k: int = Query(5, ge=1, le=100),
+           mode: str = Query("vector", pattern="^(vector|keyword|hybrid)$"),
+           lexical_weight: float = Query(0.5, ge=0.0, le=1.0),
+           category: Optional[List[str]] = Query(None), author: Optional[List[str]] = Query(None),
+           year_from: Optional[int] = None, year_to: Optional[int] = None):
+    """
+    Search over the stored papers and analyses (semantic, BM25 keyword or hybrid).
+    
+    Semantic search can be restricted by category, author and publication year.
+    """
+    vector_store = service.vector_store
+    filters = {key: value for key, value in (("category", category), ("author", author),
+                                             ("year_from", year_from), ("year_to", year_to))
+               if value is not None}
+    if filters and mode != "vector":
+        raise HTTPException(status_code=400, detail="Filters are only supported with mode=vector")
+    if mode == "hybrid":
+        results = vector_store.hybrid_search(q, k=k, lexical_weight=lexical_weight)
+    elif mode == "keyword":
+        results = vector_store.lexical_search(q, k=k)
+    else:
+        results = vector_store.similarity_search_with_score(q, k=k, filters=filters)
+    return [{"metadata": metadata, "score": float(score)} for metadata, score in results]
+
+@app.get("/search/analyses")
+def search_analyses(q: str = Query(..., min_length=1), k: int = Query(5, ge=1, le=100),
+                    min_similarity: float = Query(0.0, ge=-1.0, le=1.0)):
+    """Stored paper analyses relevant to a query"""
+    return service.vector_store.recall_analyses(q, k=k, min_similarity=min_similarity)
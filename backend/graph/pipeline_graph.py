@@ -1,10 +1,15 @@
-from typing import TypedDict, List, Dict, Annotated
+from typing import TypedDict, List, Dict, Annotated, AsyncIterator, Iterator, Optional
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, END
 from backend.agents.search_agent import SearchAgentNode
 from backend.agents.extraction_agent import ExtractionAgentNode
 from backend.agents.analysis_agent import AnalysisAgentNode
+from backend.agents.report_agent import ReportAgentNode
+from backend.agents.fused_agent import FusedAgentNode
+from backend.graph.stage_runner import Stage, StageRunner
 from backend.memory.vector_store import VectorStoreFAISS
-from backend.llm_client import ask_standard
+from backend.memory.chunk_index import ChunkStore
+from backend.instrumentation import instrument_node
 
 # Define the state that flows through the pipeline
 class PipelineState(TypedDict):
@@ -14,44 +19,166 @@ class PipelineState(TypedDict):
     extractions: List[Dict]
     analyses: List[Dict]
     final_report: str
+    recalled: List[Dict]
+    run_id: str
+    run_report: Dict
+    # Optional per-run overrides of create_pipeline's max_results and reuse_threshold
+    max_results: int
+    reuse_threshold: float
 
-def search_node(state: PipelineState) -> PipelineState:
-    """Search for papers on arXiv"""
-    agent = SearchAgentNode()
-    papers = agent.run(state["query"])
+def recall_node(state: PipelineState, vector_store: VectorStoreFAISS, max_results: int = 10,
+                min_similarity: float = 0.5) -> PipelineState:
+    """Reuse stored analyses that are similar enough to the query"""
+    max_results = state.get("max_results") or max_results
+    if state.get("reuse_threshold") is not None:
+        min_similarity = state["reuse_threshold"]
+    recalled = vector_store.recall_analyses(state["query"], k=max_results, min_similarity=min_similarity)
+    for item in recalled:
+        item['source'] = 'memory'
+    print(f"[MEMORY] Reusing {len(recalled)} stored analyses")
+    return {"recalled": recalled, "analyses": recalled}
+
+def search_node(state: PipelineState, max_results: int = 10) -> PipelineState:
+    """Search arXiv for the papers not already recalled from memory"""
+    recalled = state.get("recalled") or []
+    max_results = state.get("max_results") or max_results
+    agent = SearchAgentNode(max_results=max_results)
+    papers = agent.run(
+        state["query"],
+        max_results=max_results - len(recalled),
+        exclude_ids=[item['paper_id'] for item in recalled]
+    )
     return {"papers": papers}
 
-def extraction_node(state: PipelineState) -> PipelineState:
+def ingest_node(state: PipelineState, chunk_store: ChunkStore, token_budget: int = 1500) -> PipelineState:
+    """Index the papers' full text and attach the passages relevant to extraction"""
+    papers = state["papers"]
+    # Full text is an optional addition: on failure extraction works from the abstracts
+    try:
+        chunk_store.ingest(papers)
+    except Exception as e:
+        # Papers indexed before the failure still get their passages
+        print(f"[CHUNKS] Full-text ingestion failed: {e}")
+    with_passages = []
+    for paper in papers:
+        try:
+            passages = chunk_store.passages(paper, token_budget)
+        except Exception as e:
+            print(f"[CHUNKS] No passages for '{paper.get('title', chunk_store.paper_key(paper))}': {e}")
+            passages = None
+        with_passages.append({**paper, "passages": passages} if passages else paper)
+    return {"papers": with_passages}
+
+def extraction_node(state: PipelineState, max_workers: int = 1) -> PipelineState:
     """Extract key information from papers"""
-    agent = ExtractionAgentNode()
+    agent = ExtractionAgentNode(max_workers=max_workers)
     extractions = agent.run(state["papers"])
     return {"extractions": extractions}
 
-def analysis_node(state: PipelineState) -> PipelineState:
+def analysis_node(state: PipelineState, max_workers: int = 1) -> PipelineState:
     """Perform critical analysis of papers"""
-    agent = AnalysisAgentNode()
+    agent = AnalysisAgentNode(max_workers=max_workers)
     analyses = agent.run(state["extractions"])
-    return {"analyses": analyses}
+    return {"analyses": (state.get("recalled") or []) + analyses}
+
+def fused_node(state: PipelineState, max_workers: int = 1) -> PipelineState:
+    """Extract and analyze each paper with a single structured LLM call"""
+    agent = FusedAgentNode(max_workers=max_workers)
+    analyses = agent.run(state["papers"])
+    extractions = [{key: value for key, value in item.items() if key != 'analysis'}
+                   for item in analyses]
+    return {"extractions": extractions, "analyses": (state.get("recalled") or []) + analyses}
+
+def store_analyses(vector_store: VectorStoreFAISS, analyses: List[Dict]) -> None:
+    """Upsert new analyses with the metadata needed to reuse them later"""
+    analyses = [item for item in analyses if item.get('source') != 'memory']
+    vector_store.upsert(
+        [item['analysis'] for item in analyses],
+        [item['paper_id'] for item in analyses],
+        [{
+            'title': item['title'],
+            'authors': item['authors'],
+            'extraction': item['extraction'],
+            'pdf_url': item['pdf_url'],
+            'published': item['published'],
+            'categories': item.get('categories', []),
+            **({'structured': item['structured']} if item.get('structured') else {})
+        } for item in analyses]
+    )
 
 def memory_node(state: PipelineState, vector_store: VectorStoreFAISS) -> PipelineState:
-    """Store analyses in vector database"""
-    for item in state["analyses"]:
-        text = item['analysis']
-        vector_store.add([text], [item['paper_id']])
+    """Store analyses in vector database (re-runs replace earlier entries)"""
+    store_analyses(vector_store, state["analyses"])
     return {}
 
-def report_node(state: PipelineState) -> PipelineState:
-    """Generate final literature review"""
-    combined = "\n\n".join([a['analysis'] for a in state["analyses"]])
-    final_report = ask_standard(f"Produce a final literature review:\n{combined}")
-    return {"final_report": final_report}
+def streaming_node(state: PipelineState, vector_store: VectorStoreFAISS, max_workers: int = 1,
+                   fused: bool = False) -> PipelineState:
+    """Stream each paper through extraction, analysis and memory independently"""
+    def store(item):
+        store_analyses(vector_store, [item])
+        return item
+    
+    if fused:
+        stages = [Stage("fused", FusedAgentNode().process_one, workers=max_workers)]
+    else:
+        stages = [
+            Stage("extraction", ExtractionAgentNode().extract_one, workers=max_workers),
+            Stage("analysis", AnalysisAgentNode().analyze_one, workers=max_workers)
+        ]
+    # A single writer keeps FAISS inserts serialized
+    runner = StageRunner(stages + [Stage("memory", store, workers=1)])
+    analyses = [item for _, item in sorted(runner.run(state["papers"]), key=lambda entry: entry[0])]
+    extractions = [{key: value for key, value in item.items() if key != 'analysis'}
+                   for item in analyses]
+    return {"extractions": extractions, "analyses": (state.get("recalled") or []) + analyses}
+
+def report_node(state: PipelineState, stream: bool = False, max_workers: int = 1,
+                token_budget: int = 12000) -> PipelineState:
+    """Generate final literature review (optionally emitting tokens as they arrive)"""
+    agent = ReportAgentNode(max_workers=max_workers, token_budget=token_budget)
+    on_token = None
+    if stream:
+        writer = get_stream_writer()
+        on_token = lambda token: writer({"report_token": token})
+    return {"final_report": agent.run(state["analyses"], on_token=on_token)}
 
-def create_pipeline(vector_store: VectorStoreFAISS):
+def create_pipeline(vector_store: VectorStoreFAISS, max_workers: int = 1, streaming: bool = False,
+                    stream_report: bool = False, max_results: int = 10,
+                    reuse_threshold: Optional[float] = None, report_token_budget: int = 12000,
+                    fused: bool = False, instrument: bool = True, chunk_store: Optional[ChunkStore] = None,
+                    passage_token_budget: int = 1500):
     """
     Create a LangGraph pipeline for research workflow.
     
     Args:
         vector_store: FAISS vector store instance
+        max_workers: Papers processed concurrently by the extraction and
+            analysis stages (1 = sequential)
+        streaming: If True, every paper flows through extraction, analysis
+            and memory on its own and only the report waits for all papers
+        stream_report: If True, the report node emits its tokens on the
+            "custom" stream mode (see iter_report_tokens)
+        max_results: Number of papers covered by the report (a run's
+            "max_results" state key overrides it)
+        reuse_threshold: If set, stored analyses whose cosine similarity to
+            the query reaches this value are reused and only the shortfall
+            goes through search/extract/analyze (a run's "reuse_threshold"
+            state key overrides the value, not whether recall happens)
+        report_token_budget: Largest input (in estimated tokens) sent to the
+            final report call; larger paper sets are condensed map-reduce
+            style with parallel GPT-4o-mini summaries first
+        fused: If True, extraction and analysis of a paper are done in one
+            JSON-schema validated call (falling back to two calls when the
+            response cannot be parsed); structured fields are kept under
+            each analysis' "structured" key
+        instrument: If True, every node and the LLM, embedding and arXiv
+            calls it makes are timed and costed; the run report is returned
+            under the "run_report" key of the result
+        chunk_store: If set, the papers' full texts are ingested into this
+            chunk index after search and extraction sees the passages most
+            relevant to methodology, findings and contributions
+        passage_token_budget: Largest amount of full-text passages (in
+            estimated tokens) added to each paper's extraction prompt
         
     Returns:
         Compiled LangGraph workflow
@@ -59,20 +186,92 @@ def create_pipeline(vector_store: VectorStoreFAISS):
     # Create the graph
     workflow = StateGraph(PipelineState)
     
+    def add_node(name, func):
+        if instrument:
+            func = instrument_node(name, func, final=(name == "report"))
+        workflow.add_node(name, func)
+    
     # Add nodes
-    workflow.add_node("search", search_node)
-    workflow.add_node("extract", extraction_node)
-    workflow.add_node("analyze", analysis_node)
-    workflow.add_node("memory", lambda state: memory_node(state, vector_store))
-    workflow.add_node("report", report_node)
+    add_node("search", lambda state: search_node(state, max_results))
+    add_node("report", lambda state: report_node(state, stream_report, max_workers, report_token_budget))
+    
+    if reuse_threshold is None:
+        workflow.set_entry_point("search")
+    else:
+        add_node("recall", lambda state: recall_node(state, vector_store, max_results, reuse_threshold))
+        workflow.set_entry_point("recall")
+        # Skip the whole search/LLM chain when memory already covers the query
+        workflow.add_conditional_edges(
+            "recall",
+            lambda state: "report" if len(state["recalled"]) >= (state.get("max_results") or max_results)
+            else "search",
+            ["search", "report"]
+        )
+    
+    # Node the papers go to after search
+    papers_from = "search"
+    if chunk_store is not None:
+        add_node("ingest", lambda state: ingest_node(state, chunk_store, passage_token_budget))
+        workflow.add_edge("search", "ingest")
+        papers_from = "ingest"
     
-    # Define edges (pipeline flow)
-    workflow.set_entry_point("search")
-    workflow.add_edge("search", "extract")
-    workflow.add_edge("extract", "analyze")
-    workflow.add_edge("analyze", "memory")
-    workflow.add_edge("memory", "report")
+    if streaming:
+        add_node("process", lambda state: streaming_node(state, vector_store, max_workers, fused))
+        workflow.add_edge(papers_from, "process")
+        workflow.add_edge("process", "report")
+    elif fused:
+        add_node("fuse", lambda state: fused_node(state, max_workers))
+        add_node("memory", lambda state: memory_node(state, vector_store))
+        workflow.add_edge(papers_from, "fuse")
+        workflow.add_edge("fuse", "memory")
+        workflow.add_edge("memory", "report")
+    else:
+        add_node("extract", lambda state: extraction_node(state, max_workers))
+        add_node("analyze", lambda state: analysis_node(state, max_workers))
+        add_node("memory", lambda state: memory_node(state, vector_store))
+        
+        # Define edges (pipeline flow)
+        workflow.add_edge(papers_from, "extract")
+        workflow.add_edge("extract", "analyze")
+        workflow.add_edge("analyze", "memory")
+        workflow.add_edge("memory", "report")
     workflow.add_edge("report", END)
     
     # Compile the graph
     return workflow.compile()
+
+def iter_report_tokens(pipeline, initial_state: Dict, result: Optional[Dict] = None) -> Iterator[str]:
+    """
+    Run a pipeline built with stream_report=True and yield report tokens.
+    
+    Args:
+        pipeline: Compiled pipeline from create_pipeline
+        initial_state: Initial PipelineState
+        result: Optional dict updated with the final state once the run ends
+        
+    Yields:
+        Final report tokens as they are generated
+    """
+    for mode, chunk in pipeline.stream(initial_state, stream_mode=["custom", "values"]):
+        if mode == "custom" and "report_token" in chunk:
+            yield chunk["report_token"]
+        elif mode == "values" and result is not None:
+            result.update(chunk)
+
+async def aiter_report_tokens(pipeline, initial_state: Dict, result: Optional[Dict] = None) -> AsyncIterator[str]:
+    """
+    Async variant of iter_report_tokens.
+    
+    Args:
+        pipeline: Compiled pipeline from create_pipeline
+        initial_state: Initial PipelineState
+        result: Optional dict updated with the final state once the run ends
+        
+    Yields:
+        Final report tokens as they are generated
+    """
+    async for mode, chunk in pipeline.astream(initial_state, stream_mode=["custom", "values"]):
+        if mode == "custom" and "report_token" in chunk:
+            yield chunk["report_token"]
+        elif mode == "values" and result is not None:
+            result.update(chunk)
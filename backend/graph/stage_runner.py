@@ -0,0 +1,94 @@
+import contextvars
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+# Marks the end of a stage's input
+_DONE = object()
+
+class Stage:
+    """A pipeline stage applied to each item independently"""
+
+    def __init__(self, name: str, func: Callable, workers: int = 1):
+        """
+        Args:
+            name: Stage name (used when logging failures)
+            func: Callable transforming one item; returning None drops the item
+            workers: Number of threads running this stage
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+
+class StageRunner:
+    """
+    Queue-based runner streaming items through a chain of stages.
+
+    Every stage has its own worker threads and input queue, so an item
+    moves on to the next stage as soon as it is done with the current one
+    instead of waiting for the whole batch. An item whose stage raises is
+    logged and dropped without affecting the others.
+    """
+
+    def __init__(self, stages: List[Stage]):
+        self.stages = stages
+
+    def run(self, items: Iterable) -> Iterator[Tuple[int, object]]:
+        """
+        Stream items through all stages.
+
+        Args:
+            items: Input items
+
+        Yields:
+            (input index, result) tuples in completion order
+        """
+        queues = [queue.Queue() for _ in range(len(self.stages) + 1)]
+        for position, stage in enumerate(self.stages):
+            downstream_workers = (self.stages[position + 1].workers
+                                  if position + 1 < len(self.stages) else 1)
+            remaining = [stage.workers]
+            lock = threading.Lock()
+            for _ in range(stage.workers):
+                # Workers inherit the caller's context (e.g. the instrumentation recorder)
+                threading.Thread(
+                    target=contextvars.copy_context().run,
+                    args=(self._work, stage, queues[position], queues[position + 1],
+                          remaining, lock, downstream_workers),
+                    daemon=True
+                ).start()
+
+        for index, item in enumerate(items):
+            queues[0].put((index, item))
+        for _ in range(self.stages[0].workers):
+            queues[0].put(_DONE)
+
+        while True:
+            entry = queues[-1].get()
+            if entry is _DONE:
+                break
+            yield entry
+
+    @staticmethod
+    def _work(stage, inbox, outbox, remaining, lock, downstream_workers):
+        """Worker loop: process items until the stage input is exhausted."""
+        while True:
+            entry = inbox.get()
+            if entry is _DONE:
+                break
+            index, item = entry
+            try:
+                result = stage.func(item)
+            except Exception as e:
+                print(f"[{stage.name.upper()}] Failed to process item: {e}")
+                continue
+            if result is not None:
+                outbox.put((index, result))
+
+        # The last worker of a stage closes the next stage's input
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            for _ in range(downstream_workers):
+                outbox.put(_DONE)
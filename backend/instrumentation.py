@@ -0,0 +1,268 @@
+"""
+Run instrumentation for the research pipeline.
+
+Records wall time, token usage, retries and estimated cost of pipeline
+nodes, LLM calls, embedding requests and arXiv searches, and exports the
+resulting run report as JSON lines or Prometheus-style metrics.
+"""
+import contextvars
+import functools
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# USD per 1M (input, output) tokens
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "text-embedding-3-small": (0.02, 0.0),
+}
+
+_current_recorder = contextvars.ContextVar("run_recorder", default=None)
+_current_span = contextvars.ContextVar("run_span", default=None)
+_recorders: Dict[str, "RunRecorder"] = {}
+_recorders_lock = threading.Lock()
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    """
+    Estimate the cost of a call in USD.
+
+    Args:
+        model: Model name
+        input_tokens: Prompt tokens
+        output_tokens: Completion tokens
+
+    Returns:
+        Estimated cost (0 for unknown models)
+    """
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+class RunRecorder:
+    """Thread-safe collector of the events of one pipeline run"""
+
+    def __init__(self, run_id: Optional[str] = None):
+        self.run_id = run_id or uuid.uuid4().hex
+        self.started_at = time.time()
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(self, event: Dict[str, Any]) -> None:
+        """Add a finished event."""
+        with self._lock:
+            self.events.append(event)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Build the structured run report.
+
+        Returns:
+            Dictionary with run_id, wall time, per-node and per-call totals
+            and the raw events
+        """
+        with self._lock:
+            events = list(self.events)
+
+        nodes = {}
+        calls = {}
+        for event in events:
+            if event["kind"] == "node":
+                nodes[event["name"]] = nodes.get(event["name"], 0.0) + event["duration_s"]
+                continue
+            key = f"{event['kind']}:{event['name']}"
+            totals = calls.setdefault(key, {
+                "kind": event["kind"], "name": event["name"], "calls": 0, "cache_hits": 0,
+                "errors": 0, "retries": 0, "duration_s": 0.0, "input_tokens": 0,
+                "output_tokens": 0, "cost_usd": 0.0
+            })
+            totals["calls"] += 1
+            totals["cache_hits"] += int(event.get("cache_hit", False))
+            totals["errors"] += int("error" in event)
+            for field in ("retries", "duration_s", "input_tokens", "output_tokens", "cost_usd"):
+                totals[field] += event.get(field, 0)
+
+        return {
+            "run_id": self.run_id,
+            "wall_time_s": time.time() - self.started_at,
+            "total_cost_usd": sum(totals["cost_usd"] for totals in calls.values()),
+            "nodes": nodes,
+            "calls": list(calls.values()),
+            "events": events
+        }
+
+
+def current_recorder() -> Optional[RunRecorder]:
+    """Get the recorder of the run executing in this context, if any."""
+    return _current_recorder.get()
+
+
+def current_span() -> Optional[Dict[str, Any]]:
+    """Get the event of the innermost open span in this context, if any."""
+    return _current_span.get()
+
+
+@contextmanager
+def recording(recorder: RunRecorder) -> Iterator[RunRecorder]:
+    """Route events recorded in this context to recorder."""
+    token = _current_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current_recorder.reset(token)
+
+
+@contextmanager
+def span(kind: str, name: str, **fields) -> Iterator[Dict[str, Any]]:
+    """
+    Time a unit of work and record it on the active recorder.
+
+    The yielded dict may be updated with input_tokens, output_tokens,
+    retries, cache_hit or other fields. Cost is derived from the token
+    counts unless set explicitly. Without an active recorder the span
+    is timed but discarded.
+
+    Args:
+        kind: Event kind ("node", "llm", "embedding", "search", ...)
+        name: Node or model name
+        **fields: Extra fields stored on the event
+    """
+    event = {"kind": kind, "name": name, "start": time.time(), "retries": 0, **fields}
+    token = _current_span.set(event)
+    started = time.perf_counter()
+    try:
+        yield event
+    except Exception as e:
+        event["error"] = repr(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        event["duration_s"] = time.perf_counter() - started
+        if event.get("cache_hit"):
+            # Cached responses replay the original usage; nothing was sent
+            event.update(input_tokens=0, output_tokens=0, cost_usd=0.0)
+        elif "cost_usd" not in event and ("input_tokens" in event or "output_tokens" in event):
+            event["cost_usd"] = estimate_cost(
+                name, event.get("input_tokens", 0), event.get("output_tokens", 0)
+            )
+        recorder = _current_recorder.get()
+        if recorder is not None:
+            recorder.record(event)
+
+
+def record(kind: str, name: str, duration_s: float, **fields) -> None:
+    """
+    Record an already timed unit of work (e.g. a consumed stream).
+
+    Args:
+        kind: Event kind
+        name: Node or model name
+        duration_s: Wall time in seconds
+        **fields: Extra fields (token counts, retries, ...)
+    """
+    recorder = _current_recorder.get()
+    if recorder is None:
+        return
+    event = {"kind": kind, "name": name, "start": time.time() - duration_s, "retries": 0,
+             **fields, "duration_s": duration_s}
+    if "cost_usd" not in event:
+        event["cost_usd"] = estimate_cost(name, event.get("input_tokens", 0), event.get("output_tokens", 0))
+    recorder.record(event)
+
+
+def instrument_node(name: str, func: Callable, final: bool = False) -> Callable:
+    """
+    Wrap a LangGraph node so it records its wall time and the calls it makes.
+
+    The first instrumented node of a run creates a RunRecorder and stores
+    its id in the state ("run_id"); the final node attaches the run report
+    ("run_report").
+
+    Args:
+        name: Node name
+        func: Node function taking the pipeline state
+        final: Whether this node ends the run
+
+    Returns:
+        Wrapped node function
+    """
+    @functools.wraps(func)
+    def wrapper(state):
+        run_id = state.get("run_id")
+        with _recorders_lock:
+            recorder = _recorders.get(run_id) if run_id else None
+            if recorder is None:
+                recorder = RunRecorder(run_id)
+                _recorders[recorder.run_id] = recorder
+        try:
+            with recording(recorder), span("node", name):
+                update = dict(func(state) or {})
+        except Exception:
+            with _recorders_lock:
+                _recorders.pop(recorder.run_id, None)
+            raise
+        update["run_id"] = recorder.run_id
+        if final:
+            with _recorders_lock:
+                _recorders.pop(recorder.run_id, None)
+            update["run_report"] = recorder.report()
+        return update
+
+    return wrapper
+
+
+def report_to_jsonl(run_report: Dict[str, Any]) -> str:
+    """
+    Export a run report as JSON lines (one event per line).
+
+    Args:
+        run_report: Report from RunRecorder.report()
+
+    Returns:
+        JSON lines text
+    """
+    lines = []
+    for event in run_report["events"]:
+        lines.append(json.dumps({"run_id": run_report["run_id"], **event}))
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def report_to_prometheus(run_report: Dict[str, Any]) -> str:
+    """
+    Export a run report in the Prometheus text exposition format.
+
+    Args:
+        run_report: Report from RunRecorder.report()
+
+    Returns:
+        Metrics text
+    """
+    run_id = run_report["run_id"]
+    lines = [
+        "# TYPE research_run_wall_seconds gauge",
+        f'research_run_wall_seconds{{run_id="{run_id}"}} {run_report["wall_time_s"]:.6f}',
+        "# TYPE research_node_seconds gauge",
+    ]
+    for node, seconds in run_report["nodes"].items():
+        lines.append(f'research_node_seconds{{run_id="{run_id}",node="{node}"}} {seconds:.6f}')
+
+    metrics = [
+        ("research_calls_total", "calls"),
+        ("research_call_cache_hits_total", "cache_hits"),
+        ("research_call_errors_total", "errors"),
+        ("research_call_retries_total", "retries"),
+        ("research_call_seconds_total", "duration_s"),
+        ("research_call_input_tokens_total", "input_tokens"),
+        ("research_call_output_tokens_total", "output_tokens"),
+        ("research_call_cost_usd_total", "cost_usd"),
+    ]
+    for metric, field in metrics:
+        lines.append(f"# TYPE {metric} counter")
+        for totals in run_report["calls"]:
+            labels = f'run_id="{run_id}",kind="{totals["kind"]}",name="{totals["name"]}"'
+            lines.append(f"{metric}{{{labels}}} {totals[field]}")
+    return "\n".join(lines) + "\n"
@@ -1,22 +1,583 @@
+"""
+LangChain + OpenAI integration.
+
+The shared clients (llm_mini, llm_standard), the response cache
+(llm_cache) and the rate limiter (rate_limiter) are built on first use
+rather than at import time, so code paths that never call a model do not
+pay for importing langchain_openai or constructing HTTP clients. They are
+still plain module attributes: ``from backend.llm_client import llm_mini``
+and assigning a replacement (e.g. a fake model in benchmarks) both work as
+before.
+
+Every OpenAI API call of the process (chat completions of both models and
+embeddings) goes through the shared RateLimiter: per-model token buckets
+for requests and tokens, an AIMD concurrency limit that halves on 429
+responses, and retries with exponential backoff and jitter. Cache hits
+never reach it.
+"""
+import asyncio
+import hashlib
 import os
+import random
+import threading
+import time
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
+from langchain_core.caches import BaseCache
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
 from langchain_core.prompts import PromptTemplate
+from backend.memory.disk_cache import DiskCache
+from backend.instrumentation import current_span, record, span
 
 load_dotenv()
 
-# Initialize LangChain LLM with OpenAI
-llm_mini = ChatOpenAI(
-    model="gpt-4o-mini",
-    openai_api_key=os.getenv("OPENAI_API_KEY"),
-    temperature=0.7
-)
+class LLMResponseCache(BaseCache):
+    """
+    LangChain cache storing chat model responses in a DiskCache.
+
+    Entries are keyed on a hash of the LLM configuration string (model,
+    temperature and other invocation parameters) and the prompt, so the
+    same prompt sent to the same model is only paid for once.
+    """
+    
+    def __init__(self, disk_cache: DiskCache):
+        self.disk_cache = disk_cache
+    
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+    
+    def lookup(self, prompt: str, llm_string: str):
+        cached = self.disk_cache.get(self._key(prompt, llm_string))
+        if cached is None:
+            return None
+        event = current_span()
+        if event is not None and event["kind"] == "llm":
+            event["cache_hit"] = True
+        generations = []
+        for item in cached:
+            if "message" in item:
+                message = messages_from_dict([item["message"]])[0]
+                generations.append(ChatGeneration(message=message))
+            else:
+                generations.append(Generation(text=item["text"]))
+        return generations
+    
+    def update(self, prompt: str, llm_string: str, return_val) -> None:
+        cached = []
+        for generation in return_val:
+            if isinstance(generation, ChatGeneration):
+                cached.append({"message": message_to_dict(generation.message)})
+            else:
+                cached.append({"text": generation.text})
+        self.disk_cache.set(self._key(prompt, llm_string), cached)
+    
+    def clear(self, **kwargs) -> None:
+        self.disk_cache.clear()
+
+# Responses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRY_STATUS = (408, 409, 429, 500, 502, 503, 504)
+# Completion tokens assumed for a chat call without max_tokens, until its usage is known
+DEFAULT_COMPLETION_TOKENS = 512
+
+class TokenBucket:
+    """
+    Budget of per_minute units that refills continuously, bursting up to a minute's worth.
+
+    Reservations may overdraw the bucket; the caller then waits until the
+    debt is repaid, so concurrent callers are paced in arrival order.
+    """
+    
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+    
+    def _refill(self, now: float) -> None:
+        self.level = min(self.per_minute, self.level + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+    
+    def reserve(self, amount: float, now: float) -> float:
+        """Take amount and return the seconds to wait before using it."""
+        self._refill(now)
+        self.level -= amount
+        return 0.0 if self.level >= 0 else -self.level * 60 / self.per_minute
+    
+    def adjust(self, amount: float, now: float) -> None:
+        """Give back (positive) or take (negative) units after the fact."""
+        self._refill(now)
+        self.level = min(self.per_minute, self.level + amount)
+
+class ModelLimiter:
+    """
+    Admission control of one model: request and token buckets plus an AIMD concurrency limit.
+
+    The concurrency limit grows by one per limit's worth of successful
+    calls (additive increase) and halves on a 429 response (multiplicative
+    decrease). Only 429s of requests sent after the last decrease count:
+    the other in-flight requests were sent under the old limit, so their
+    429s are the same congestion signal. A Retry-After pauses every caller
+    of the model.
+    Bucket rates come from configuration or are learned from the
+    x-ratelimit-limit-* headers of the first 429.
+    """
+    
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 max_concurrency: int = 32, initial_concurrency: int = 4):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(min(initial_concurrency, max_concurrency))
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.stats = {"calls": 0, "rate_limited": 0, "retries": 0, "wait_s": 0.0}
+        self.condition = threading.Condition()
+    
+    def _admit(self, tokens: int) -> Optional[float]:
+        """Take a slot and reserve budget (lock held); None if the caller must wait for a slot."""
+        now = time.monotonic()
+        if now < self.paused_until or self.in_flight >= max(1, int(self.concurrency)):
+            return None
+        self.in_flight += 1
+        delays = [bucket.reserve(amount, now) for bucket, amount in ((self.requests, 1), (self.tokens, tokens))
+                  if bucket is not None]
+        return max(delays, default=0.0)
+    
+    def acquire(self, tokens: int) -> float:
+        """Block until a call of about tokens tokens may be sent; returns the seconds waited."""
+        started = time.monotonic()
+        with self.condition:
+            while (delay := self._admit(tokens)) is None:
+                pause = self.paused_until - time.monotonic()
+                self.condition.wait(pause if pause > 0 else None)
+        if delay:
+            time.sleep(delay)
+        return time.monotonic() - started
+    
+    async def aacquire(self, tokens: int) -> float:
+        """Async variant of acquire (polls for a slot instead of blocking the event loop)."""
+        started = time.monotonic()
+        while True:
+            with self.condition:
+                delay = self._admit(tokens)
+            if delay is not None:
+                break
+            await asyncio.sleep(max(0.05, self.paused_until - time.monotonic()))
+        if delay:
+            await asyncio.sleep(delay)
+        return time.monotonic() - started
+    
+    def release(self, outcome: str, sent: float, estimated_tokens: int = 0, used_tokens: Optional[int] = None,
+                retry_after: Optional[float] = None, headers: Optional[Dict] = None) -> None:
+        """
+        Free the slot of a finished attempt and adapt to its outcome.
+        
+        Args:
+            outcome: "ok", "rate_limited" (429) or "failed"
+            sent: time.monotonic() at which the attempt was sent
+            estimated_tokens: Tokens reserved by acquire
+            used_tokens: Tokens actually used (corrects the token bucket)
+            retry_after: Seconds the server asked to wait
+            headers: Response headers carrying x-ratelimit-* limits
+        """
+        with self.condition:
+            now = time.monotonic()
+            self.in_flight -= 1
+            self.stats["calls"] += 1
+            if self.tokens is not None and used_tokens is not None:
+                self.tokens.adjust(estimated_tokens - used_tokens, now)
+            if outcome == "ok":
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+            elif outcome == "rate_limited":
+                self.stats["rate_limited"] += 1
+                if sent >= self.last_decrease:
+                    self.concurrency = max(1.0, self.concurrency / 2)
+                    self.last_decrease = now
+                if retry_after:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+                self._learn_limits(headers or {}, now)
+            self.condition.notify_all()
+    
+    def _learn_limits(self, headers: Dict, now: float) -> None:
+        """Adopt the quota announced by x-ratelimit-* headers (lock held)."""
+        for name, attribute in (("requests", "requests"), ("tokens", "tokens")):
+            try:
+                limit = float(headers[f"x-ratelimit-limit-{name}"])
+                remaining = float(headers.get(f"x-ratelimit-remaining-{name}", limit))
+            except (KeyError, ValueError):
+                continue
+            bucket = getattr(self, attribute)
+            if bucket is None or bucket.per_minute != limit:
+                bucket = TokenBucket(limit)
+                setattr(self, attribute, bucket)
+            bucket._refill(now)
+            bucket.level = min(bucket.level, remaining)
+
+def _retry_details(error: Exception) -> Tuple[bool, Optional[int], Optional[float], Dict]:
+    """Whether an OpenAI API error is worth retrying, its status, Retry-After and headers."""
+    import openai
+    status, retry_after, headers = None, None, {}
+    if isinstance(error, openai.APIStatusError):
+        status = error.status_code
+        headers = {key.lower(): value for key, value in error.response.headers.items()}
+        try:
+            if "retry-after-ms" in headers:
+                retry_after = float(headers["retry-after-ms"]) / 1000
+            elif "retry-after" in headers:
+                retry_after = float(headers["retry-after"])
+        except ValueError:
+            pass
+    retryable = isinstance(error, openai.APIConnectionError) or status in RETRY_STATUS
+    return retryable, status, retry_after, headers
+
+class RateLimiter:
+    """
+    Process-wide scheduler of OpenAI API calls.
+    
+    Each model gets its own ModelLimiter, shared by every pipeline, thread
+    and event loop of the process. Failed attempts that are worth retrying
+    (429, 5xx, timeouts, connection errors) are retried up to max_retries
+    times after an exponential backoff with full jitter (never shorter
+    than the server's Retry-After).
+    """
+    
+    def __init__(self, limits: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+                 max_concurrency: int = 32, initial_concurrency: int = 4, max_retries: int = 6,
+                 base_delay: float = 0.5, max_delay: float = 30.0):
+        """
+        Initialize the limiter.
+        
+        Args:
+            limits: Model -> (requests per minute, tokens per minute); None values
+                and unlisted models are learned from the first 429 response
+            max_concurrency: Upper bound of the adaptive concurrency of a model
+            initial_concurrency: Concurrent calls allowed per model before any feedback
+            max_retries: Retries of a failed call before the error is raised
+            base_delay: Backoff ceiling of the first retry in seconds (doubles per retry)
+            max_delay: Largest backoff ceiling in seconds
+        """
+        self.limits = limits or {}
+        self.max_concurrency = max_concurrency
+        self.initial_concurrency = initial_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._models: Dict[str, ModelLimiter] = {}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        """
+        Build the limiter from OPENAI_RATE_LIMITS ("model=rpm:tpm,..."),
+        OPENAI_MAX_CONCURRENCY and OPENAI_MAX_RETRIES.
+        """
+        limits = {}
+        for entry in filter(None, (item.strip() for item in os.getenv("OPENAI_RATE_LIMITS", "").split(","))):
+            model, _, values = entry.partition("=")
+            rpm, _, tpm = values.partition(":")
+            limits[model.strip()] = (float(rpm) if rpm else None, float(tpm) if tpm else None)
+        max_concurrency = int(os.getenv("OPENAI_MAX_CONCURRENCY", "32"))
+        return cls(limits, max_concurrency=max_concurrency, initial_concurrency=min(4, max_concurrency),
+                   max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "6")))
+    
+    def limiter(self, model: str) -> ModelLimiter:
+        """Get (or create) the limiter of a model."""
+        with self._lock:
+            if model not in self._models:
+                requests_per_minute, tokens_per_minute = self.limits.get(model, (None, None))
+                self._models[model] = ModelLimiter(requests_per_minute, tokens_per_minute,
+                                                   self.max_concurrency, self.initial_concurrency)
+            return self._models[model]
+    
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before retry number attempt + 1."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+    
+    def _waited(self, limiter: ModelLimiter, seconds: float) -> None:
+        limiter.stats["wait_s"] += seconds
+        event = current_span()
+        if event is not None and seconds > 0:
+            event["throttle_wait_s"] = event.get("throttle_wait_s", 0.0) + seconds
+    
+    def _failed(self, limiter: ModelLimiter, error: Exception, attempt: int, tokens: int, sent: float) -> float:
+        """Release a failed attempt; returns the backoff before retrying or re-raises."""
+        retryable, status, retry_after, headers = _retry_details(error)
+        limiter.release("rate_limited" if status == 429 else "failed", sent, tokens, 0, retry_after, headers)
+        if not retryable or attempt >= self.max_retries:
+            raise error
+        limiter.stats["retries"] += 1
+        event = current_span()
+        if event is not None and status == 429:
+            event["rate_limited"] = event.get("rate_limited", 0) + 1
+        delay = self.backoff(attempt, retry_after)
+        print(f"[RATE LIMIT] {type(error).__name__} (status {status}); retry {attempt + 1}/{self.max_retries} "
+              f"in {delay:.1f}s")
+        return delay
+    
+    def call(self, model: str, tokens: int, func: Callable[[], Any],
+             usage: Callable[[Any], Optional[int]] = lambda result: None) -> Any:
+        """
+        Run an API call under the model's limits, retrying failed attempts.
+        
+        Args:
+            model: Model name
+            tokens: Estimated tokens of the call (prompt + completion)
+            func: Makes the call
+            usage: Actual tokens used, read from the result
+            
+        Returns:
+            Result of func
+        """
+        limiter = self.limiter(model)
+        for attempt in range(self.max_retries + 1):
+            self._waited(limiter, limiter.acquire(tokens))
+            sent = time.monotonic()
+            try:
+                result = func()
+            except Exception as e:
+                time.sleep(self._failed(limiter, e, attempt, tokens, sent))
+                continue
+            limiter.release("ok", sent, tokens, usage(result))
+            return result
+    
+    async def acall(self, model: str, tokens: int, func: Callable[[], Any],
+                    usage: Callable[[Any], Optional[int]] = lambda result: None) -> Any:
+        """Async variant of call (func returns an awaitable)."""
+        limiter = self.limiter(model)
+        for attempt in range(self.max_retries + 1):
+            self._waited(limiter, await limiter.aacquire(tokens))
+            sent = time.monotonic()
+            try:
+                result = await func()
+            except Exception as e:
+                await asyncio.sleep(self._failed(limiter, e, attempt, tokens, sent))
+                continue
+            limiter.release("ok", sent, tokens, usage(result))
+            return result
+    
+    def stream(self, model: str, tokens: int, open_stream: Callable[[], Iterator],
+               usage: Callable[[Any], Optional[int]] = lambda chunk: None) -> Iterator:
+        """
+        Stream an API response under the model's limits.
+        
+        The slot is held until the stream ends. Attempts failing before the
+        first chunk are retried; later failures are raised.
+        """
+        limiter = self.limiter(model)
+        for attempt in range(self.max_retries + 1):
+            self._waited(limiter, limiter.acquire(tokens))
+            sent = time.monotonic()
+            streamed = False
+            used = None
+            try:
+                for chunk in open_stream():
+                    streamed = True
+                    used = usage(chunk) or used
+                    yield chunk
+            except Exception as e:
+                if streamed:
+                    limiter.release("failed", sent, tokens, used)
+                    raise
+                time.sleep(self._failed(limiter, e, attempt, tokens, sent))
+                continue
+            except BaseException:
+                # Consumer stopped early (GeneratorExit) or was interrupted
+                limiter.release("ok", sent, tokens, used)
+                raise
+            limiter.release("ok", sent, tokens, used)
+            return
+    
+    async def astream(self, model: str, tokens: int, open_stream: Callable[[], AsyncIterator],
+                      usage: Callable[[Any], Optional[int]] = lambda chunk: None) -> AsyncIterator:
+        """Async variant of stream."""
+        limiter = self.limiter(model)
+        for attempt in range(self.max_retries + 1):
+            self._waited(limiter, await limiter.aacquire(tokens))
+            sent = time.monotonic()
+            streamed = False
+            used = None
+            try:
+                async for chunk in open_stream():
+                    streamed = True
+                    used = usage(chunk) or used
+                    yield chunk
+            except Exception as e:
+                if streamed:
+                    limiter.release("failed", sent, tokens, used)
+                    raise
+                await asyncio.sleep(self._failed(limiter, e, attempt, tokens, sent))
+                continue
+            except BaseException:
+                limiter.release("ok", sent, tokens, used)
+                raise
+            limiter.release("ok", sent, tokens, used)
+            return
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model concurrency limit, calls, 429s, retries and time spent waiting."""
+        with self._lock:
+            models = dict(self._models)
+        return {model: {**limiter.stats, "concurrency": round(limiter.concurrency, 2),
+                        "in_flight": limiter.in_flight}
+                for model, limiter in models.items()}
+
+def _chat_tokens(llm, messages: List) -> int:
+    """Estimated tokens of a chat call: ~4 characters per prompt token plus the completion."""
+    prompt = sum(len(str(message.content)) for message in messages) // 4
+    return prompt + (getattr(llm, "max_tokens", None) or DEFAULT_COMPLETION_TOKENS)
+
+def _result_tokens(result) -> Optional[int]:
+    return ((result.llm_output or {}).get("token_usage") or {}).get("total_tokens")
 
-llm_standard = ChatOpenAI(
-    model="gpt-4o",
-    openai_api_key=os.getenv("OPENAI_API_KEY"),
-    temperature=0.7
-)
+def _chunk_tokens(chunk) -> Optional[int]:
+    return (getattr(chunk.message, "usage_metadata", None) or {}).get("total_tokens")
+
+@lru_cache(maxsize=None)
+def _rate_limited_chat_class():
+    """ChatOpenAI subclass whose API calls (cache misses only) go through the shared rate limiter."""
+    from langchain_openai import ChatOpenAI
+    
+    class RateLimitedChatOpenAI(ChatOpenAI):
+        # Retries are scheduled by the rate limiter
+        max_retries: Optional[int] = 0
+        
+        # Serialized like a plain ChatOpenAI so that response cache keys stay the same
+        @classmethod
+        def lc_id(cls) -> List[str]:
+            return ChatOpenAI.lc_id()
+        
+        def get_name(self, suffix: Optional[str] = None, *, name: Optional[str] = None) -> str:
+            return super().get_name(suffix, name=name or "ChatOpenAI")
+        
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            generate = super()._generate
+            if self.streaming:
+                # Delegates to _stream, which is limited itself
+                return generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            return _shared("rate_limiter").call(
+                self.model_name, _chat_tokens(self, messages),
+                lambda: generate(messages, stop=stop, run_manager=run_manager, **kwargs), _result_tokens
+            )
+        
+        def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+            stream = super()._stream
+            return _shared("rate_limiter").stream(
+                self.model_name, _chat_tokens(self, messages),
+                lambda: stream(messages, stop=stop, run_manager=run_manager, **kwargs), _chunk_tokens
+            )
+        
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+            agenerate = super()._agenerate
+            if self.streaming:
+                return await agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            return await _shared("rate_limiter").acall(
+                self.model_name, _chat_tokens(self, messages),
+                lambda: agenerate(messages, stop=stop, run_manager=run_manager, **kwargs), _result_tokens
+            )
+        
+        def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+            astream = super()._astream
+            return _shared("rate_limiter").astream(
+                self.model_name, _chat_tokens(self, messages),
+                lambda: astream(messages, stop=stop, run_manager=run_manager, **kwargs), _chunk_tokens
+            )
+    
+    return RateLimitedChatOpenAI
+
+class RateLimitedEmbeddings(Embeddings):
+    """Embeddings whose requests go through the shared rate limiter (e.g. OpenAIEmbeddings)."""
+    
+    def __init__(self, embeddings: Embeddings, model: str):
+        """
+        Args:
+            embeddings: Embedding model making the API calls (with its own retries disabled)
+            model: Model name the limits apply to
+        """
+        self.embeddings = embeddings
+        self.model = model
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        tokens = sum(len(text) for text in texts) // 4 + len(texts)
+        return _shared("rate_limiter").call(self.model, tokens, lambda: self.embeddings.embed_documents(texts))
+    
+    def embed_query(self, text: str) -> List[float]:
+        return _shared("rate_limiter").call(self.model, len(text) // 4 + 1,
+                                            lambda: self.embeddings.embed_query(text))
+
+def _create_response_cache() -> Optional[LLMResponseCache]:
+    """Build the shared response cache from environment settings."""
+    if os.getenv("LLM_CACHE", "1").lower() in ("0", "false", "no"):
+        return None
+    max_entries = os.getenv("LLM_CACHE_MAX_ENTRIES", "10000")
+    ttl = os.getenv("LLM_CACHE_TTL")
+    return LLMResponseCache(DiskCache(
+        os.getenv("LLM_CACHE_PATH", "backend/memory/cache/llm_responses.sqlite"),
+        max_entries=int(max_entries) if max_entries else None,
+        ttl=float(ttl) if ttl else None
+    ))
+
+def _count_http_request(request) -> None:
+    """httpx hook counting HTTP attempts (first try + retries) of the current call."""
+    event = current_span()
+    if event is not None:
+        event["http_requests"] = event.get("http_requests", 0) + 1
+
+def _http_client():
+    from openai import DefaultHttpxClient
+    return DefaultHttpxClient(event_hooks={"request": [_count_http_request]})
+
+def _chat_model(model: str, **kwargs):
+    """Build a rate-limited ChatOpenAI client sharing the response cache."""
+    return _rate_limited_chat_class()(
+        model=model,
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        temperature=0.7,
+        cache=_shared("llm_cache"),
+        http_client=_http_client(),
+        **kwargs
+    )
+
+# Module attributes built on first access: the shared response cache (None
+# when disabled with LLM_CACHE=0) and the LangChain LLMs
+_LAZY_ATTRIBUTES = {
+    "llm_cache": _create_response_cache,
+    "rate_limiter": RateLimiter.from_env,
+    "llm_mini": lambda: _chat_model("gpt-4o-mini"),
+    "llm_standard": lambda: _chat_model("gpt-4o", stream_usage=True),
+}
+_lazy_lock = threading.RLock()
+
+def __getattr__(name: str):
+    """Build a lazy module attribute on first access (PEP 562)."""
+    factory = _LAZY_ATTRIBUTES.get(name)
+    if factory is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _lazy_lock:
+        if name not in globals():
+            globals()[name] = factory()
+    return globals()[name]
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+def _shared(name: str):
+    """Look up a lazy attribute from inside the module, honouring replacements."""
+    return globals()[name] if name in globals() else __getattr__(name)
+
+def _invoke(llm, prompt: str) -> str:
+    """Invoke a chat model, recording latency, tokens and retries of the call."""
+    with span("llm", llm.model_name) as event:
+        response = llm.invoke(prompt)
+        usage = response.usage_metadata or {}
+        event["input_tokens"] = usage.get("input_tokens", 0)
+        event["output_tokens"] = usage.get("output_tokens", 0)
+        event["retries"] = max(0, event.get("http_requests", 1) - 1)
+    return response.content
 
 def ask_mini(prompt: str) -> str:
     """
@@ -28,8 +589,7 @@ def ask_mini(prompt: str) -> str:
     Returns:
         LLM response
     """
-    response = llm_mini.invoke(prompt)
-    return response.content
+    return _invoke(_shared("llm_mini"), prompt)
 
 def ask_standard(prompt: str) -> str:
     """
@@ -41,13 +601,61 @@ def ask_standard(prompt: str) -> str:
     Returns:
         LLM response
     """
-    response = llm_standard.invoke(prompt)
-    return response.content
+    return _invoke(_shared("llm_standard"), prompt)
+
+def stream_standard(prompt: str) -> Iterator[str]:
+    """
+    Streaming variant of ask_standard.
+    
+    Streamed responses bypass the response cache.
+    
+    Args:
+        prompt: User prompt/question
+        
+    Yields:
+        Response text chunks as they are generated
+    """
+    llm_standard = _shared("llm_standard")
+    started = time.perf_counter()
+    usage = {}
+    for chunk in llm_standard.stream(prompt):
+        if chunk.usage_metadata:
+            usage = chunk.usage_metadata
+        if chunk.content:
+            yield chunk.content
+    record("llm", llm_standard.model_name, time.perf_counter() - started,
+           input_tokens=usage.get("input_tokens", 0),
+           output_tokens=usage.get("output_tokens", 0), streamed=True)
+
+async def astream_standard(prompt: str) -> AsyncIterator[str]:
+    """
+    Async streaming variant of ask_standard.
+    
+    Args:
+        prompt: User prompt/question
+        
+    Yields:
+        Response text chunks as they are generated
+    """
+    llm_standard = _shared("llm_standard")
+    started = time.perf_counter()
+    usage = {}
+    async for chunk in llm_standard.astream(prompt):
+        if chunk.usage_metadata:
+            usage = chunk.usage_metadata
+        if chunk.content:
+            yield chunk.content
+    record("llm", llm_standard.model_name, time.perf_counter() - started,
+           input_tokens=usage.get("input_tokens", 0),
+           output_tokens=usage.get("output_tokens", 0), streamed=True)
 
 def create_chain(template: str, llm=None):
     """
     Create a LangChain chain with a custom prompt template using LCEL.
     
+    Custom LLM instances without their own cache are given the shared
+    response cache.
+    
     Args:
         template: Prompt template with variables
         llm: LLM instance (defaults to flash model)
@@ -55,12 +663,38 @@ def create_chain(template: str, llm=None):
     Returns:
         Runnable chain
     """
+    llm_cache = _shared("llm_cache")
     if llm is None:
-        llm = llm_mini
+        llm = _shared("llm_mini")
+    elif llm_cache is not None and getattr(llm, "cache", None) is None:
+        llm = llm.model_copy(update={"cache": llm_cache})
     
     prompt = PromptTemplate.from_template(template)
     chain = prompt | llm
     return chain
 
+def get_cache_stats() -> dict:
+    """
+    Get hit/miss statistics of the shared response cache.
+    
+    Returns:
+        Cache statistics (empty if caching is disabled)
+    """
+    llm_cache = _shared("llm_cache")
+    if llm_cache is None:
+        return {}
+    return llm_cache.disk_cache.stats()
+
+def get_rate_limit_stats() -> dict:
+    """
+    Get per-model statistics of the shared rate limiter.
+    
+    Returns:
+        Model -> adaptive concurrency, calls, 429s, retries and seconds waited
+    """
+    return _shared("rate_limiter").stats()
+
 # Export LLM instances for direct use
-__all__ = ['llm_mini', 'llm_standard', 'ask_mini', 'ask_standard', 'create_chain']
+__all__ = ['llm_mini', 'llm_standard', 'llm_cache', 'rate_limiter', 'ask_mini', 'ask_standard',
+           'stream_standard', 'astream_standard', 'create_chain', 'get_cache_stats',
+           'get_rate_limit_stats', 'RateLimiter', 'RateLimitedEmbeddings']
@@ -2,25 +2,180 @@
 AI Research Assistant - Main Entry Point
 Uses the pipeline from pipeline_graph.py
 """
+import argparse
+import json
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-from backend.graph.pipeline_graph import create_pipeline
+from backend.graph.pipeline_graph import create_pipeline, iter_report_tokens
 from backend.memory.vector_store import VectorStoreFAISS
+from backend.memory.chunk_index import ChunkStore
+from backend.instrumentation import report_to_jsonl, report_to_prometheus
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="AI Research Assistant")
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("PIPELINE_WORKERS", "1")),
+        help="Number of papers extracted/analyzed concurrently (default: 1)"
+    )
+    parser.add_argument(
+        "--streaming", action="store_true",
+        help="Stream each paper through extraction, analysis and memory independently"
+    )
+    parser.add_argument(
+        "--fused", action="store_true",
+        help="Extract and analyze each paper with a single structured LLM call"
+    )
+    parser.add_argument(
+        "--metrics-out", default=None,
+        help="Append the run report as JSON lines to this file"
+    )
+    parser.add_argument(
+        "--prometheus-out", default=None,
+        help="Write the run metrics in Prometheus text format to this file"
+    )
+    parser.add_argument(
+        "--max-results", type=int, default=10,
+        help="Number of papers covered by the literature review (default: 10)"
+    )
+    parser.add_argument(
+        "--reuse-threshold", type=float, default=None,
+        help="Reuse stored analyses with at least this cosine similarity to the query (e.g. 0.5)"
+    )
+    parser.add_argument(
+        "--batch", default=None, metavar="FILE",
+        help="Run every query in FILE (one per line, '-' for stdin) instead of prompting"
+    )
+    parser.add_argument(
+        "--parallel", type=int, default=1,
+        help="Number of batch queries run concurrently (default: 1)"
+    )
+    parser.add_argument(
+        "--output", default="batch_results.jsonl",
+        help="JSONL file receiving one result per batch query (default: batch_results.jsonl)"
+    )
+    parser.add_argument(
+        "--checkpoint-every", type=int, default=0,
+        help="Save the vector store after every N finished batch queries (default: only at the end)"
+    )
+    parser.add_argument(
+        "--embeddings", choices=["openai", "local"], default=None,
+        help="Embedding backend: OpenAI or a local sentence-transformers model (default: EMBEDDING_BACKEND or openai)"
+    )
+    parser.add_argument(
+        "--index-path", default="backend/memory/faiss_index",
+        help="Vector index directory; indexes are tied to the embedder that built them"
+    )
+    parser.add_argument(
+        "--full-text", action="store_true",
+        help="Download and chunk each paper's PDF and give extraction its most relevant passages"
+    )
+    parser.add_argument(
+        "--passage-tokens", type=int, default=1500,
+        help="Token budget of the full-text passages added to each extraction prompt (default: 1500)"
+    )
+    return parser.parse_args()
+
+def read_queries(path):
+    """Read non-empty, non-comment query lines from a file or stdin ('-')"""
+    handle = sys.stdin if path == "-" else open(path)
+    try:
+        return [line.strip() for line in handle if line.strip() and not line.strip().startswith("#")]
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+def batch_record(query, result=None, error=None):
+    """Build the JSONL record written for a batch query"""
+    if result is None:
+        return {"query": query, "error": error}
+    run_report = result.get("run_report") or {}
+    return {
+        "query": query,
+        "final_report": result.get("final_report", ""),
+        "papers": [{"entry_id": p["entry_id"], "title": p["title"]} for p in result.get("papers", [])],
+        "analyses": [
+            {key: a.get(key) for key in ("paper_id", "title", "analysis", "source")}
+            for a in result.get("analyses", [])
+        ],
+        "wall_time_s": run_report.get("wall_time_s"),
+        "cost_usd": run_report.get("total_cost_usd"),
+    }
+
+def run_batch(args, pipeline, vector_store):
+    """Run many queries in one process, sharing the pipeline, caches and vector store"""
+    queries = read_queries(args.batch)
+    print(f"\nRunning {len(queries)} queries ({args.parallel} at a time) -> {args.output}")
+    
+    def run(query):
+        return pipeline.invoke({
+            "query": query,
+            "papers": [],
+            "extractions": [],
+            "analyses": [],
+            "final_report": ""
+        })
+    
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.parallel)) as executor, \
+            open(args.output, "a") as output:
+        futures = {executor.submit(run, query): query for query in queries}
+        for done, future in enumerate(as_completed(futures), 1):
+            query = futures[future]
+            try:
+                record = batch_record(query, result=future.result())
+                status = "ok"
+            except Exception as e:
+                record = batch_record(query, error=str(e))
+                status = f"failed: {e}"
+                failed += 1
+            # Results are written from this thread only, one line per query
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+            print(f"[{done}/{len(queries)}] {query} - {status}")
+            if args.checkpoint_every and done % args.checkpoint_every == 0:
+                vector_store.save_index()
+    
+    print(f"\n✓ {len(queries) - failed} succeeded, {failed} failed")
+
+def print_report_header():
+    """Print the banner shown above the final report"""
+    print("\n" + "=" * 80)
+    print("FINAL LITERATURE REVIEW")
+    print("=" * 80)
 
 def main():
     """Run the AI Research Assistant pipeline"""
+    args = parse_args()
     print("=" * 80)
     print("AI RESEARCH ASSISTANT")
     print("=" * 80)
     
     # Initialize vector store
     print("\nInitializing vector store...")
-    vector_store = VectorStoreFAISS(index_path="backend/memory/faiss_index")
+    vector_store = VectorStoreFAISS(index_path=args.index_path, embedding_backend=args.embeddings)
     
     # Create pipeline
-    print("Building research pipeline...")
-    pipeline = create_pipeline(vector_store)
+    print(f"Building research pipeline ({args.workers} worker(s))...")
+    pipeline = create_pipeline(
+        vector_store,
+        max_workers=args.workers,
+        streaming=args.streaming,
+        stream_report=not args.batch,
+        max_results=args.max_results,
+        reuse_threshold=args.reuse_threshold,
+        fused=args.fused,
+        chunk_store=ChunkStore(vector_store.embeddings) if args.full_text else None,
+        passage_token_budget=args.passage_tokens
+    )
+    
+    if args.batch:
+        run_batch(args, pipeline, vector_store)
+        vector_store.save_index()
+        print(f"✓ Vector store saved to {vector_store.index_path}")
+        return
     
     # Get research query from user
     query = input("\nEnter research topic to explore: ").strip()
@@ -31,22 +186,41 @@ def main():
     print(f"\nProcessing query: '{query}'")
     print("-" * 80)
     
-    # Execute pipeline with LangGraph
+    # Execute pipeline with LangGraph, printing the report as it is generated
     print("\nExecuting LangGraph pipeline...")
-    result = pipeline.invoke({
+    result = {}
+    streamed = False
+    for token in iter_report_tokens(pipeline, {
         "query": query,
         "papers": [],
         "extractions": [],
         "analyses": [],
         "final_report": ""
-    })
+    }, result):
+        if not streamed:
+            print_report_header()
+            streamed = True
+        print(token, end="", flush=True)
     
-    # Display final report
+    # Display final report (already printed if it was streamed)
+    if not streamed:
+        print_report_header()
+        print(result.get("final_report", ""), end="")
     print("\n" + "=" * 80)
-    print("FINAL LITERATURE REVIEW")
-    print("=" * 80)
-    print(result["final_report"])
-    print("=" * 80)
+    
+    # Run timings and cost
+    run_report = result.get("run_report")
+    if run_report:
+        print(f"\nRun time {run_report['wall_time_s']:.1f}s, "
+              f"estimated cost ${run_report['total_cost_usd']:.4f}")
+        for node, seconds in run_report["nodes"].items():
+            print(f"  {node:<10} {seconds:8.2f}s")
+        if args.metrics_out:
+            with open(args.metrics_out, "a") as f:
+                f.write(report_to_jsonl(run_report))
+        if args.prometheus_out:
+            with open(args.prometheus_out, "w") as f:
+                f.write(report_to_prometheus(run_report))
     
     # Save vector store
     vector_store.save_index()
@@ -0,0 +1,277 @@
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+
+INDEX_TYPES = ("flat", "hnsw", "ivf")
+
+DEFAULT_PARAMS = {
+    "hnsw_m": 32,            # HNSW graph degree
+    "ef_construction": 200,  # HNSW build-time candidate list size
+    "ef_search": 64,         # HNSW query-time candidate list size
+    "nlist": None,           # IVF cells (None = 4 * sqrt(n))
+    "nprobe": 16,            # IVF cells visited per query
+}
+
+# IVF needs enough training vectors per cell for k-means to be meaningful
+MIN_TRAINING_POINTS_PER_LIST = 39
+# Filters allowing at most this many vectors are searched exactly over just those vectors
+EXACT_FILTER_MAX = 4096
+
+
+def _faiss():
+    import faiss
+    return faiss
+
+
+def ivf_nlist(count: int, nlist: Optional[int] = None) -> int:
+    """Number of IVF cells for count vectors (0 if there are too few to train)."""
+    nlist = nlist or int(4 * math.sqrt(count))
+    nlist = min(nlist, count // MIN_TRAINING_POINTS_PER_LIST)
+    return max(nlist, 0)
+
+
+class ANNIndex:
+    """
+    Approximate FAISS index (HNSW or IVF) behaving like IndexFlat to callers.
+
+    The LangChain FAISS wrapper expects dense vector slots 0..ntotal-1 that
+    are renumbered when vectors are removed, which HNSW (no removal) and
+    IVF (stable ids) do not provide. Removed vectors are therefore kept in
+    the underlying index as tombstones, excluded from searches with an
+    IDSelector and dropped when the index is rebuilt.
+    """
+
+    def __init__(self, index, live: Optional[np.ndarray] = None, ef_search: int = DEFAULT_PARAMS["ef_search"],
+                 nprobe: int = DEFAULT_PARAMS["nprobe"]):
+        """
+        Args:
+            index: Underlying faiss IndexHNSWFlat or IndexIVFFlat
+            live: Internal id of every live slot (None = all vectors are live)
+            ef_search: HNSW candidate list size at query time
+            nprobe: IVF cells visited per query
+        """
+        self.index = index
+        self.d = index.d
+        self.live = np.arange(index.ntotal, dtype=np.int64) if live is None else np.asarray(live, dtype=np.int64)
+        self.ef_search = ef_search
+        self.nprobe = nprobe
+        self._selector = None
+
+    @property
+    def kind(self) -> str:
+        return "ivf" if hasattr(self.index, "nprobe") else "hnsw"
+
+    @property
+    def ntotal(self) -> int:
+        return len(self.live)
+
+    @property
+    def tombstones(self) -> int:
+        return self.index.ntotal - len(self.live)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.index.is_trained
+
+    def add(self, vectors: np.ndarray) -> None:
+        start = self.index.ntotal
+        self.index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+        self.live = np.concatenate([self.live, np.arange(start, self.index.ntotal, dtype=np.int64)])
+        self._selector = None
+
+    def remove_ids(self, slots: np.ndarray) -> int:
+        """Remove vectors by slot; later slots shift down as in IndexFlat."""
+        keep = np.ones(len(self.live), dtype=bool)
+        keep[np.asarray(slots, dtype=np.int64)] = False
+        removed = int((~keep).sum())
+        self.live = self.live[keep]
+        self._selector = None
+        return removed
+
+    def _search_params(self, allowed: Optional[np.ndarray] = None):
+        faiss = _faiss()
+        selector = None
+        if allowed is not None:
+            # Only the allowed live slots; tombstones are never allowed
+            selector = _id_selector(self.live[allowed], self.index.ntotal)
+        elif self.tombstones:
+            if self._selector is None:
+                dead = np.setdiff1d(np.arange(self.index.ntotal, dtype=np.int64), self.live)
+                batch = faiss.IDSelectorBatch(dead)
+                # Keep the wrapped selector alive as long as the negation
+                self._selector = (batch, faiss.IDSelectorNot(batch))
+            selector = self._selector[1]
+        if self.kind == "ivf":
+            return faiss.SearchParametersIVF(nprobe=self.nprobe, sel=selector)
+        return faiss.SearchParametersHNSW(efSearch=self.ef_search, sel=selector)
+
+    def search(self, vectors: np.ndarray, k: int, allowed: Optional[np.ndarray] = None):
+        """
+        Search like IndexFlat.search, returning slots (-1 for missing results).
+        
+        Args:
+            vectors: Query vectors
+            k: Results per query
+            allowed: Sorted slots the results are restricted to (None = all)
+        """
+        distances, internal = self.index.search(
+            np.ascontiguousarray(vectors, dtype=np.float32), k, params=self._search_params(allowed)
+        )
+        if not len(self.live):
+            return distances, np.full(internal.shape, -1, dtype=np.int64)
+        # live is sorted (it only grows at the end and shrinks through masks), so a
+        # binary search maps internal ids back to slots without touching every vector
+        slots = np.searchsorted(self.live, internal)
+        found = (internal >= 0) & (self.live[np.minimum(slots, len(self.live) - 1)] == internal)
+        return distances, np.where(found, slots, -1)
+
+    def reconstruct_batch(self, slots: np.ndarray) -> np.ndarray:
+        return self.index.reconstruct_batch(self.live[np.asarray(slots, dtype=np.int64)])
+
+    def reconstruct_n(self, start: int = 0, count: Optional[int] = None) -> np.ndarray:
+        count = self.ntotal - start if count is None else count
+        return self.reconstruct_batch(np.arange(start, start + count, dtype=np.int64))
+
+
+def _id_selector(ids: np.ndarray, ntotal: int):
+    """
+    IDSelector admitting ids out of ntotal.
+
+    Small sets use a hash set (IDSelectorBatch), built in O(len(ids)); a
+    bitmap costs ntotal / 8 bytes to build and only pays off for sets
+    larger than that. The selector keeps its bitmap alive.
+    """
+    faiss = _faiss()
+    if len(ids) * 64 < ntotal:
+        return faiss.IDSelectorBatch(np.ascontiguousarray(ids, dtype=np.int64))
+    members = np.zeros(ntotal, dtype=bool)
+    members[ids] = True
+    return faiss.IDSelectorBitmap(np.packbits(members, bitorder="little"))
+
+
+def filtered_search(index, vectors: np.ndarray, k: int, allowed: np.ndarray):
+    """
+    Search a flat or ANN index restricted to some slots.
+    
+    The restriction is applied inside the FAISS search through an ID
+    selector, so no candidates are fetched and discarded afterwards. When
+    the filter allows few vectors, they are reconstructed and ranked
+    exactly instead, which is cheaper than traversing the index and avoids
+    the recall loss of a graph search through a sparse selection.
+    
+    Args:
+        index: faiss.IndexFlatL2 or ANNIndex
+        vectors: Query vectors
+        k: Results per query
+        allowed: Sorted slots the results are restricted to
+        
+    Returns:
+        (distances, slots) like IndexFlat.search, -1 for missing results
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    distances = np.full((len(vectors), k), np.inf, dtype=np.float32)
+    slots = np.full((len(vectors), k), -1, dtype=np.int64)
+    if not len(allowed):
+        return distances, slots
+    
+    if len(allowed) <= EXACT_FILTER_MAX:
+        candidates = index.reconstruct_batch(allowed)
+        exact = (vectors ** 2).sum(1)[:, None] + (candidates ** 2).sum(1)[None, :] - 2 * vectors @ candidates.T
+        top = np.argsort(exact, axis=1)[:, :k]
+        found = top.shape[1]
+        distances[:, :found] = np.take_along_axis(exact, top, axis=1)
+        slots[:, :found] = allowed[top]
+        return distances, slots
+    
+    if isinstance(index, ANNIndex):
+        return index.search(vectors, k, allowed=allowed)
+    return index.search(vectors, k, params=_faiss().SearchParameters(sel=_id_selector(allowed, index.ntotal)))
+
+
+def all_vectors(index) -> np.ndarray:
+    """Every live vector of a flat or ANN index, in slot order."""
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype=np.float32)
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def index_type(index) -> str:
+    return index.kind if isinstance(index, ANNIndex) else "flat"
+
+
+def build_index(kind: str, vectors: np.ndarray, params: Optional[Dict] = None):
+    """
+    Build a flat, HNSW or IVF index over vectors (training IVF on them).
+
+    An IVF index needs at least MIN_TRAINING_POINTS_PER_LIST vectors per
+    cell; with fewer vectors a flat index is returned instead, to be
+    rebuilt once the corpus is large enough.
+
+    Args:
+        kind: "flat", "hnsw" or "ivf"
+        vectors: Vectors to index, one row per slot
+        params: Overrides of DEFAULT_PARAMS
+
+    Returns:
+        faiss.IndexFlatL2 or ANNIndex
+    """
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"index_type must be one of {INDEX_TYPES}, got {kind!r}")
+    faiss = _faiss()
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    d = vectors.shape[1]
+
+    if kind == "hnsw":
+        inner = faiss.IndexHNSWFlat(d, params["hnsw_m"])
+        inner.hnsw.efConstruction = params["ef_construction"]
+        inner.add(vectors)
+        return ANNIndex(inner, ef_search=params["ef_search"], nprobe=params["nprobe"])
+
+    nlist = ivf_nlist(len(vectors), params["nlist"]) if kind == "ivf" else 0
+    if nlist < 2:
+        index = faiss.IndexFlatL2(d)
+        index.add(vectors)
+        return index
+    inner = faiss.IndexIVFFlat(faiss.IndexFlatL2(d), d, nlist)
+    inner.train(vectors)
+    inner.add(vectors)
+    # Reconstruction (used by segments and rebuilds) needs the id -> list map
+    inner.make_direct_map()
+    return ANNIndex(inner, ef_search=params["ef_search"], nprobe=params["nprobe"])
+
+
+def wrap_loaded(index, ids: List[Optional[str]], params: Optional[Dict] = None):
+    """
+    Wrap an index read from a base snapshot.
+
+    Args:
+        index: Deserialized faiss index
+        ids: Docstore id per internal vector (None for tombstones)
+        params: Search parameter overrides
+
+    Returns:
+        (flat or ANN index, docstore id per live slot)
+    """
+    live_ids = [docstore_id for docstore_id in ids if docstore_id is not None]
+    if isinstance(index, _faiss().IndexFlat):
+        return index, live_ids
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    live = np.array([i for i, docstore_id in enumerate(ids) if docstore_id is not None], dtype=np.int64)
+    return ANNIndex(index, live, ef_search=params["ef_search"], nprobe=params["nprobe"]), live_ids
+
+
+def snapshot_ids(index, slot_ids: List[str]) -> List[Optional[str]]:
+    """Docstore id per internal vector of index (None for tombstones)."""
+    if not isinstance(index, ANNIndex):
+        return list(slot_ids)
+    ids: List[Optional[str]] = [None] * index.index.ntotal
+    for slot, internal in enumerate(index.live.tolist()):
+        ids[internal] = slot_ids[slot]
+    return ids
+
+
+def underlying(index):
+    """The raw faiss index to serialize."""
+    return index.index if isinstance(index, ANNIndex) else index
@@ -0,0 +1,346 @@
+"""
+Section-aware chunk index of paper full texts.
+
+Full texts (see backend.tools.pdf_utils) are split into sections by their
+headings, each section into overlapping chunks of a few hundred tokens,
+and the chunks are embedded in batches into one small index per paper.
+Extraction then sends only the chunks closest to the methodology, the
+findings and the contributions, within a fixed token budget, instead of
+the whole paper.
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from backend.memory.disk_cache import DiskCache
+from backend.memory.index_files import _atomic_write
+
+# Canonical section -> heading words announcing it
+SECTION_HEADINGS = {
+    "abstract": ("abstract",),
+    "introduction": ("introduction", "motivation"),
+    "background": ("related work", "background", "preliminaries", "prior work"),
+    "method": ("method", "methods", "methodology", "approach", "proposed method", "model",
+               "framework", "architecture", "algorithm"),
+    "experiments": ("experiments", "experiment", "experimental setup", "evaluation", "setup"),
+    "results": ("results", "analysis", "ablation", "ablations", "ablation study", "findings"),
+    "discussion": ("discussion", "limitations"),
+    "conclusion": ("conclusion", "conclusions", "summary", "future work", "concluding remarks"),
+}
+# Nothing after these headings is worth sending to the model
+STOP_HEADINGS = ("references", "bibliography", "acknowledgements", "acknowledgments", "appendix")
+
+# What extraction asks for, as retrieval queries, with the sections that usually answer them
+ASPECTS = {
+    "methodology": ("methodology, proposed approach, model architecture, algorithm and experimental setup",
+                    ("method", "experiments")),
+    "findings": ("key results and findings, quantitative evaluation, performance compared to baselines",
+                 ("results", "experiments", "discussion")),
+    "contributions": ("main contributions and novelty: we propose, we introduce, we show",
+                      ("abstract", "introduction", "conclusion")),
+}
+
+# Failed papers (download errors, PDFs without text) are retried after this many seconds,
+# so transient network errors do not cost a paper its full text for good
+FAILURE_TTL = 6 * 3600
+
+# Optional section number ("3", "3.2", "IV."), then a short title
+_HEADING = re.compile(r"^(?:(\d+(?:\.\d+)*|[IVX]+)\.?\s+)?([A-Za-z][A-Za-z &\-,:]{2,60})$")
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token, as for the other budgets of the pipeline
+    return len(text) // 4
+
+
+def _heading(line: str) -> Optional[str]:
+    """Canonical section (or "stop") if the line is a section heading."""
+    match = _HEADING.match(line.strip())
+    if not match or len(match.group(2).split()) > 6:
+        return None
+    number, title = match.groups()
+    if not title[0].isupper():
+        return None
+    title = title.strip().lower().rstrip(":")
+    # Unnumbered headings must be exactly a known title, or any sentence starting with one would match
+    if any(title == word or (number and title.startswith(word)) for word in STOP_HEADINGS):
+        return "stop"
+    for section, words in SECTION_HEADINGS.items():
+        if any(title == word or (number and title.startswith(word + " ")) for word in words):
+            return section
+    # A numbered top-level heading with an unknown title still starts a new section
+    if number and "." not in number and title[0].isalpha():
+        return "other"
+    return None
+
+
+def split_sections(pages: Iterable[Dict]) -> Iterator[Tuple[str, str]]:
+    """
+    Split a paper's pages into sections.
+
+    Args:
+        pages: {"page": n, "text": ...} dictionaries in page order (streamed)
+
+    Returns:
+        Iterator of (section, text) tuples; text before the first heading is
+        labelled "front" and everything after the references is dropped
+    """
+    section, lines = "front", []
+    for page in pages:
+        for line in page["text"].splitlines():
+            heading = _heading(line)
+            if heading is None:
+                lines.append(line)
+                continue
+            if lines:
+                yield section, "\n".join(lines)
+            if heading == "stop":
+                return
+            section, lines = heading, []
+    if lines:
+        yield section, "\n".join(lines)
+
+
+def chunk_sections(sections: Iterable[Tuple[str, str]], chunk_tokens: int = 256,
+                   overlap_tokens: int = 32) -> List[Dict]:
+    """
+    Split sections into overlapping chunks that never span two sections.
+
+    Args:
+        sections: (section, text) tuples
+        chunk_tokens: Target chunk size in estimated tokens
+        overlap_tokens: Tokens repeated at the start of the next chunk of a section
+
+    Returns:
+        List of {"index", "section", "text", "tokens"} dictionaries in document order
+    """
+    chunks = []
+    for section, text in sections:
+        words = text.split()
+        start = 0
+        while start < len(words):
+            end, size = start, 0
+            while end < len(words) and (size == 0 or size + len(words[end]) + 1 <= chunk_tokens * 4):
+                size += len(words[end]) + 1
+                end += 1
+            chunk = " ".join(words[start:end])
+            chunks.append({"index": len(chunks), "section": section, "text": chunk,
+                           "tokens": estimate_tokens(chunk)})
+            if end >= len(words):
+                break
+            # Step back by the overlap, but always make progress
+            back, overlap = end, 0
+            while back > start + 1 and overlap + len(words[back - 1]) + 1 <= overlap_tokens * 4:
+                back -= 1
+                overlap += len(words[back]) + 1
+            start = back
+    return chunks
+
+
+class ChunkStore:
+    """
+    Per-paper chunk indexes with resumable ingestion.
+
+    Each paper's chunks and their normalized vectors are written atomically
+    to one file, and a progress table records every paper that was indexed
+    or failed, so an interrupted ingestion of thousands of papers continues
+    with the papers it had not finished. Failures expire after failure_ttl
+    seconds, since a failed download is often transient. Downloads, extracted text and
+    embeddings are cached as well, so redone work is cheap. Indexes built
+    with a different embedder are ignored and rebuilt.
+    """
+
+    def __init__(self, embeddings: Embeddings, directory: Optional[str] = None, ingestor=None,
+                 chunk_tokens: int = 256, overlap_tokens: int = 32, batch_size: int = 256,
+                 failure_ttl: float = FAILURE_TTL):
+        """
+        Initialize the store.
+
+        Args:
+            embeddings: Embedding model (e.g. the vector store's cached embeddings)
+            directory: Directory of the chunk indexes (default: CHUNK_INDEX_DIR)
+            ingestor: PDFIngestor fetching full texts (default: the shared one)
+            chunk_tokens: Target chunk size in estimated tokens
+            overlap_tokens: Overlap between consecutive chunks of a section
+            batch_size: Chunks embedded per request, across papers
+            failure_ttl: Seconds before a failed paper is tried again
+        """
+        self.embeddings = embeddings
+        self.embedder = getattr(embeddings, "namespace", type(embeddings).__name__)
+        self.directory = directory or os.getenv("CHUNK_INDEX_DIR", "backend/memory/cache/chunks")
+        self._ingestor = ingestor
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.batch_size = batch_size
+        self.failure_ttl = failure_ttl
+        os.makedirs(self.directory, exist_ok=True)
+        # paper key -> {"status": "done" | "failed", ...}
+        self.progress = DiskCache(os.path.join(self.directory, "progress.sqlite"))
+
+    @property
+    def ingestor(self):
+        if self._ingestor is None:
+            from backend.tools.pdf_utils import get_pdf_ingestor
+            self._ingestor = get_pdf_ingestor()
+        return self._ingestor
+
+    @staticmethod
+    def paper_key(paper: Dict) -> str:
+        return paper.get("entry_id") or paper.get("paper_id") or paper["pdf_url"]
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], f"{digest}.npz")
+
+    def has(self, paper: Dict) -> bool:
+        """Whether the paper's chunk index exists (for the current embedder)."""
+        state = self.progress.get(self.paper_key(paper))
+        return bool(state) and state["status"] == "done" and state.get("embedder") == self.embedder \
+            and os.path.exists(self._path(self.paper_key(paper)))
+
+    def _write(self, key: str, chunks: List[Dict], vectors: np.ndarray) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        buffer = io.BytesIO()
+        np.savez(buffer, vectors=vectors, records=np.array(json.dumps({"embedder": self.embedder, "chunks": chunks})))
+        _atomic_write(path, buffer.getvalue())
+        self.progress.set(key, {"status": "done", "chunks": len(chunks), "embedder": self.embedder})
+
+    def load(self, paper: Dict) -> Tuple[List[Dict], np.ndarray]:
+        """
+        Read a paper's chunk index.
+
+        Returns:
+            (chunks, normalized vectors, one row per chunk)
+        """
+        with np.load(self._path(self.paper_key(paper)), allow_pickle=False) as data:
+            records = json.loads(str(data["records"]))
+            return records["chunks"], data["vectors"]
+
+    def _flush(self, pending: List[Tuple[str, List[Dict]]]) -> None:
+        """Embed the chunks of the pending papers in batches and write their indexes."""
+        texts = [chunk["text"] for _, chunks in pending for chunk in chunks]
+        vectors = np.zeros((0, 0), dtype=np.float32)
+        if texts:
+            vectors = np.array(self.embeddings.embed_documents(texts), dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.where(norms == 0, 1, norms)
+        offset = 0
+        for key, chunks in pending:
+            self._write(key, chunks, vectors[offset:offset + len(chunks)])
+            offset += len(chunks)
+
+    def ingest(self, papers: List[Dict], retry_failed: bool = False) -> Dict[str, int]:
+        """
+        Fetch, chunk and embed the full text of papers not indexed yet.
+
+        Papers are indexed in the order their full text becomes available;
+        chunks are buffered across papers so that embedding requests carry
+        up to batch_size chunks, and each paper is marked done once its
+        index is written.
+
+        Args:
+            papers: Paper dictionaries with entry_id and pdf_url
+            retry_failed: Also retry papers whose failure has not expired yet
+
+        Returns:
+            Counts of indexed, skipped (already done or recently failed) and failed papers
+        """
+        counts = {"indexed": 0, "skipped": 0, "failed": 0}
+        todo = []
+        now = time.time()
+        for paper in papers:
+            state = self.progress.get(self.paper_key(paper))
+            recently_failed = bool(state) and state["status"] == "failed" \
+                and now - state.get("failed_at", 0) < self.failure_ttl
+            if self.has(paper) or (recently_failed and not retry_failed):
+                counts["skipped"] += 1
+            else:
+                todo.append(paper)
+        if not todo:
+            return counts
+
+        pending: List[Tuple[str, List[Dict]]] = []
+        buffered = 0
+        for paper, digest in self.ingestor.ingest(todo):
+            key = self.paper_key(paper)
+            chunks = []
+            if digest is not None:
+                chunks = chunk_sections(split_sections(self.ingestor.pages(digest)),
+                                        self.chunk_tokens, self.overlap_tokens)
+            if not chunks:
+                self.progress.set(key, {"status": "failed", "error": "no full text", "failed_at": time.time()})
+                counts["failed"] += 1
+                continue
+            pending.append((key, chunks))
+            buffered += len(chunks)
+            if buffered >= self.batch_size:
+                self._flush(pending)
+                counts["indexed"] += len(pending)
+                pending, buffered = [], 0
+                print(f"[CHUNKS] {counts['indexed']}/{len(todo)} papers indexed")
+        if pending:
+            self._flush(pending)
+            counts["indexed"] += len(pending)
+        print(f"[CHUNKS] Indexed {counts['indexed']} papers, skipped {counts['skipped']}, "
+              f"failed {counts['failed']}")
+        return counts
+
+    def retrieve(self, paper: Dict, token_budget: int = 1500) -> List[Dict]:
+        """
+        Select the chunks most relevant to extraction within a token budget.
+
+        Each aspect (methodology, findings, contributions) ranks the chunks
+        by cosine similarity to its query, with a bonus for the sections
+        that usually answer it; the aspects then take turns picking their
+        best remaining chunk while it fits in the budget.
+
+        Args:
+            paper: Paper dictionary
+            token_budget: Maximum estimated tokens of the selected chunks
+
+        Returns:
+            Selected chunks (with the aspect that picked them) in document order
+        """
+        if not self.has(paper):
+            return []
+        chunks, vectors = self.load(paper)
+        rankings = []
+        for aspect, (query, sections) in ASPECTS.items():
+            query_vector = np.array(self.embeddings.embed_query(query), dtype=np.float32)
+            query_vector /= np.linalg.norm(query_vector) or 1
+            scores = vectors @ query_vector
+            scores += np.array([0.1 if chunk["section"] in sections else 0.0 for chunk in chunks])
+            rankings.append((aspect, list(np.argsort(-scores))))
+
+        selected: Dict[int, str] = {}
+        used = 0
+        while any(rankings):
+            for aspect, ranking in rankings:
+                while ranking and (ranking[0] in selected or used + chunks[ranking[0]]["tokens"] > token_budget):
+                    ranking.pop(0)
+                if ranking:
+                    best = ranking.pop(0)
+                    selected[best] = aspect
+                    used += chunks[best]["tokens"]
+            rankings = [(aspect, ranking) for aspect, ranking in rankings if ranking]
+        return [{**chunks[i], "aspect": selected[i]} for i in sorted(selected)]
+
+    def passages(self, paper: Dict, token_budget: int = 1500) -> Optional[str]:
+        """
+        Format the retrieved chunks of a paper for an extraction prompt.
+
+        Returns:
+            Section-labelled passages, or None if the paper has no full text
+        """
+        chunks = self.retrieve(paper, token_budget)
+        if not chunks:
+            return None
+        return "\n\n".join(f"[{chunk['section'].title()}] {chunk['text']}" for chunk in chunks)
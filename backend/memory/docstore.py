@@ -0,0 +1,371 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+# No stemming: the keyword index exists for exact terms, dense retrieval covers the rest
+FTS_TOKENIZER = "unicode61 remove_diacritics 2"
+# Committed postings a keyword query may rank; bounds latency on large corpora
+MAX_POSTINGS = 5000
+# Identifier-like terms: words, arXiv ids (2301.01234v2), method names (GPT-4, BERT_base)
+_TERM = re.compile(r"\w+(?:[.\-]\w+)*")
+# Tokens as split by the unicode61 tokenizer
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def query_terms(text: str) -> List[str]:
+    """Distinct lower-cased terms of a free-text query, in order."""
+    return list(dict.fromkeys(term.lower() for term in _TERM.findall(text) if _TOKEN.search(term)))
+
+
+def _is_prefix_term(term: str) -> bool:
+    # Terms containing digits match as prefixes, so an arXiv id matches all of its versions
+    return any(c.isdigit() for c in term)
+
+
+def fts_query(terms: List[str]) -> Optional[str]:
+    """
+    Build an FTS5 query matching any of the terms.
+
+    Each term is quoted, so FTS5 syntax in the input is taken literally and
+    dotted or hyphenated terms match as phrases. Terms containing digits
+    also match as prefixes.
+
+    Returns:
+        MATCH expression, or None if there are no terms
+    """
+    if not terms:
+        return None
+    return " OR ".join(f'"{term}"' + (" *" if _is_prefix_term(term) else "") for term in terms)
+
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """
+    LangChain docstore keeping document text and metadata in SQLite.
+
+    Documents are read on demand, so only the hits of a search are loaded
+    into memory. Changes are buffered in memory until commit(), which
+    writes them in one transaction together with the index manifest; the
+    database therefore always matches the persisted vectors, whatever
+    point a crash happens at. Each row also stores the document's key
+    (paper_id / entry_id) so the id map can be rebuilt without reading
+    any document.
+    
+    A full-text index (FTS5, BM25 ranking) over the content and key is kept
+    in sync with the documents table by triggers, so it is updated in the
+    same transaction as the documents. Uncommitted documents are indexed in
+    a temporary table until commit().
+    """
+
+    def __init__(self, path: str, key_func: Callable[[Dict], Optional[str]]):
+        """
+        Initialize the docstore.
+
+        Args:
+            path: Path of the SQLite database file
+            key_func: Derives the stored key from a document's metadata
+        """
+        self.path = path
+        self.key_func = key_func
+        self._lock = threading.Lock()
+        # Uncommitted changes
+        self._added: Dict[str, Document] = {}
+        self._deleted = set()
+        self._cleared = False
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " id TEXT PRIMARY KEY,"
+            " key TEXT,"
+            " content TEXT NOT NULL,"
+            " metadata TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._create_fts()
+        self._conn.commit()
+    
+    def _create_fts(self) -> None:
+        """Create the full-text index, its sync triggers and the table of uncommitted documents."""
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'documents_fts'"
+        ).fetchone()
+        # External content table: the text is only stored once, in documents
+        # (rowids must stay stable, so the database is never VACUUMed)
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5("
+            f"key, content, content='documents', tokenize='{FTS_TOKENIZER}')"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS documents_fts_insert AFTER INSERT ON documents BEGIN"
+            " INSERT INTO documents_fts (rowid, key, content) VALUES (new.rowid, new.key, new.content); END"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS documents_fts_delete AFTER DELETE ON documents BEGIN"
+            " INSERT INTO documents_fts (documents_fts, rowid, key, content)"
+            " VALUES ('delete', old.rowid, old.key, old.content); END"
+        )
+        # INSERT OR REPLACE only fires the delete trigger with recursive triggers on
+        self._conn.execute("PRAGMA recursive_triggers = ON")
+        if not exists:
+            # Docstores written before the full-text index existed
+            self._conn.execute("INSERT INTO documents_fts (documents_fts) VALUES ('rebuild')")
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS temp.pending_fts USING fts5("
+            f"id UNINDEXED, key, content, tokenize='{FTS_TOKENIZER}')"
+        )
+    
+    def _unindex_pending(self, ids: Optional[Iterable[str]] = None) -> None:
+        """Drop uncommitted documents (all of them if ids is None) from the pending full-text index."""
+        if ids is None:
+            self._conn.execute("DELETE FROM temp.pending_fts")
+        else:
+            self._conn.executemany("DELETE FROM temp.pending_fts WHERE id = ?", [(i,) for i in ids])
+        self._conn.commit()
+
+    def _stored(self, ids: Iterable[str]) -> List[str]:
+        """Ids (of the given ones) present in the committed database."""
+        ids = list(ids)
+        found = []
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT id FROM documents WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            found.extend(row[0] for row in rows)
+        return found
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        """
+        Add documents (buffered until commit).
+
+        Args:
+            texts: Mapping of docstore id to document
+        """
+        with self._lock:
+            overlapping = [i for i in texts if i in self._added]
+            if not self._cleared:
+                overlapping += [i for i in self._stored(texts) if i not in self._deleted]
+            if overlapping:
+                raise ValueError(f"Tried to add ids that already exist: {set(overlapping)}")
+            for docstore_id, document in texts.items():
+                self._added[docstore_id] = document
+            self._conn.executemany(
+                "INSERT INTO temp.pending_fts (id, key, content) VALUES (?, ?, ?)",
+                [(docstore_id, self.key_func(doc.metadata), doc.page_content) for docstore_id, doc in texts.items()]
+            )
+            self._conn.commit()
+
+    def delete(self, ids: List) -> None:
+        """Delete documents by id (buffered until commit)."""
+        with self._lock:
+            pending = [docstore_id for docstore_id in ids if docstore_id in self._added]
+            for docstore_id in ids:
+                self._added.pop(docstore_id, None)
+                self._deleted.add(docstore_id)
+            if pending:
+                self._unindex_pending(pending)
+
+    def clear(self) -> None:
+        """Delete every document (applied on commit)."""
+        with self._lock:
+            self._added, self._deleted, self._cleared = {}, set(), True
+            self._unindex_pending()
+
+    def search(self, search: str) -> Union[str, Document]:
+        """
+        Fetch a document by id.
+
+        Returns:
+            The document, or an error string if it does not exist
+        """
+        with self._lock:
+            if search in self._added:
+                return self._added[search]
+            if search not in self._deleted and not self._cleared:
+                row = self._conn.execute(
+                    "SELECT content, metadata FROM documents WHERE id = ?", (search,)
+                ).fetchone()
+                if row is not None:
+                    return Document(page_content=row[0], metadata=json.loads(row[1]))
+        return f"ID {search} not found."
+
+    def keys(self, ids: Optional[List[str]] = None) -> Dict[str, Optional[str]]:
+        """
+        Get document keys without loading the documents.
+
+        Args:
+            ids: Docstore ids to look up (None = every document)
+
+        Returns:
+            Mapping of docstore id to paper_id / entry_id (None if absent)
+        """
+        wanted = None if ids is None else set(ids)
+        with self._lock:
+            keys = {}
+            if not self._cleared:
+                if ids is None:
+                    rows = self._conn.execute("SELECT id, key FROM documents").fetchall()
+                else:
+                    stored = [i for i in wanted if i not in self._added]
+                    rows = []
+                    for start in range(0, len(stored), 500):
+                        chunk = stored[start:start + 500]
+                        rows += self._conn.execute(
+                            f"SELECT id, key FROM documents WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                        ).fetchall()
+                for docstore_id, key in rows:
+                    if docstore_id not in self._deleted:
+                        keys[docstore_id] = key
+            for docstore_id, document in self._added.items():
+                if wanted is None or docstore_id in wanted:
+                    keys[docstore_id] = self.key_func(document.metadata)
+            return keys
+
+    def _document_frequency(self, term: str, limit: int) -> int:
+        """Committed documents matching a query term, counted up to limit + 1."""
+        return self._conn.execute(
+            "SELECT count(*) FROM (SELECT rowid FROM documents_fts WHERE documents_fts MATCH ? LIMIT ?)",
+            (fts_query([term]), limit + 1)
+        ).fetchone()[0]
+    
+    def _selective_terms(self, terms: List[str], max_postings: int) -> List[str]:
+        """
+        Rarest query terms whose postings fit in max_postings.
+        
+        Ranking cost grows with the number of documents matching any term,
+        while terms found in a large share of the corpus carry almost no
+        BM25 weight; they are left out so that common words cannot turn a
+        query into a scan of the whole corpus. The rarest matching term is
+        always kept, so a query made only of common terms still matches
+        (over a bounded candidate set, see lexical_search).
+        """
+        # Counting stops past the budget, so a common term costs no more than a rare one
+        frequencies = sorted((self._document_frequency(term, max_postings), term) for term in terms)
+        selected, postings = [], 0
+        for frequency, term in frequencies:
+            if frequency == 0:
+                continue
+            if selected and postings + frequency > max_postings:
+                break
+            selected.append(term)
+            postings += frequency
+        return selected
+    
+    def lexical_search(self, query: str, k: int = 10,
+                       max_postings: int = MAX_POSTINGS) -> List[Tuple[str, float]]:
+        """
+        Rank documents by BM25 relevance to the terms of a query.
+        
+        Committed and uncommitted documents are searched in their own
+        full-text index and merged by BM25 score. Only the rarest query
+        terms whose combined document frequency fits in max_postings are
+        matched against the committed documents, and at most max_postings
+        matches (the most recently stored ones, when even the rarest term
+        is more common than that) are ranked, which keeps latency in
+        milliseconds on large corpora.
+        
+        Args:
+            query: Free-text query (any term may match)
+            k: Maximum number of results
+            max_postings: Bound on the committed documents ranked per query
+            
+        Returns:
+            List of (docstore id, BM25 score) tuples, best first
+        """
+        terms = query_terms(query)
+        if not terms:
+            return []
+        with self._lock:
+            hits = []
+            match = None if self._cleared else fts_query(self._selective_terms(terms, max_postings))
+            if match is not None:
+                # Candidates are read in rowid order, so the scan stops after max_postings
+                # matches; over-fetch to make up for documents deleted since the last commit
+                rows = self._conn.execute(
+                    "SELECT documents.id, candidates.score FROM ("
+                    "SELECT rowid, -bm25(documents_fts) AS score FROM documents_fts"
+                    " WHERE documents_fts MATCH ? ORDER BY rowid DESC LIMIT ?) AS candidates"
+                    " JOIN documents ON documents.rowid = candidates.rowid"
+                    " ORDER BY candidates.score DESC LIMIT ?",
+                    (match, max_postings, k + len(self._deleted))
+                ).fetchall()
+                hits += [row for row in rows if row[0] not in self._deleted]
+            if self._added:
+                hits += self._conn.execute(
+                    "SELECT id, -bm25(pending_fts) FROM temp.pending_fts"
+                    " WHERE pending_fts MATCH ? ORDER BY rank LIMIT ?",
+                    (fts_query(terms), k)
+                ).fetchall()
+        hits.sort(key=lambda hit: hit[1], reverse=True)
+        return hits[:k]
+    
+    def metadatas(self, ids: List[str]) -> Dict[str, Dict]:
+        """
+        Get document metadata without loading the document text.
+        
+        Args:
+            ids: Docstore ids to look up
+            
+        Returns:
+            Mapping of docstore id to metadata (missing ids are left out)
+        """
+        with self._lock:
+            found = {}
+            if not self._cleared:
+                stored = [i for i in ids if i not in self._added and i not in self._deleted]
+                for start in range(0, len(stored), 500):
+                    chunk = stored[start:start + 500]
+                    rows = self._conn.execute(
+                        f"SELECT id, metadata FROM documents WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                    found.update((docstore_id, json.loads(metadata)) for docstore_id, metadata in rows)
+            for docstore_id in ids:
+                if docstore_id in self._added:
+                    found[docstore_id] = self._added[docstore_id].metadata
+            return found
+    
+    def read_manifest(self) -> Optional[Dict]:
+        """Get the committed index manifest (None if nothing was committed yet)."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE name = 'manifest'").fetchone()
+        return json.loads(row[0]) if row else None
+
+    def commit(self, manifest: Dict, include_changes: bool = True) -> None:
+        """
+        Atomically write the buffered changes and the index manifest.
+
+        Args:
+            manifest: Manifest describing the persisted vectors
+            include_changes: Also write the buffered document changes
+        """
+        with self._lock:
+            with self._conn:
+                if include_changes:
+                    if self._cleared:
+                        self._conn.execute("DELETE FROM documents")
+                    self._conn.executemany(
+                        "DELETE FROM documents WHERE id = ?", [(i,) for i in self._deleted]
+                    )
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO documents (id, key, content, metadata) VALUES (?, ?, ?, ?)",
+                        [(docstore_id, self.key_func(doc.metadata), doc.page_content,
+                          json.dumps(doc.metadata, default=str))
+                         for docstore_id, doc in self._added.items()]
+                    )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (name, value) VALUES ('manifest', ?)", (json.dumps(manifest),)
+                )
+            if include_changes:
+                self._added, self._deleted, self._cleared = {}, set(), False
+                self._unindex_pending()
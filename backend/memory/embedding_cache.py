@@ -0,0 +1,106 @@
+import hashlib
+import threading
+from typing import Callable, List, Union
+from langchain_core.embeddings import Embeddings
+from backend.memory.disk_cache import DiskCache
+from backend.instrumentation import span
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that batches requests and caches vectors on disk.
+
+    Vectors are keyed by a hash of the model name and the text, so identical
+    text is embedded only once across runs and processes. Texts that miss the
+    cache are deduplicated and sent to the underlying model in batches of at
+    most batch_size. The underlying model may be given as a factory, in which
+    case it is only built when a text actually misses the cache.
+    """
+
+    def __init__(self, embeddings: Union[Embeddings, Callable[[], Embeddings]], cache: DiskCache,
+                 namespace: str, batch_size: int = 256):
+        """
+        Initialize the wrapper.
+
+        Args:
+            embeddings: Underlying embedding model, or a callable building it on first use
+            cache: Disk cache used to store vectors
+            namespace: Model identifier mixed into cache keys
+            batch_size: Maximum number of texts per embedding request
+        """
+        if isinstance(embeddings, Embeddings):
+            self._embeddings, self._factory = embeddings, None
+        else:
+            self._embeddings, self._factory = None, embeddings
+        self._factory_lock = threading.Lock()
+        self.cache = cache
+        self.namespace = namespace
+        self.batch_size = batch_size
+
+    @property
+    def embeddings(self) -> Embeddings:
+        """Underlying embedding model (built on first access when given a factory)."""
+        if self._embeddings is None:
+            with self._factory_lock:
+                if self._embeddings is None:
+                    self._embeddings = self._factory()
+        return self._embeddings
+
+    def _key(self, text: str, kind: str = "document") -> str:
+        return hashlib.sha256(f"{self.namespace}\x00{kind}\x00{text}".encode("utf-8")).hexdigest()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts, serving repeated text from the cache.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One vector per text, in input order
+        """
+        keys = [self._key(text) for text in texts]
+        vectors = {}
+        pending = {}
+        for key, text in zip(keys, texts):
+            if key in vectors or key in pending:
+                continue
+            cached = self.cache.get(key)
+            if cached is None:
+                pending[key] = text
+            else:
+                vectors[key] = cached
+
+        pending_items = list(pending.items())
+        for start in range(0, len(pending_items), self.batch_size):
+            batch = pending_items[start:start + self.batch_size]
+            with span("embedding", self.namespace, texts=len(batch)) as event:
+                # Embedding responses carry no usage; estimate ~4 characters per token
+                event["input_tokens"] = sum(len(text) for _, text in batch) // 4
+                embedded = self.embeddings.embed_documents([text for _, text in batch])
+            for (key, _), vector in zip(batch, embedded):
+                vector = list(vector)
+                self.cache.set(key, vector)
+                vectors[key] = vector
+
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a search query, serving repeated queries from the cache.
+
+        Args:
+            text: Query text
+
+        Returns:
+            Query vector
+        """
+        key = self._key(text, kind="query")
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        with span("embedding", self.namespace, texts=1) as event:
+            event["input_tokens"] = len(text) // 4
+            vector = list(self.embeddings.embed_query(text))
+        self.cache.set(key, vector)
+        return vector
@@ -0,0 +1,166 @@
+import io
+import json
+import os
+import shutil
+from typing import Dict, List
+
+import numpy as np
+
+DOCSTORE = "docstore.sqlite"
+BASE_FILES = ("index.faiss", "ids.json")
+# Layout written by earlier versions: a FAISS.save_local snapshot (index.faiss + pickled index.pkl)
+LEGACY_FILES = ("index.faiss", "index.pkl")
+
+
+def _fsync_dir(path: str) -> None:
+    """Flush a directory entry (renames) to disk where the platform allows it."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    """Write a file so that readers see either the old or the complete new content."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(os.path.dirname(path))
+
+
+class IndexDirectory:
+    """
+    On-disk layout of an incrementally persisted vector index.
+
+    The directory holds a base snapshot (``base-NNNNNN/``: the raw FAISS
+    index and the docstore id of every vector), append-only delta segments
+    (``seg-NNNNNN.npz``: deleted ids, then added vectors with their ids)
+    and the document store (``docstore.sqlite``), whose manifest names the
+    base and the segments in replay order. Every file is written under a
+    temporary name and renamed into place before the manifest is committed,
+    so a crash at any point leaves the previous manifest and everything it
+    references intact. Files the manifest does not reference are ignored
+    and removed by the next merge. Nothing is unpickled when loading.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    @property
+    def docstore_path(self) -> str:
+        return self._file(DOCSTORE)
+
+    def has_legacy_snapshot(self) -> bool:
+        """Whether the directory holds a single FAISS.save_local snapshot."""
+        return all(os.path.exists(self._file(name)) for name in LEGACY_FILES)
+
+    def write_segment(self, name: str, vectors: np.ndarray, ids: List[str], deletes: List[str]) -> int:
+        """
+        Write a delta segment.
+
+        Args:
+            name: Segment file name
+            vectors: Added vectors, one row per id
+            ids: Docstore ids of the added vectors
+            deletes: Docstore ids deleted before the additions are applied
+
+        Returns:
+            Size of the segment in bytes
+        """
+        os.makedirs(self.path, exist_ok=True)
+        buffer = io.BytesIO()
+        np.savez(buffer, vectors=np.asarray(vectors, dtype=np.float32),
+                 records=np.array(json.dumps({"ids": ids, "deletes": deletes})))
+        data = buffer.getvalue()
+        _atomic_write(self._file(name), data)
+        return len(data)
+
+    def read_segment(self, name: str) -> Dict:
+        """
+        Read a delta segment.
+
+        Returns:
+            Dictionary with vectors, ids and deletes
+        """
+        with np.load(self._file(name), allow_pickle=False) as data:
+            segment = json.loads(str(data["records"]))
+            segment["vectors"] = data["vectors"]
+        return segment
+
+    def write_base(self, name: str, index_bytes: bytes, ids: List[str]) -> None:
+        """
+        Write a base snapshot directory (serialized FAISS index + vector ids).
+
+        The files are staged in a temporary directory that is renamed into
+        place once complete.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        staging = self._file(f".{name}.tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for filename, data in zip(BASE_FILES, (index_bytes, json.dumps(ids).encode("utf-8"))):
+            with open(os.path.join(staging, filename), "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        # A leftover with this name is never referenced by the manifest
+        shutil.rmtree(self._file(name), ignore_errors=True)
+        os.replace(staging, self._file(name))
+        _fsync_dir(self.path)
+
+    def read_base(self, name: str):
+        """
+        Read a base snapshot.
+
+        Returns:
+            (FAISS index, docstore id of each vector slot)
+        """
+        import faiss
+        index = faiss.read_index(os.path.join(self._file(name), BASE_FILES[0]))
+        with open(os.path.join(self._file(name), BASE_FILES[1])) as f:
+            ids = json.load(f)
+        return index, ids
+
+    def remove(self, name: str) -> None:
+        """Delete a base or segment (used to discard an abandoned merge)."""
+        path = self._file(name)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    def remove_unreferenced(self, manifest: Dict, keep: List[str] = ()) -> int:
+        """
+        Delete bases, segments, legacy files and leftovers of interrupted writes
+        that the manifest does not reference.
+
+        Args:
+            manifest: Committed manifest
+            keep: Extra names to keep (e.g. a base being written concurrently)
+
+        Returns:
+            Number of removed entries
+        """
+        referenced = set(manifest["segments"]) | set(keep)
+        if manifest.get("base"):
+            referenced.add(manifest["base"])
+        removed = 0
+        for name in os.listdir(self.path):
+            stale = (name.startswith(("base-", "seg-", ".base-")) or name in LEGACY_FILES
+                     or name.endswith(".npz.tmp"))
+            if stale and name not in referenced:
+                self.remove(name)
+                removed += 1
+        return removed
@@ -0,0 +1,92 @@
+import threading
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_LOCAL_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """
+    Local CPU embeddings computed with a sentence-transformers model.
+
+    Texts are encoded in batches of batch_size on the CPU, without any
+    network round trip. The model (and torch) is only loaded on the first
+    embedding request. With quantize=True the model's linear layers are
+    converted to int8 with PyTorch dynamic quantization, which makes CPU
+    inference faster at a small cost in accuracy; quantized vectors are
+    not interchangeable with full-precision ones.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_LOCAL_MODEL, batch_size: int = 32,
+                 threads: Optional[int] = None, quantize: bool = False, normalize: bool = True):
+        """
+        Initialize the embedder.
+
+        Args:
+            model_name: sentence-transformers model name or local path
+            batch_size: Texts encoded per forward pass
+            threads: Torch intra-op threads (process-wide; None = torch default)
+            quantize: Apply int8 dynamic quantization to the model
+            normalize: Return unit-length vectors
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.threads = threads
+        self.quantize = quantize
+        self.normalize = normalize
+        self._model = None
+        self._model_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """The sentence-transformers model (loaded on first access)."""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self._load_model()
+        return self._model
+
+    def _load_model(self):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        model = SentenceTransformer(self.model_name, device="cpu")
+        model.eval()
+        if self.quantize:
+            quantization = getattr(torch, "ao", torch).quantization
+            model = quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        print(f"[EMBEDDINGS] Loaded {self.model_name}{' (int8)' if self.quantize else ''} "
+              f"with {torch.get_num_threads()} threads")
+        return model
+
+    @property
+    def dimensions(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts in batches.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One vector per text, in input order
+        """
+        if not texts:
+            return []
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=self.normalize,
+            show_progress_bar=False
+        )
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a search query."""
+        return self.embed_documents([text])[0]
@@ -0,0 +1,118 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+FACETS = ("category", "year", "author")
+FILTER_KEYS = FACETS + ("year_from", "year_to")
+
+
+def document_facets(metadata: Dict) -> Dict[str, List[str]]:
+    """Category, publication year and author values of a stored document's metadata."""
+    year = str(metadata.get("published") or "")[:4]
+    return {
+        "category": list(metadata.get("categories") or []),
+        "year": [year] if year.isdigit() else [],
+        "author": list(metadata.get("authors") or [])
+    }
+
+
+def _values(value) -> List[str]:
+    """Filter value(s) as a list of strings."""
+    if isinstance(value, (list, tuple, set)):
+        return [str(v) for v in value]
+    return [str(value)]
+
+
+class MetadataIndex:
+    """
+    Precomputed slot sets per category, publication year and author.
+
+    Each facet value maps to the sorted array of vector slots carrying it
+    (a compressed bitmap), so a filter resolves to the allowed slots with a
+    few array unions and intersections instead of reading any metadata.
+    Slots follow the FAISS wrapper: new vectors are appended and removing
+    vectors shifts the later slots down.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, np.ndarray]] = {facet: {} for facet in FACETS}
+        self.size = 0
+
+    def add(self, facets: Iterable[Dict[str, List[str]]]) -> None:
+        """
+        Append documents at the next slots.
+
+        Args:
+            facets: document_facets() of each new document, in slot order
+        """
+        grouped: Dict[tuple, List[int]] = {}
+        for slot, document in enumerate(facets, start=self.size):
+            for facet, values in document.items():
+                for value in set(values):
+                    grouped.setdefault((facet, value), []).append(slot)
+            self.size = slot + 1
+        for (facet, value), slots in grouped.items():
+            postings = self.postings[facet]
+            new = np.array(slots, dtype=np.int64)
+            postings[value] = np.concatenate([postings[value], new]) if value in postings else new
+
+    def remove(self, slots: Iterable[int]) -> None:
+        """Remove slots, shifting the later slots down."""
+        removed = np.unique(np.fromiter(slots, dtype=np.int64))
+        if not len(removed):
+            return
+        for postings in self.postings.values():
+            for value in list(postings):
+                kept = postings[value][~np.isin(postings[value], removed, assume_unique=True)]
+                if len(kept):
+                    postings[value] = kept - np.searchsorted(removed, kept)
+                else:
+                    del postings[value]
+        self.size -= len(removed)
+
+    def _union(self, facet: str, values: Iterable[str]) -> np.ndarray:
+        arrays = [self.postings[facet][value] for value in values if value in self.postings[facet]]
+        if not arrays:
+            return np.zeros(0, dtype=np.int64)
+        return arrays[0] if len(arrays) == 1 else np.unique(np.concatenate(arrays))
+
+    def allowed(self, filters: Optional[Dict]) -> Optional[np.ndarray]:
+        """
+        Resolve a filter to the slots it allows.
+
+        Values within a facet are alternatives; facets must all match.
+
+        Args:
+            filters: Any of category, author (value or list), year (int or
+                list) and year_from / year_to (inclusive bounds)
+
+        Returns:
+            Sorted slot array, or None if filters is empty
+        """
+        if not filters:
+            return None
+        unknown = set(filters) - set(FILTER_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown filter keys {sorted(unknown)}; expected some of {FILTER_KEYS}")
+
+        selections = []
+        for facet in ("category", "author"):
+            if filters.get(facet) is not None:
+                selections.append(self._union(facet, _values(filters[facet])))
+        years = None
+        if filters.get("year") is not None:
+            years = set(_values(filters["year"]))
+        if filters.get("year_from") is not None or filters.get("year_to") is not None:
+            low = int(filters.get("year_from") or 0)
+            high = int(filters.get("year_to") or 9999)
+            in_range = {year for year in self.postings["year"] if low <= int(year) <= high}
+            years = in_range if years is None else years & in_range
+        if years is not None:
+            selections.append(self._union("year", years))
+
+        if not selections:
+            return None
+        allowed = selections[0]
+        for selection in selections[1:]:
+            allowed = np.intersect1d(allowed, selection, assume_unique=True)
+        return allowed
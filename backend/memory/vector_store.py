@@ -1,39 +1,179 @@
+import functools
 import os
+import sys
+import threading
 from typing import List, Dict, Optional
-from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
+import numpy as np
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from dotenv import load_dotenv
+from backend.memory.disk_cache import DiskCache
+from backend.memory.embedding_cache import CachedEmbeddings
+from backend.memory.local_embeddings import DEFAULT_LOCAL_MODEL, SentenceTransformerEmbeddings
+from backend.memory.ann_index import (
+    INDEX_TYPES, DEFAULT_PARAMS, ANNIndex, all_vectors, build_index, filtered_search, index_type, ivf_nlist,
+    snapshot_ids, underlying, wrap_loaded
+)
+from backend.memory.docstore import SQLiteDocstore
+from backend.memory.metadata_index import MetadataIndex, document_facets
+from backend.memory.index_files import IndexDirectory
 
 load_dotenv()
 
+EMBEDDING_BACKENDS = ("openai", "local")
+# Embedder of indexes saved before embedders were recorded (the only one they could be built with)
+LEGACY_EMBEDDER = {"backend": "openai", "model": "text-embedding-3-small"}
+# Vector size of the OpenAI models, known without an embedding request
+OPENAI_DIMENSIONS = {"text-embedding-3-small": 1536, "text-embedding-3-large": 3072, "text-embedding-ada-002": 1536}
+# Reciprocal rank fusion constant (Cormack et al.): damps the weight of the top ranks
+RRF_K = 60
+
+def _faiss():
+    """Import the LangChain FAISS wrapper (and faiss itself) on first use."""
+    from langchain_community.vectorstores import FAISS
+    return FAISS
+
+def synchronized(method):
+    """Run a VectorStoreFAISS method while holding the store's lock."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class VectorStoreFAISS:
     """
     Manages FAISS vector store for semantic search of research papers.
+    
+    Public methods are serialized with a re-entrant lock, so one instance can
+    be shared by concurrent pipelines and request handlers. Texts and queries
+    are embedded before the lock is taken, so slow embedding requests do not
+    hold up other readers and writers.
+    
+    Document text and metadata live in a SQLite docstore and are only read
+    for search hits, so memory scales with the number of vectors rather than
+    the amount of stored text.
+    
+    The index is persisted incrementally (see index_files.IndexDirectory):
+    save_index appends the vectors added and deleted since the last save as
+    a delta segment, and merge_segments folds the segments into a new base
+    snapshot, automatically in the background once merge_after segments
+    have accumulated.
+    
+    index_type selects exact ("flat") or approximate ("hnsw", "ivf") search.
+    Approximate indexes are (re)built from the stored vectors when merging:
+    IVF is trained once enough vectors exist, and vectors removed from an
+    approximate index are purged once they exceed a quarter of the index.
+    
+    Texts are embedded with OpenAI or, with embedding_backend="local", a
+    sentence-transformers model on the CPU. The embedder is recorded in the
+    manifest, and opening an index with a different embedder is refused.
     """
     
-    def __init__(self, index_path: Optional[str] = None):
+    def __init__(self, index_path: Optional[str] = None, batch_size: int = 256,
+                 embedding_cache_path: Optional[str] = None, embeddings: Optional[Embeddings] = None,
+                 embedding_model: Optional[str] = None, merge_after: Optional[int] = 8,
+                 index_type: str = "flat", index_params: Optional[Dict] = None,
+                 embedding_backend: Optional[str] = None, embedding_options: Optional[Dict] = None):
         """
         Initialize vector store manager.
         
         Args:
             index_path: Path to save/load FAISS index
+            batch_size: Maximum number of texts sent per embedding request
+            embedding_cache_path: SQLite file caching embeddings by text hash
+            embeddings: Embedding model to use instead of the backend's (it stands in
+                for embedding_backend / embedding_model when recording the embedder;
+                its cached vectors are kept apart from the backend's by its class)
+            embedding_model: Embedding model name (default: EMBEDDING_MODEL or the backend's default)
+            merge_after: Merge segments in the background once this many exist (None = only on demand)
+            index_type: "flat" (exact), "hnsw" or "ivf"
+            index_params: Overrides of ann_index.DEFAULT_PARAMS (hnsw_m, ef_construction,
+                ef_search, nlist, nprobe)
+            embedding_backend: "openai" or "local" (sentence-transformers on the CPU;
+                default: EMBEDDING_BACKEND or "openai")
+            embedding_options: Local backend settings (batch_size, threads, quantize;
+                default: EMBEDDING_BATCH_SIZE, EMBEDDING_THREADS, EMBEDDING_QUANTIZE)
         """
-        self.embeddings = OpenAIEmbeddings(
-            model="text-embedding-3-small",
-            openai_api_key=os.getenv("OPENAI_API_KEY")
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"index_type must be one of {INDEX_TYPES}, got {index_type!r}")
+        embedding_backend = embedding_backend or os.getenv("EMBEDDING_BACKEND", "openai")
+        if embedding_backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"embedding_backend must be one of {EMBEDDING_BACKENDS}, got {embedding_backend!r}")
+        embedding_model = embedding_model or os.getenv("EMBEDDING_MODEL") or \
+            ("text-embedding-3-small" if embedding_backend == "openai" else DEFAULT_LOCAL_MODEL)
+        options = {
+            "batch_size": int(os.getenv("EMBEDDING_BATCH_SIZE", "32")),
+            "threads": int(os.getenv("EMBEDDING_THREADS", "0")) or None,
+            "quantize": os.getenv("EMBEDDING_QUANTIZE", "0") == "1",
+            **(embedding_options or {})
+        }
+        # Recorded in the manifest so that vectors of different embedders are never mixed
+        self.embedder = {"backend": embedding_backend, "model": embedding_model}
+        if embedding_backend == "local" and options["quantize"]:
+            self.embedder["quantized"] = True
+        # OpenAI vectors keep the plain model name used by earlier versions
+        namespace = embedding_model if embedding_backend == "openai" else self._embedder_name(self.embedder)
+        if embeddings is not None:
+            # An injected embedder need not produce embedding_model's vectors: never share its cache entries
+            embedder_class = type(embeddings)
+            namespace = f"{self._embedder_name(self.embedder)}:{embedder_class.__module__}.{embedder_class.__qualname__}"
+        else:
+            # The client / model is only built once a text misses the embedding cache
+            if embedding_backend == "openai":
+                def embeddings():
+                    from langchain_openai import OpenAIEmbeddings
+                    from backend.llm_client import RateLimitedEmbeddings
+                    # Requests share the process-wide OpenAI rate limiter, which also does the retries
+                    return RateLimitedEmbeddings(OpenAIEmbeddings(
+                        model=embedding_model,
+                        openai_api_key=os.getenv("OPENAI_API_KEY"),
+                        max_retries=0
+                    ), embedding_model)
+            else:
+                embeddings = SentenceTransformerEmbeddings(embedding_model, **options)
+        self.embeddings = CachedEmbeddings(
+            embeddings,
+            DiskCache(embedding_cache_path or os.getenv(
+                "EMBEDDING_CACHE_PATH", "backend/memory/cache/embeddings.sqlite"
+            )),
+            namespace=namespace,
+            batch_size=batch_size
         )
         self.index_path = index_path or "backend/memory/faiss_index"
         self.vector_store = None
+        self._lock = threading.RLock()
+        # paper_id / entry_id -> FAISS vector slot
+        self.id_to_slot: Dict[str, int] = {}
+        # Slots per category / year / author, built on the first filtered search
+        self._metadata_index: Optional[MetadataIndex] = None
+        self.merge_after = merge_after
+        self.index_type = index_type
+        self.index_params = {**DEFAULT_PARAMS, **(index_params or {})}
+        self._files = IndexDirectory(self.index_path)
+        self.docstore = SQLiteDocstore(self._files.docstore_path, key_func=self._document_key)
+        self._manifest: Optional[Dict] = None
+        # Changes since the last save: docstore ids added (in order) and deleted
+        self._added: Dict[str, None] = {}
+        self._deleted = set()
+        self._needs_rewrite = False
+        self._merge_lock = threading.Lock()
+        self._merging: Optional[str] = None
+        # Bumped by full rewrites so that a concurrent merge discards its stale base
+        self._epoch = 0
         
         # Try to load existing index
-        if os.path.exists(self.index_path):
+        manifest = self.docstore.read_manifest()
+        if manifest is not None or self._files.has_legacy_snapshot():
             self.load_index()
     
     def add(self, texts: List[str], metadatas: List[str] = None) -> None:
         """
         Add texts to vector store (used by pipeline_graph.py)
         
+        All texts are embedded together in as few batched requests as
+        possible; texts embedded before are served from the cache.
+        
         Args:
             texts: List of text strings to add
             metadatas: List of metadata (paper IDs) for each text
@@ -48,14 +188,34 @@ class VectorStoreFAISS:
         
         documents = [Document(page_content=text, metadata=meta) 
                     for text, meta in zip(texts, metadatas)]
-        
-        if self.vector_store is None:
-            self.vector_store = FAISS.from_documents(documents, self.embeddings)
-        else:
-            self.vector_store.add_documents(documents)
+        vectors = self._embed(documents)
+        with self._lock:
+            self._add_documents(documents, vectors=vectors)
         
         print(f"[VECTOR STORE] Added {len(documents)} items to index")
     
+    @staticmethod
+    def _paper_document(paper: Dict) -> Document:
+        """Build the document stored for a paper from search_api."""
+        content = f"""
+            Title: {paper['title']}
+            Authors: {', '.join(paper['authors'])}
+            Published: {paper.get('published', 'N/A')}
+            Categories: {', '.join(paper.get('categories', []))}
+            Summary: {paper['summary']}
+            """
+        
+        metadata = {
+            "title": paper['title'],
+            "authors": paper['authors'],
+            "pdf_url": paper['pdf_url'],
+            "entry_id": paper.get('entry_id', ''),
+            "published": paper.get('published', ''),
+            "categories": paper.get('categories', [])
+        }
+        
+        return Document(page_content=content, metadata=metadata)
+    
     def add_papers(self, papers: List[Dict]) -> None:
         """
         Add research papers to the vector store.
@@ -66,53 +226,326 @@ class VectorStoreFAISS:
         if not papers:
             return
         
-        documents = []
-        for paper in papers:
-            # Create document with paper content
-            content = f"""
-            Title: {paper['title']}
-            Authors: {', '.join(paper['authors'])}
-            Published: {paper.get('published', 'N/A')}
-            Categories: {', '.join(paper.get('categories', []))}
-            Summary: {paper['summary']}
-            """
-            
-            metadata = {
-                "title": paper['title'],
-                "authors": paper['authors'],
-                "pdf_url": paper['pdf_url'],
-                "entry_id": paper.get('entry_id', ''),
-                "published": paper.get('published', ''),
-                "categories": paper.get('categories', [])
-            }
+        documents = [self._paper_document(paper) for paper in papers]
+        vectors = self._embed(documents)
+        with self._lock:
+            self._add_documents(documents, vectors=vectors)
+        
+        print(f"[VECTOR STORE] Added {len(documents)} papers to index")
+    
+    @staticmethod
+    def _embedder_name(embedder: Dict) -> str:
+        """Readable embedder identifier, e.g. local/all-MiniLM-L6-v2+int8."""
+        return f"{embedder['backend']}/{embedder['model']}{'+int8' if embedder.get('quantized') else ''}"
+    
+    def _embedding_dimensions(self) -> int:
+        """Size of this store's vectors (without an embedding request when it is known)."""
+        dimensions = getattr(self.embeddings.embeddings, "dimensions", None)
+        if isinstance(dimensions, int):
+            return dimensions
+        if self.embedder["backend"] == "openai" and self.embedder["model"] in OPENAI_DIMENSIONS:
+            return OPENAI_DIMENSIONS[self.embedder["model"]]
+        return len(self.embeddings.embed_query("dimensions"))
+    
+    def _check_embedder(self, recorded: Dict, dimensions: Optional[int] = None) -> None:
+        """
+        Refuse an index built with another embedder.
+        
+        Args:
+            recorded: Embedder recorded for the index (LEGACY_EMBEDDER if none was)
+            dimensions: Size of the index's vectors, if any are stored
             
-            doc = Document(page_content=content, metadata=metadata)
-            documents.append(doc)
+        Raises:
+            ValueError: If the embedder or the vector size differs from this store's
+        """
+        if recorded != self.embedder:
+            raise ValueError(
+                f"Index at {self.index_path} was built with {self._embedder_name(recorded)}, "
+                f"not {self._embedder_name(self.embedder)}; use another index_path or the same embedder"
+            )
+        if dimensions is not None and dimensions != self._embedding_dimensions():
+            raise ValueError(
+                f"Index at {self.index_path} holds {dimensions}-dimensional vectors, but "
+                f"{self._embedder_name(self.embedder)} produces {self._embedding_dimensions()}; "
+                f"use another index_path or the same embedder"
+            )
+    
+    @staticmethod
+    def _document_key(metadata: Dict) -> Optional[str]:
+        """Get the paper_id / entry_id identifying a stored document."""
+        return metadata.get("paper_id") or metadata.get("entry_id") or None
+    
+    def _update_slot_map(self, start_slot: int = 0) -> None:
+        """
+        Refresh the id -> slot map for slots >= start_slot.
         
-        # Create or update vector store
+        Args:
+            start_slot: First slot to (re)index; 0 rebuilds the whole map
+        """
+        if start_slot == 0:
+            self.id_to_slot = {}
         if self.vector_store is None:
-            self.vector_store = FAISS.from_documents(documents, self.embeddings)
+            return
+        index_to_docstore_id = self.vector_store.index_to_docstore_id
+        keys = self.docstore.keys(
+            None if start_slot == 0 else [index_to_docstore_id[slot] for slot in range(start_slot, len(index_to_docstore_id))]
+        )
+        for slot, docstore_id in sorted(index_to_docstore_id.items()):
+            if slot < start_slot:
+                continue
+            key = keys.get(docstore_id)
+            if key:
+                self.id_to_slot[key] = slot
+    
+    def _embed(self, documents: List[Document], vectors: Optional[List] = None,
+               skip_stored: bool = False) -> List[Optional[List[float]]]:
+        """
+        Embed documents that have no vector yet.
+        
+        Called without the store lock for the bulk of the work; documents
+        are only embedded under the lock when the store changed meanwhile.
+        
+        Args:
+            documents: Documents to embed
+            vectors: Vectors already computed per document (None entries are embedded)
+            skip_stored: Leave documents whose paper_id / entry_id is already stored unembedded
+            
+        Returns:
+            Vector per document (None for skipped ones)
+        """
+        vectors = list(vectors) if vectors is not None else [None] * len(documents)
+        stored = set()
+        if skip_stored:
+            with self._lock:
+                stored = {key for key in map(self._document_key, (doc.metadata for doc in documents))
+                          if key in self.id_to_slot}
+        missing = [i for i, (doc, vector) in enumerate(zip(documents, vectors))
+                   if vector is None and self._document_key(doc.metadata) not in stored]
+        if missing:
+            embedded = self.embeddings.embed_documents([documents[i].page_content for i in missing])
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+        return vectors
+    
+    def _query_vector(self, query: str) -> Optional[List[float]]:
+        """Embed a search query (None while the store is empty)."""
+        if self.vector_store is None:
+            return None
+        return self.embeddings.embed_query(query)
+    
+    def _add_documents(self, documents: List[Document], ids: Optional[List[str]] = None,
+                       vectors: Optional[List] = None) -> None:
+        """Add documents with their vectors (embedding missing ones), recording them for the next save."""
+        text_embeddings = list(zip((doc.page_content for doc in documents), self._embed(documents, vectors)))
+        metadatas = [doc.metadata for doc in documents]
+        if self.vector_store is None:
+            start_slot = 0
+            self.vector_store = _faiss().from_embeddings(text_embeddings, self.embeddings, metadatas=metadatas,
+                                                         ids=ids, docstore=self.docstore)
+            if self.index_type != "flat":
+                self._rebuild()
+            self._metadata_index = None
         else:
-            self.vector_store.add_documents(documents)
+            start_slot = len(self.vector_store.index_to_docstore_id)
+            self.vector_store.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+            if self._metadata_index is not None:
+                self._metadata_index.add(document_facets(doc.metadata) for doc in documents)
+        self._update_slot_map(start_slot)
+        index_to_docstore_id = self.vector_store.index_to_docstore_id
+        for slot in range(start_slot, len(index_to_docstore_id)):
+            self._added[index_to_docstore_id[slot]] = None
+    
+    def _delete(self, docstore_ids: List[str]) -> None:
+        """Delete documents by docstore id, recording them for the next save."""
+        if self._metadata_index is not None:
+            deleted = set(docstore_ids)
+            slots = [slot for slot, docstore_id in self.vector_store.index_to_docstore_id.items()
+                     if docstore_id in deleted]
+        self.vector_store.delete(docstore_ids)
+        if self._metadata_index is not None:
+            self._metadata_index.remove(slots)
+        self._update_slot_map()
+        for docstore_id in docstore_ids:
+            self._added.pop(docstore_id, None)
+            self._deleted.add(docstore_id)
+    
+    def _upsert_documents(self, documents: List[Document], on_conflict: str,
+                          vectors: Optional[List] = None) -> Dict[str, int]:
+        """
+        Insert documents keyed by paper_id / entry_id.
         
-        print(f"[VECTOR STORE] Added {len(documents)} papers to index")
+        Args:
+            documents: Documents whose metadata carries paper_id or entry_id
+            on_conflict: "replace" to overwrite existing entries, "skip" to keep them
+            vectors: Precomputed vector per document (None entries are embedded)
+            
+        Returns:
+            Counts of added, replaced and skipped documents
+        """
+        # Last occurrence wins for ids repeated within the batch
+        batch = {}
+        for doc, vector in zip(documents, vectors or [None] * len(documents)):
+            batch[self._document_key(doc.metadata)] = (doc, vector)
+        
+        counts = {"added": 0, "replaced": 0, "skipped": len(documents) - len(batch)}
+        existing = [key for key in batch if key in self.id_to_slot]
+        if on_conflict == "skip":
+            for key in existing:
+                del batch[key]
+            counts["skipped"] += len(existing)
+        elif existing:
+            index_to_docstore_id = self.vector_store.index_to_docstore_id
+            self._delete([index_to_docstore_id[self.id_to_slot[key]] for key in existing])
+            counts["replaced"] = len(existing)
+        counts["added"] = len(batch) - counts["replaced"]
+        
+        if batch:
+            self._add_documents([doc for doc, _ in batch.values()], ids=list(batch.keys()),
+                                vectors=[vector for _, vector in batch.values()])
+        
+        return counts
+    
+    def upsert(self, texts: List[str], paper_ids: List[str], metadatas: Optional[List[Dict]] = None,
+               on_conflict: str = "replace") -> Dict[str, int]:
+        """
+        Idempotently store texts keyed by paper_id.
+        
+        Args:
+            texts: List of text strings to store
+            paper_ids: Paper ID of each text
+            metadatas: Optional extra metadata for each text
+            on_conflict: "replace" to overwrite existing entries, "skip" to keep them
+            
+        Returns:
+            Counts of added, replaced and skipped entries
+        """
+        if not texts:
+            return {"added": 0, "replaced": 0, "skipped": 0}
+        
+        metadatas = metadatas or [{} for _ in texts]
+        documents = [Document(page_content=text, metadata={**meta, "paper_id": paper_id})
+                     for text, paper_id, meta in zip(texts, paper_ids, metadatas)]
+        counts = self._embed_and_upsert(documents, on_conflict)
+        print(f"[VECTOR STORE] Upserted items: {counts['added']} added, "
+              f"{counts['replaced']} replaced, {counts['skipped']} skipped")
+        return counts
+    
+    def _embed_and_upsert(self, documents: List[Document], on_conflict: str) -> Dict[str, int]:
+        """Embed documents without the lock, then upsert them under it."""
+        if on_conflict not in ("replace", "skip"):
+            raise ValueError(f"on_conflict must be 'replace' or 'skip', got {on_conflict!r}")
+        vectors = self._embed(documents, skip_stored=on_conflict == "skip")
+        with self._lock:
+            return self._upsert_documents(documents, on_conflict, vectors)
+    
+    def upsert_papers(self, papers: List[Dict], on_conflict: str = "replace") -> Dict[str, int]:
+        """
+        Idempotently store research papers keyed by entry_id.
+        
+        Args:
+            papers: List of paper dictionaries from search_api
+            on_conflict: "replace" to overwrite existing entries, "skip" to keep them
+            
+        Returns:
+            Counts of added, replaced and skipped papers
+        """
+        if not papers:
+            return {"added": 0, "replaced": 0, "skipped": 0}
+        
+        documents = [self._paper_document(paper) for paper in papers]
+        counts = self._embed_and_upsert(documents, on_conflict)
+        print(f"[VECTOR STORE] Upserted papers: {counts['added']} added, "
+              f"{counts['replaced']} replaced, {counts['skipped']} skipped")
+        return counts
+    
+    @synchronized
+    def contains(self, paper_id: str) -> bool:
+        """Check whether a paper_id / entry_id is stored in the index."""
+        return paper_id in self.id_to_slot
+    
+    @synchronized
+    def compact(self) -> int:
+        """
+        Remove duplicate entries left by earlier append-only runs.
+        
+        For every paper_id / entry_id only the most recently added vector is
+        kept; entries without an id are left untouched.
+        
+        Returns:
+            Number of removed duplicates
+        """
+        if self.vector_store is None:
+            return 0
+        
+        keys = self.docstore.keys()
+        latest = {}
+        duplicates = []
+        for slot, docstore_id in sorted(self.vector_store.index_to_docstore_id.items()):
+            key = keys.get(docstore_id)
+            if not key:
+                continue
+            if key in latest:
+                duplicates.append(latest[key])
+            latest[key] = docstore_id
+        
+        if duplicates:
+            self._delete(duplicates)
+        print(f"[VECTOR STORE] Compaction removed {len(duplicates)} duplicates")
+        return len(duplicates)
+    
+    def _metadata(self) -> MetadataIndex:
+        """Get the category / year / author index, building it from the docstore if needed."""
+        size = len(self.vector_store.index_to_docstore_id)
+        if self._metadata_index is None or self._metadata_index.size != size:
+            ids = [self.vector_store.index_to_docstore_id[slot] for slot in range(size)]
+            metadatas = self.docstore.metadatas(ids)
+            self._metadata_index = MetadataIndex()
+            self._metadata_index.add(document_facets(metadatas.get(docstore_id, {})) for docstore_id in ids)
+        return self._metadata_index
     
-    def similarity_search(self, query: str, k: int = 5) -> List[Dict]:
+    def _vector_search(self, query: str, vector: Optional[List[float]], k: int,
+                       filters: Optional[Dict] = None) -> List[tuple]:
+        """
+        Search by query vector, only over the entries matching metadata filters if given.
+        
+        Args:
+            query: Search query, embedded if vector is None
+            vector: Query embedding computed before taking the lock
+            k: Number of results to return
+            filters: Metadata filters (see similarity_search)
+        
+        Returns:
+            List of tuples (document, L2 distance), best first
+        """
+        if vector is None:
+            vector = self.embeddings.embed_query(query)
+        allowed = self._metadata().allowed(filters) if filters else None
+        if allowed is None:
+            return self.vector_store.similarity_search_with_score_by_vector(vector, k=k)
+        distances, slots = filtered_search(self.vector_store.index, np.array([vector], dtype=np.float32), k, allowed)
+        return [(self.docstore.search(self.vector_store.index_to_docstore_id[slot]), float(distance))
+                for distance, slot in zip(distances[0].tolist(), slots[0].tolist()) if slot >= 0]
+    
+    def similarity_search(self, query: str, k: int = 5, filters: Optional[Dict] = None) -> List[Dict]:
         """
         Perform semantic similarity search.
         
         Args:
             query: Search query
             k: Number of results to return
+            filters: Restrict results by metadata, e.g. {"category": ["cs.CL", "cs.LG"],
+                "year_from": 2020, "author": "Yoshua Bengio"} (see MetadataIndex.allowed)
             
         Returns:
             List of matching papers with metadata
         """
-        if self.vector_store is None:
-            print("[VECTOR STORE] No papers in index yet")
-            return []
-        
-        results = self.vector_store.similarity_search(query, k=k)
+        vector = self._query_vector(query)
+        with self._lock:
+            if self.vector_store is None:
+                print("[VECTOR STORE] No papers in index yet")
+                return []
+            
+            results = [doc for doc, _ in self._vector_search(query, vector, k, filters)]
         
         papers = []
         for doc in results:
@@ -120,22 +553,25 @@ class VectorStoreFAISS:
         
         return papers
     
-    def similarity_search_with_score(self, query: str, k: int = 5) -> List[tuple]:
+    def similarity_search_with_score(self, query: str, k: int = 5, filters: Optional[Dict] = None) -> List[tuple]:
         """
         Perform semantic search with relevance scores.
         
         Args:
             query: Search query
             k: Number of results to return
+            filters: Restrict results by category, year or author (see similarity_search)
             
         Returns:
             List of tuples (paper_metadata, score)
         """
-        if self.vector_store is None:
-            print("[VECTOR STORE] No papers in index yet")
-            return []
-        
-        results = self.vector_store.similarity_search_with_score(query, k=k)
+        vector = self._query_vector(query)
+        with self._lock:
+            if self.vector_store is None:
+                print("[VECTOR STORE] No papers in index yet")
+                return []
+            
+            results = self._vector_search(query, vector, k, filters)
         
         papers_with_scores = []
         for doc, score in results:
@@ -143,25 +579,384 @@ class VectorStoreFAISS:
         
         return papers_with_scores
     
-    def save_index(self) -> None:
-        """Save FAISS index to disk."""
+    @synchronized
+    def lexical_search(self, query: str, k: int = 5) -> List[tuple]:
+        """
+        Perform keyword search (BM25 over the stored text).
+        
+        Finds exact terms such as method and dataset names or arXiv ids that
+        dense retrieval may miss.
+        
+        Args:
+            query: Search query
+            k: Number of results to return
+            
+        Returns:
+            List of tuples (paper_metadata, bm25_score)
+        """
+        return [(self.docstore.search(docstore_id).metadata, score)
+                for docstore_id, score in self.docstore.lexical_search(query, k)]
+    
+    def hybrid_search(self, query: str, k: int = 5, lexical_weight: float = 0.5,
+                      fetch_k: Optional[int] = None) -> List[tuple]:
+        """
+        Perform hybrid search fusing vector and BM25 keyword rankings.
+        
+        The top fetch_k results of both retrievers are combined with
+        weighted reciprocal rank fusion, so an entry ranked high by either
+        one (e.g. an exact arXiv id match) makes it into the results without
+        calibrating L2 distances against BM25 scores. Only the fused top k
+        documents are read from the docstore.
+        
+        Args:
+            query: Search query
+            k: Number of results to return
+            lexical_weight: Weight of the keyword ranking (0 = vector only, 1 = keyword only)
+            fetch_k: Candidates taken from each retriever (default max(4 * k, 20))
+            
+        Returns:
+            List of tuples (paper_metadata, fused_score), best first
+        """
+        vector = self._query_vector(query) if lexical_weight < 1 else None
+        with self._lock:
+            if self.vector_store is None:
+                print("[VECTOR STORE] No papers in index yet")
+                return []
+            fetch_k = fetch_k or max(4 * k, 20)
+            
+            dense = []
+            index = self.vector_store.index
+            if lexical_weight < 1 and index.ntotal:
+                if vector is None:
+                    vector = self.embeddings.embed_query(query)
+                _, slots = index.search(np.array([vector], dtype=np.float32), min(fetch_k, index.ntotal))
+                dense = [self.vector_store.index_to_docstore_id[slot] for slot in slots[0].tolist() if slot >= 0]
+            lexical = [docstore_id for docstore_id, _ in self.docstore.lexical_search(query, fetch_k)] \
+                if lexical_weight > 0 else []
+            
+            scores: Dict[str, float] = {}
+            for weight, ranking in ((1 - lexical_weight, dense), (lexical_weight, lexical)):
+                for rank, docstore_id in enumerate(ranking, start=1):
+                    scores[docstore_id] = scores.get(docstore_id, 0.0) + weight / (RRF_K + rank)
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            return [(self.docstore.search(docstore_id).metadata, score) for docstore_id, score in best]
+    
+    def recall_analyses(self, query: str, k: int = 5, min_similarity: float = 0.5) -> List[Dict]:
+        """
+        Find stored paper analyses relevant to a query.
+        
+        Only entries written by the pipeline's memory stage (which carry the
+        extraction and title) are considered. Similarity is the cosine
+        similarity derived from the L2 distance of the normalized embeddings.
+        
+        Args:
+            query: Search query
+            k: Maximum number of analyses to return
+            min_similarity: Minimum cosine similarity (0-1) of a reused analysis
+            
+        Returns:
+            List of analysis dictionaries (with a 'similarity' key), best first
+        """
+        vector = self._query_vector(query)
+        with self._lock:
+            if self.vector_store is None:
+                return []
+            
+            # Over-fetch since raw paper entries and older analyses are skipped
+            results = self._vector_search(query, vector, k * 4)
+        
+        analyses = []
+        for doc, distance in results:
+            similarity = 1 - float(distance) / 2
+            if similarity < min_similarity or "extraction" not in doc.metadata:
+                continue
+            analyses.append({
+                **doc.metadata,
+                'analysis': doc.page_content,
+                'similarity': similarity
+            })
+            if len(analyses) == k:
+                break
+        
+        return analyses
+    
+    def _rebuild(self) -> None:
+        """Rebuild the in-memory index as index_type from its live vectors (slots keep their order)."""
+        self.vector_store.index = build_index(
+            self.index_type, all_vectors(self.vector_store.index), self.index_params
+        )
+    
+    def _wants_rebuild(self) -> bool:
+        """Whether the index should be rebuilt: wrong type, trainable IVF or too many tombstones."""
+        if self.vector_store is None:
+            return False
+        index = self.vector_store.index
+        current = index_type(index)
+        if current != self.index_type:
+            return self.index_type != "ivf" or ivf_nlist(index.ntotal, self.index_params["nlist"]) >= 2
+        return isinstance(index, ANNIndex) and index.tombstones > index.ntotal / 4
+    
+    @synchronized
+    def rebuild_index(self) -> str:
+        """
+        Rebuild the index as the configured index_type (e.g. to train IVF on
+        the stored vectors or to switch types); written in full on next save.
+        
+        Returns:
+            Type of the rebuilt index ("flat" while IVF has too few vectors)
+        """
         if self.vector_store is not None:
-            self.vector_store.save_local(self.index_path)
-            print(f"[VECTOR STORE] Index saved to {self.index_path}")
+            self._rebuild()
+            self._needs_rewrite = True
+        current = index_type(self.vector_store.index) if self.vector_store is not None else self.index_type
+        print(f"[VECTOR STORE] Index rebuilt as {current}")
+        return current
+    
+    @synchronized
+    def set_search_params(self, ef_search: Optional[int] = None, nprobe: Optional[int] = None) -> None:
+        """
+        Tune approximate search (no effect on a flat index).
+        
+        Args:
+            ef_search: HNSW candidate list size (higher = better recall, slower)
+            nprobe: IVF cells visited per query (higher = better recall, slower)
+        """
+        if ef_search is not None:
+            self.index_params["ef_search"] = ef_search
+        if nprobe is not None:
+            self.index_params["nprobe"] = nprobe
+        if self.vector_store is not None and isinstance(self.vector_store.index, ANNIndex):
+            self.vector_store.index.ef_search = self.index_params["ef_search"]
+            self.vector_store.index.nprobe = self.index_params["nprobe"]
+    
+    def _index_info(self) -> Dict:
+        """Index description recorded in the manifest."""
+        kind = index_type(self.vector_store.index) if self.vector_store is not None else self.index_type
+        return {"type": kind, **{key: value for key, value in self.index_params.items() if value is not None}}
+    
+    def _snapshot(self):
+        """Serialize the in-memory index with the docstore id of every vector (None for tombstones)."""
+        import faiss
+        if self.vector_store is None:
+            return None
+        index = self.vector_store.index
+        index_to_docstore_id = self.vector_store.index_to_docstore_id
+        slot_ids = [index_to_docstore_id[slot] for slot in range(len(index_to_docstore_id))]
+        return (
+            faiss.serialize_index(underlying(index)).tobytes(),
+            snapshot_ids(index, slot_ids)
+        )
+    
+    def _next_name(self, prefix: str) -> str:
+        name = f"{prefix}-{self._manifest['next_id']:06d}"
+        self._manifest["next_id"] += 1
+        return name
+    
+    def _rewrite(self) -> None:
+        """Persist the whole store as a new base (first save, legacy index, after clear)."""
+        self._manifest = self._manifest or {"version": 1, "base": None, "segments": [], "next_id": 1}
+        snapshot = self._snapshot()
+        base = self._next_name("base") if snapshot else None
+        if snapshot:
+            self._files.write_base(base, *snapshot)
+        self._manifest = {**self._manifest, "base": base, "segments": [], "index": self._index_info(),
+                          "embedder": self.embedder}
+        self.docstore.commit(self._manifest)
+        keep = [self._merging, f".{self._merging}.tmp"] if self._merging else []
+        self._files.remove_unreferenced(self._manifest, keep=keep)
+        self._added, self._deleted = {}, set()
+        self._needs_rewrite = False
+        self._epoch += 1
+        print(f"[VECTOR STORE] Index saved to {self.index_path}")
+    
+    def _write_segment(self) -> None:
+        """Append the changes since the last save as a delta segment."""
+        slots = {docstore_id: slot for slot, docstore_id in self.vector_store.index_to_docstore_id.items()} \
+            if self.vector_store is not None else {}
+        ids = [docstore_id for docstore_id in self._added if docstore_id in slots]
+        if ids:
+            vectors = self.vector_store.index.reconstruct_batch(np.array([slots[i] for i in ids], dtype=np.int64))
+        else:
+            vectors = np.zeros((0, 0), dtype=np.float32)
+        
+        # The segment file is in place before the docstore commits its documents
+        # together with the manifest that references it
+        name = self._next_name("seg") + ".npz"
+        size = self._files.write_segment(name, vectors, ids, sorted(self._deleted))
+        self._manifest = {**self._manifest, "segments": self._manifest["segments"] + [name]}
+        self.docstore.commit(self._manifest)
+        print(f"[VECTOR STORE] Saved segment {name}: {len(ids)} added, "
+              f"{len(self._deleted)} deleted, {size} bytes")
+        self._added, self._deleted = {}, set()
+    
+    @synchronized
+    def save_index(self) -> None:
+        """
+        Save FAISS index to disk.
+        
+        Only the vectors added and deleted since the last save are written,
+        as a new delta segment, so the cost scales with the size of the
+        change. The first save (and the first save after clear_index or of
+        an index in the old single-snapshot format) writes a full base
+        snapshot instead. Saving an unchanged store is a no-op.
+        """
+        if self._manifest is None or self._needs_rewrite:
+            if self.vector_store is not None or self._needs_rewrite:
+                self._rewrite()
+            return
+        if not self._added and not self._deleted:
+            return
+        self._write_segment()
+        
+        if self.merge_after and len(self._manifest["segments"]) >= self.merge_after \
+                and not self._merge_lock.locked():
+            threading.Thread(target=self.merge_segments, daemon=True).start()
     
+    def merge_segments(self) -> int:
+        """
+        Fold all delta segments into a new base snapshot.
+        
+        Pending changes are saved first. The snapshot is taken under the
+        store lock but written to disk without it, so searches and inserts
+        continue while a merge runs; segments saved meanwhile stay in the
+        manifest after the new base. The index is rebuilt first when it is
+        not yet of the configured index_type or holds too many tombstones.
+        
+        Returns:
+            Number of merged segments
+        """
+        with self._merge_lock:
+            with self._lock:
+                if self._manifest is None or self._needs_rewrite:
+                    self.save_index()
+                    return 0
+                self.save_index()
+                merged = list(self._manifest["segments"])
+                rebuild = self._wants_rebuild()
+                if not merged and not rebuild:
+                    return 0
+                if rebuild:
+                    self._rebuild()
+                snapshot = self._snapshot()
+                base = self._next_name("base") if snapshot else None
+                self._merging = base
+                epoch = self._epoch
+            
+            try:
+                if snapshot:
+                    self._files.write_base(base, *snapshot)
+            finally:
+                with self._lock:
+                    self._merging = None
+            
+            with self._lock:
+                if epoch != self._epoch:
+                    # The store was rewritten meanwhile; this base is stale
+                    if base:
+                        self._files.remove(base)
+                    return 0
+                self._manifest = {
+                    **self._manifest,
+                    "base": base,
+                    "segments": [name for name in self._manifest["segments"] if name not in merged],
+                    "index": self._index_info()
+                }
+                # Document changes made since the snapshot belong to a later segment
+                self.docstore.commit(self._manifest, include_changes=False)
+                self._files.remove_unreferenced(self._manifest)
+            print(f"[VECTOR STORE] Merged {len(merged)} segments into {base}")
+            return len(merged)
+    
+    def _load(self, manifest: Dict) -> None:
+        """Rebuild the index from a base snapshot and delta segments."""
+        import faiss
+        index, ids = None, []
+        if manifest["base"]:
+            index, ids = wrap_loaded(*self._files.read_base(manifest["base"]), self.index_params)
+        for name in manifest["segments"]:
+            segment = self._files.read_segment(name)
+            if index is not None and segment["deletes"]:
+                deleted = set(segment["deletes"])
+                slots = [slot for slot, docstore_id in enumerate(ids) if docstore_id in deleted]
+                if slots:
+                    index.remove_ids(np.array(slots, dtype=np.int64))
+                    ids = [docstore_id for docstore_id in ids if docstore_id not in deleted]
+            if segment["ids"]:
+                if index is None:
+                    index = faiss.IndexFlatL2(segment["vectors"].shape[1])
+                index.add(segment["vectors"])
+                ids.extend(segment["ids"])
+        if index is not None:
+            self.vector_store = _faiss()(self.embeddings, index, self.docstore, dict(enumerate(ids)))
+            if index_type(index) != self.index_type:
+                print(f"[VECTOR STORE] Index is {index_type(index)}; rebuilt as {self.index_type} on next merge")
+    
+    def _load_legacy(self) -> None:
+        """
+        Load a snapshot written by FAISS.save_local (pickled docstore) and move
+        its documents into the SQLite docstore; it is rewritten on next save.
+        """
+        self.vector_store = _faiss().load_local(
+            self.index_path, self.embeddings, allow_dangerous_deserialization=True
+        )
+        legacy_docstore = self.vector_store.docstore
+        self.docstore.clear()
+        self.docstore.add({docstore_id: legacy_docstore.search(docstore_id)
+                           for docstore_id in self.vector_store.index_to_docstore_id.values()})
+        self.vector_store.docstore = self.docstore
+        self._manifest = {"version": 1, "base": None, "segments": [], "next_id": 1}
+        self._needs_rewrite = True
+    
+    @synchronized
     def load_index(self) -> None:
-        """Load FAISS index from disk."""
+        """
+        Load FAISS index from disk (base snapshot plus delta segments).
+        
+        Raises:
+            ValueError: If the index was built with another embedder
+        """
+        self.vector_store = None
+        self._metadata_index = None
+        self._added, self._deleted = {}, set()
+        manifest = self.docstore.read_manifest()
+        self._check_embedder(manifest.get("embedder", LEGACY_EMBEDDER) if manifest else LEGACY_EMBEDDER)
         try:
-            self.vector_store = FAISS.load_local(
-                self.index_path, 
-                self.embeddings,
-                allow_dangerous_deserialization=True
-            )
-            print(f"[VECTOR STORE] Index loaded from {self.index_path}")
+            if manifest is None:
+                self._load_legacy()
+            else:
+                self._load(manifest)
+                self._manifest = {**manifest, "embedder": self.embedder}
         except Exception as e:
             print(f"[VECTOR STORE] Could not load index: {e}")
+            return
+        if self.vector_store is not None:
+            try:
+                self._check_embedder(self.embedder, self.vector_store.index.d)
+            except ValueError:
+                # Never write this store's vectors into the other embedder's index
+                self.vector_store, self._manifest = None, None
+                raise
+        self._update_slot_map()
+        print(f"[VECTOR STORE] Index loaded from {self.index_path}")
     
+    @synchronized
     def clear_index(self) -> None:
         """Clear the vector store."""
         self.vector_store = None
+        self.id_to_slot = {}
+        self._metadata_index = None
+        self.docstore.clear()
+        self._added, self._deleted = {}, set()
+        self._needs_rewrite = True
         print("[VECTOR STORE] Index cleared")
+
+
+if __name__ == "__main__":
+    # Usage: python -m backend.memory.vector_store compact|merge [index_path]
+    if len(sys.argv) < 2 or sys.argv[1] not in ("compact", "merge"):
+        print("Usage: python -m backend.memory.vector_store compact|merge [index_path]")
+        sys.exit(1)
+    store = VectorStoreFAISS(index_path=sys.argv[2] if len(sys.argv) > 2 else None, merge_after=None)
+    if sys.argv[1] == "compact":
+        store.compact()
+    store.merge_segments()
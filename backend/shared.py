@@ -0,0 +1,74 @@
+"""
+Process-wide shared resources.
+
+Front ends that serve several users from one process (the Streamlit app,
+the HTTP service) attach to the objects registered here instead of
+building their own, so every session shares one loaded FAISS index, one
+set of LLM clients and one compiled graph per option combination.
+
+The LLM clients are module-level singletons in backend.llm_client and are
+shared by every pipeline; this module only registers the vector stores and
+compiled pipelines. All accessors are thread-safe.
+"""
+import os
+import threading
+from typing import Dict, Tuple
+
+from backend.memory.vector_store import VectorStoreFAISS
+
+_lock = threading.Lock()
+_vector_stores: Dict[str, VectorStoreFAISS] = {}
+_pipelines: Dict[Tuple, object] = {}
+
+
+def get_vector_store(index_path: str = "backend/memory/faiss_index", **kwargs) -> VectorStoreFAISS:
+    """
+    Get the shared vector store for an index path, loading it on first use.
+
+    VectorStoreFAISS serializes its own methods, so the returned store can be
+    used (and saved) from any number of sessions concurrently.
+
+    Args:
+        index_path: Path of the FAISS index
+        **kwargs: Extra VectorStoreFAISS arguments (only used on first load)
+
+    Returns:
+        The store shared by every caller using this path
+    """
+    key = os.path.abspath(index_path)
+    with _lock:
+        if key not in _vector_stores:
+            _vector_stores[key] = VectorStoreFAISS(index_path=index_path, **kwargs)
+        return _vector_stores[key]
+
+
+def get_pipeline(vector_store: VectorStoreFAISS, **options):
+    """
+    Get the compiled pipeline for a vector store and create_pipeline options.
+
+    Compiled graphs are stateless between invocations, so one graph per
+    option combination is safely shared by concurrent runs.
+
+    Args:
+        vector_store: Store the pipeline writes to
+        **options: Keyword arguments for create_pipeline
+
+    Returns:
+        Compiled LangGraph pipeline
+    """
+    # LangGraph is only imported once a session actually runs a pipeline
+    from backend.graph.pipeline_graph import create_pipeline
+
+    key = (id(vector_store), tuple(sorted(options.items())))
+    with _lock:
+        if key not in _pipelines:
+            _pipelines[key] = create_pipeline(vector_store, **options)
+        return _pipelines[key]
+
+
+def save_all() -> None:
+    """Persist every shared vector store (unchanged stores are skipped)."""
+    with _lock:
+        stores = list(_vector_stores.values())
+    for store in stores:
+        store.save_index()
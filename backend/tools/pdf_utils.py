@@ -0,0 +1,398 @@
+"""
+PDF full-text ingestion.
+
+Downloads paper PDFs concurrently over pooled HTTP connections into a
+content-addressed on-disk cache and extracts their text page by page in a
+process pool, so the CPU-bound pypdf work runs on every core. Extracted
+pages are stored next to the PDF as JSON lines and read back as a stream,
+so neither a whole PDF nor a whole paper's text has to be held in memory.
+
+Usage:
+    with PDFIngestor() as ingestor:
+        for paper, digest in ingestor.ingest(papers):
+            if digest:
+                for page in ingestor.pages(digest):
+                    ...
+"""
+import contextvars
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from backend.memory.disk_cache import DiskCache
+from backend.instrumentation import span
+
+CHUNK_BYTES = 1 << 16
+PDF_MAGIC = b"%PDF-"
+
+
+def _extract_pages(pdf_path: str, pages_path: str) -> int:
+    """
+    Extract the text of every page of a PDF into a JSON lines file.
+
+    Runs in a worker process. Pages are read from the file on demand and
+    written as soon as they are extracted; the output is renamed into place
+    only once complete.
+
+    Args:
+        pdf_path: PDF file to read
+        pages_path: Output file, one {"page": n, "text": ...} object per line
+
+    Returns:
+        Number of pages
+    """
+    from pypdf import PdfReader
+
+    tmp = f"{pages_path}.{os.getpid()}.tmp"
+    count = 0
+    try:
+        with open(pdf_path, "rb") as pdf, open(tmp, "w", encoding="utf-8") as out:
+            reader = PdfReader(pdf)
+            for number, page in enumerate(reader.pages, start=1):
+                try:
+                    text = page.extract_text() or ""
+                except Exception:
+                    # One unreadable page (broken font, bad content stream) must not lose the paper
+                    text = ""
+                out.write(json.dumps({"page": number, "text": text}) + "\n")
+                count += 1
+        os.replace(tmp, pages_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return count
+
+
+class PDFIngestor:
+    """
+    Concurrent, cached PDF downloader and text extractor.
+
+    Files are stored under their SHA-256 digest, so a PDF reachable from
+    several URLs is stored and extracted once, and a URL that was fetched
+    before is never downloaded again. Downloads stream to a temporary file
+    while being hashed; extraction starts as soon as each download
+    finishes. Instances are thread-safe.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, download_workers: Optional[int] = None,
+                 extract_processes: Optional[int] = None, timeout: float = 60.0,
+                 max_bytes: int = 100 * 1024 * 1024, session: Optional[requests.Session] = None):
+        """
+        Initialize the ingestor.
+
+        Args:
+            cache_dir: Directory of the PDF cache (default: PDF_CACHE_DIR)
+            download_workers: Concurrent downloads (default: PDF_DOWNLOAD_WORKERS or 8)
+            extract_processes: Extraction processes (default: PDF_EXTRACT_PROCESSES or CPU count)
+            timeout: Connect/read timeout of a download in seconds
+            max_bytes: Downloads larger than this are abandoned
+            session: HTTP session to use (default: a pooled session with retries)
+        """
+        self.cache_dir = cache_dir or os.getenv("PDF_CACHE_DIR", "backend/memory/cache/pdfs")
+        self.download_workers = download_workers or int(os.getenv("PDF_DOWNLOAD_WORKERS", "8"))
+        self.extract_processes = extract_processes or int(os.getenv("PDF_EXTRACT_PROCESSES", "0")) \
+            or os.cpu_count() or 1
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # url -> digest of the downloaded file
+        self.urls = DiskCache(os.path.join(self.cache_dir, "urls.sqlite"))
+
+        if session is None:
+            session = requests.Session()
+            retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                          allowed_methods=("GET",))
+            # One pooled keep-alive connection per download worker and host
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.download_workers, max_retries=retry)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = "AI-Research-Assistant/1.0 (PDF ingestion)"
+        self.session = session
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "PDFIngestor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the extraction processes."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def _processes(self, broken: Optional[ProcessPoolExecutor] = None) -> ProcessPoolExecutor:
+        """The extraction pool, replaced by a fresh one if it is the given broken pool."""
+        with self._lock:
+            if broken is not None and self._pool is broken:
+                # A worker died (e.g. pypdf crashed on a malformed file), which breaks the whole pool
+                print("[PDF] Extraction pool broken, starting a new one")
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+            if self._pool is None:
+                # spawn: forking a process that runs download threads and SQLite connections is unsafe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.extract_processes, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _path(self, digest: str, suffix: str) -> str:
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}{suffix}")
+
+    def pdf_path(self, digest: str) -> str:
+        """Cached PDF file of a digest."""
+        return self._path(digest, ".pdf")
+
+    def pages_path(self, digest: str) -> str:
+        """Extracted pages (JSON lines) of a digest."""
+        return self._path(digest, ".pages.jsonl")
+
+    def download(self, url: str) -> Optional[str]:
+        """
+        Download a PDF into the cache (no-op if the URL was fetched before).
+
+        Args:
+            url: PDF URL
+
+        Returns:
+            SHA-256 digest of the PDF, or None if it could not be downloaded
+        """
+        digest = self.urls.get(url)
+        if digest is not None and os.path.exists(self.pdf_path(digest)):
+            return digest
+
+        with span("pdf", "download", url=url) as event:
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+            try:
+                sha = hashlib.sha256()
+                size = 0
+                with os.fdopen(fd, "wb") as f, \
+                        self.session.get(url, stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(CHUNK_BYTES):
+                        if size == 0 and not chunk.startswith(PDF_MAGIC):
+                            raise ValueError("response is not a PDF")
+                        size += len(chunk)
+                        if size > self.max_bytes:
+                            raise ValueError(f"PDF larger than {self.max_bytes} bytes")
+                        sha.update(chunk)
+                        f.write(chunk)
+                digest = sha.hexdigest()
+                event["bytes"] = size
+                path = self.pdf_path(digest)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp, path)
+            except (requests.RequestException, ValueError, OSError) as e:
+                print(f"[PDF] Could not download {url}: {e}")
+                event["error"] = repr(e)
+                return None
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+        self.urls.set(url, digest)
+        return digest
+
+    def _submit_extraction(self, digest: str):
+        """Start extracting a cached PDF in the process pool (None if already extracted)."""
+        if os.path.exists(self.pages_path(digest)):
+            return None
+        pool = self._processes()
+        try:
+            return pool.submit(_extract_pages, self.pdf_path(digest), self.pages_path(digest))
+        except BrokenProcessPool:
+            return self._processes(broken=pool).submit(_extract_pages, self.pdf_path(digest),
+                                                       self.pages_path(digest))
+
+    def _finished(self, digest: str, future, retried: bool) -> Optional[bool]:
+        """
+        Outcome of an extraction: True, False, or None if it should be resubmitted.
+
+        When a worker crashes, every extraction running in the pool fails
+        with BrokenProcessPool; each is retried once in a fresh pool, so
+        only the PDF that crashes again is lost.
+        """
+        try:
+            future.result()
+            return True
+        except BrokenProcessPool as e:
+            if not retried:
+                return None
+            print(f"[PDF] Could not extract text of {digest}: {e}")
+            return False
+        except Exception as e:
+            print(f"[PDF] Could not extract text of {digest}: {e}")
+            return False
+
+    def _resubmit(self, digest: str):
+        """Submit an extraction again after its pool broke (None if that fails too)."""
+        try:
+            return self._submit_extraction(digest)
+        except Exception as e:
+            print(f"[PDF] Could not restart extraction of {digest}: {e}")
+            return None
+
+    def extract(self, digests: Iterable[str]) -> Dict[str, bool]:
+        """
+        Extract the text of cached PDFs in parallel (already extracted ones are skipped).
+
+        Args:
+            digests: Digests of downloaded PDFs
+
+        Returns:
+            Mapping of digest to whether its pages are available
+        """
+        # future -> (digest, whether it is a retry)
+        futures = {}
+        done = {}
+        for digest in set(digests):
+            future = self._submit_extraction(digest)
+            if future is None:
+                done[digest] = True
+            else:
+                futures[future] = (digest, False)
+        while futures:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                digest, retried = futures.pop(future)
+                ok = self._finished(digest, future, retried)
+                retry = self._resubmit(digest) if ok is None else None
+                if retry is not None:
+                    futures[retry] = (digest, True)
+                else:
+                    done[digest] = bool(ok) or os.path.exists(self.pages_path(digest))
+        return done
+
+    def ingest(self, papers: List[Dict]) -> Iterator[Tuple[Dict, Optional[str]]]:
+        """
+        Download and extract the PDFs of papers, yielding each paper once its text is ready.
+
+        Downloads run concurrently in threads; each finished download is
+        handed straight to the extraction processes, so downloading and
+        extraction overlap, and downloads and extractions are waited on
+        together, so a paper is yielded as soon as its own text is ready.
+        Papers are yielded in completion order.
+
+        Args:
+            papers: Paper dictionaries with a pdf_url
+
+        Returns:
+            Iterator of (paper, digest) tuples; digest is None if the PDF
+            could not be downloaded or extracted
+        """
+        with ThreadPoolExecutor(max_workers=max(1, min(self.download_workers, len(papers)))) as threads:
+            downloads = {
+                threads.submit(contextvars.copy_context().run, self.download, paper["pdf_url"]): paper
+                for paper in papers if paper.get("pdf_url")
+            }
+            for paper in papers:
+                if not paper.get("pdf_url"):
+                    yield paper, None
+
+            # digest -> papers waiting for its extraction; identical PDFs are extracted once
+            waiting: Dict[str, List[Dict]] = {}
+            # extraction future -> (digest, whether it is a retry)
+            extractions: Dict[object, Tuple[str, bool]] = {}
+            pending = set(downloads)
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if future in downloads:
+                        paper, digest = downloads.pop(future), future.result()
+                        if digest is None:
+                            yield paper, None
+                            continue
+                        if digest in waiting:
+                            waiting[digest].append(paper)
+                            continue
+                        try:
+                            extraction = self._submit_extraction(digest)
+                        except Exception as e:
+                            print(f"[PDF] Could not start extraction of {digest}: {e}")
+                            yield paper, None
+                            continue
+                        if extraction is None:
+                            yield paper, digest
+                        else:
+                            waiting[digest] = [paper]
+                            extractions[extraction] = (digest, False)
+                            pending.add(extraction)
+                        continue
+
+                    digest, retried = extractions.pop(future)
+                    ok = self._finished(digest, future, retried)
+                    retry = self._resubmit(digest) if ok is None else None
+                    if retry is not None:
+                        extractions[retry] = (digest, True)
+                        pending.add(retry)
+                        continue
+                    ok = ok or os.path.exists(self.pages_path(digest))
+                    for paper in waiting.pop(digest):
+                        yield paper, digest if ok else None
+
+    def pages(self, digest: str) -> Iterator[Dict]:
+        """
+        Stream the extracted pages of a PDF.
+
+        Args:
+            digest: Digest of an extracted PDF
+
+        Returns:
+            Iterator of {"page": n, "text": ...} dictionaries in page order
+        """
+        with open(self.pages_path(digest), encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def full_text(self, digest: str, max_chars: Optional[int] = None) -> str:
+        """
+        Get the text of an extracted PDF.
+
+        Args:
+            digest: Digest of an extracted PDF
+            max_chars: Stop reading pages once this many characters were collected
+
+        Returns:
+            Page texts joined by blank lines
+        """
+        parts, size = [], 0
+        for page in self.pages(digest):
+            parts.append(page["text"])
+            size += len(page["text"])
+            if max_chars is not None and size >= max_chars:
+                break
+        text = "\n\n".join(parts)
+        return text if max_chars is None else text[:max_chars]
+
+    def remove(self, digest: str) -> None:
+        """Delete a PDF and its extracted pages from the cache."""
+        for path in (self.pdf_path(digest), self.pages_path(digest)):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+_ingestor: Optional[PDFIngestor] = None
+_ingestor_lock = threading.Lock()
+
+
+def get_pdf_ingestor() -> PDFIngestor:
+    """Get the process-wide ingestor (configured from the PDF_* environment variables)."""
+    global _ingestor
+    with _ingestor_lock:
+        if _ingestor is None:
+            _ingestor = PDFIngestor()
+        return _ingestor
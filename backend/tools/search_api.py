@@ -1,37 +1,129 @@
+import json
+import os
+import threading
 import arxiv
+import requests
 from typing import List, Dict, Optional
+from backend.memory.disk_cache import DiskCache
+from backend.instrumentation import span
 
-def search_papers(query: str, max_results: int = 5) -> List[Dict[str, any]]:
+SORT_CRITERIA = {
+    "relevance": arxiv.SortCriterion.Relevance,
+    "submitted": arxiv.SortCriterion.SubmittedDate,
+    "updated": arxiv.SortCriterion.LastUpdatedDate,
+}
+
+_client = None
+_cache = None
+_lock = threading.Lock()
+# arxiv.Client spaces its requests by delay_seconds without any locking, so
+# concurrent searches (parallel jobs) would fire requests at the same moment
+_request_lock = threading.Lock()
+
+def configure_search(page_size: Optional[int] = None, delay_seconds: Optional[float] = None,
+                     num_retries: Optional[int] = None, cache_path: Optional[str] = None,
+                     cache_ttl: Optional[float] = None) -> None:
+    """
+    Configure the shared arXiv client and result cache.
+    
+    Unset arguments fall back to the ARXIV_* environment variables.
+    
+    Args:
+        page_size: Results requested per arXiv API page
+        delay_seconds: Politeness delay between arXiv API requests
+        num_retries: Retries for failed arXiv API requests
+        cache_path: SQLite file of the result cache
+        cache_ttl: Lifetime of cached results in seconds (0 disables expiry)
+    """
+    global _client, _cache
+    if cache_ttl is None:
+        cache_ttl = float(os.getenv("ARXIV_CACHE_TTL", "86400"))
+    with _lock:
+        _client = arxiv.Client(
+            page_size=page_size or int(os.getenv("ARXIV_PAGE_SIZE", "50")),
+            delay_seconds=delay_seconds if delay_seconds is not None else float(os.getenv("ARXIV_DELAY_SECONDS", "3.0")),
+            num_retries=num_retries if num_retries is not None else int(os.getenv("ARXIV_NUM_RETRIES", "3"))
+        )
+        _cache = DiskCache(
+            cache_path or os.getenv("ARXIV_CACHE_PATH", "backend/memory/cache/arxiv.sqlite"),
+            max_entries=int(os.getenv("ARXIV_CACHE_MAX_ENTRIES", "5000")),
+            ttl=cache_ttl or None
+        )
+
+def _get_client_and_cache():
+    """Get the shared client and cache, creating them on first use."""
+    if _client is None:
+        configure_search()
+    return _client, _cache
+
+def search_papers(query: str, max_results: int = 5, sort_by: str = "relevance") -> List[Dict[str, any]]:
     """
     Search arXiv for academic papers.
     
+    Results are served from the local cache when the same query and
+    sort_by was searched within the cache TTL with at least max_results
+    results, so smaller overlapping requests never reach arXiv.
+    
     Args:
         query: Search query string
         max_results: Maximum number of results to return (default: 5)
+        sort_by: "relevance", "submitted" or "updated"
     
     Returns:
         List of paper dictionaries containing title, authors, summary, etc.
     """
+    with span("search", "arxiv", max_results=max_results) as event:
+        return _search_papers(query, max_results, sort_by, event)
+
+def _search_papers(query: str, max_results: int, sort_by: str, event: Dict) -> List[Dict[str, any]]:
+    """Cached arXiv search (see search_papers); event is the instrumentation span."""
+    client, cache = _get_client_and_cache()
+    key = json.dumps([query, sort_by])
+    cached = cache.get(key, record=False)
+    # A short result list means arXiv had no more matches, so it also covers larger requests
+    hit = cached is not None and (cached["max_results"] >= max_results
+                                  or len(cached["papers"]) < cached["max_results"])
+    # Only count a hit when the cached papers are served (not when arXiv is queried for more)
+    cache.record(hit)
+    if hit:
+        event["cache_hit"] = True
+        return cached["papers"][:max_results]
+    
     try:
         search = arxiv.Search(
             query=query,
             max_results=max_results,
-            sort_by=arxiv.SortCriterion.Relevance
+            sort_by=SORT_CRITERIA[sort_by]
         )
         
         papers = []
-        for paper in search.results():
-            papers.append({
-                "title": paper.title,
-                "authors": [a.name for a in paper.authors],
-                "summary": paper.summary,
-                "published": paper.published.strftime("%Y-%m-%d") if paper.published else None,
-                "pdf_url": paper.pdf_url,
-                "entry_id": paper.entry_id,
-                "categories": paper.categories,
-                "primary_category": paper.primary_category
-            })
-        return papers
-    except Exception as e:
+        # Results are fetched page by page while iterating, so the whole loop is serialized
+        with _request_lock:
+            for paper in client.results(search):
+                papers.append({
+                    "title": paper.title,
+                    "authors": [a.name for a in paper.authors],
+                    "summary": paper.summary,
+                    "published": paper.published.strftime("%Y-%m-%d") if paper.published else None,
+                    "pdf_url": paper.pdf_url,
+                    "entry_id": paper.entry_id,
+                    "categories": paper.categories,
+                    "primary_category": paper.primary_category
+                })
+    except (arxiv.ArxivError, requests.RequestException) as e:
+        # Failed searches are not cached so the next call retries
         print(f"Error searching arXiv: {e}")
+        event["error"] = repr(e)
         return []
+    
+    cache.set(key, {"max_results": max_results, "papers": papers})
+    return papers
+
+def get_search_cache_stats() -> Dict:
+    """
+    Get hit/miss statistics of the arXiv result cache.
+    
+    Returns:
+        Cache statistics
+    """
+    return _get_client_and_cache()[1].stats()
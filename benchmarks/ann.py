@@ -0,0 +1,145 @@
+"""
+Recall-vs-latency benchmark of the vector index types.
+
+Builds flat, HNSW and IVF indexes (backend.memory.ann_index) over the same
+vectors, uses exact flat search as ground truth and reports build time,
+recall@k, per-query p50/p95 latency and throughput for each search setting
+(efSearch for HNSW, nprobe for IVF).
+
+Vectors are synthetic (clustered Gaussian, unit-normalized like OpenAI
+embeddings) unless --index-path points at a saved vector store, in which
+case its vectors are used and queries are drawn from them.
+
+Usage:
+    python -m benchmarks.ann --vectors 100000 --dim 384
+    python -m benchmarks.ann --vectors 1000000 --ef-search 32 64 128 --nprobe 8 32 128
+    python -m benchmarks.ann --index-path backend/memory/faiss_index --output ann.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.memory.ann_index import ANNIndex, all_vectors, build_index
+from benchmarks.run import percentile
+
+
+def synthetic_vectors(count: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Unit vectors drawn around random cluster centres (topic-like structure)."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, size=count)] + 0.5 * rng.normal(size=(count, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def stored_vectors(index_path: str) -> np.ndarray:
+    """Vectors of a saved vector store (base snapshot plus segments)."""
+    from benchmarks.fakes import FakeEmbeddings
+    from backend.memory.docstore import SQLiteDocstore
+    from backend.memory.index_files import IndexDirectory
+    from backend.memory.vector_store import VectorStoreFAISS
+
+    # The fake embedder stands in for whichever embedder built the index
+    manifest = SQLiteDocstore(IndexDirectory(index_path).docstore_path, key_func=lambda metadata: None).read_manifest()
+    embedder = (manifest or {}).get("embedder", {})
+    store = VectorStoreFAISS(
+        index_path=index_path, embeddings=FakeEmbeddings(), merge_after=None,
+        embedding_backend=embedder.get("backend"), embedding_model=embedder.get("model"),
+        embedding_options={"quantize": embedder.get("quantized", False)}
+    )
+    if store.vector_store is None:
+        raise SystemExit(f"No vectors stored at {index_path}")
+    return all_vectors(store.vector_store.index)
+
+
+def measure(index, queries: np.ndarray, truth: np.ndarray, k: int) -> Dict:
+    """Recall@k and per-query latency of index on queries."""
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        _, found = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - started)
+        hits += len(set(found[0].tolist()) & set(expected.tolist()))
+    return {
+        "recall": hits / (len(queries) * k),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "qps": len(queries) / sum(latencies)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs latency of flat, HNSW and IVF indexes")
+    parser.add_argument("--vectors", type=int, default=100000, help="Synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=384, help="Synthetic vector dimension")
+    parser.add_argument("--clusters", type=int, default=256, help="Synthetic topic clusters")
+    parser.add_argument("--index-path", help="Benchmark the vectors of a saved vector store instead")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128, 256])
+    parser.add_argument("--nlist", type=int, default=None, help="IVF cells (default 4 * sqrt(n))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--types", nargs="+", default=["hnsw", "ivf"], choices=["hnsw", "ivf"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.index_path:
+        vectors = stored_vectors(args.index_path)
+        rng = np.random.default_rng(args.seed)
+        queries = vectors[rng.integers(0, len(vectors), size=args.queries)]
+        queries = queries + 0.01 * rng.normal(size=queries.shape).astype(np.float32)
+    else:
+        vectors = synthetic_vectors(args.vectors + args.queries, args.dim, args.clusters, args.seed)
+        vectors, queries = vectors[:args.vectors], vectors[args.vectors:]
+    k = min(args.k, len(vectors))
+    print(f"{len(vectors)} vectors of dimension {vectors.shape[1]}, {len(queries)} queries, k={k}")
+
+    results: List[Dict] = []
+
+    def report(name, build_s, stats):
+        results.append({"index": name, "build_s": build_s, **stats})
+        print(f"{name:<24} build {build_s:7.2f}s  recall@{k} {stats['recall']:.3f}  "
+              f"p50 {stats['p50_ms']:.3f} ms  p95 {stats['p95_ms']:.3f} ms  {stats['qps']:.0f} q/s")
+
+    started = time.perf_counter()
+    flat = build_index("flat", vectors)
+    flat_build = time.perf_counter() - started
+    _, truth = flat.search(queries, k)
+    report("flat", flat_build, measure(flat, queries, truth, k))
+
+    params = {"hnsw_m": args.hnsw_m, "ef_construction": args.ef_construction, "nlist": args.nlist}
+    for kind in args.types:
+        started = time.perf_counter()
+        index = build_index(kind, vectors, params)
+        build_s = time.perf_counter() - started
+        if not isinstance(index, ANNIndex):
+            print(f"{kind:<24} skipped: too few vectors to train")
+            continue
+        if kind == "hnsw":
+            for ef_search in args.ef_search:
+                index.ef_search = ef_search
+                report(f"hnsw M={args.hnsw_m} ef={ef_search}", build_s, measure(index, queries, truth, k))
+        else:
+            for nprobe in args.nprobe:
+                index.nprobe = nprobe
+                report(f"ivf nlist={index.index.nlist} nprobe={nprobe}", build_s,
+                       measure(index, queries, truth, k))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
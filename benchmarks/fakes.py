@@ -0,0 +1,254 @@
+"""
+Deterministic offline stand-ins for OpenAI chat models, OpenAI embeddings,
+the arXiv API and arXiv's PDF server, used by the benchmark suite.
+"""
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "arxiv_corpus.json")
+
+WORDS = (
+    "model training data learning network attention transformer graph quantum "
+    "algorithm benchmark robust efficient sparse optimization inference latent "
+    "representation evaluation dataset policy reward language vision retrieval"
+).split()
+
+
+def _seed(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model returning deterministic text after a configurable latency."""
+
+    model_name: str = "gpt-4o-mini"
+    latency: float = 0.0
+    output_tokens: int = 200
+    chunk_tokens: int = 8
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    def _text(self, prompt: str) -> str:
+        rng = random.Random(_seed(prompt))
+        return " ".join(rng.choice(WORDS) for _ in range(self.output_tokens))
+
+    def _usage(self, prompt: str) -> Dict[str, int]:
+        input_tokens = len(prompt) // 4
+        return {"input_tokens": input_tokens, "output_tokens": self.output_tokens,
+                "total_tokens": input_tokens + self.output_tokens}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        prompt = messages[-1].content
+        time.sleep(self.latency)
+        message = AIMessage(content=self._text(prompt), usage_metadata=self._usage(prompt))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = messages[-1].content
+        words = self._text(prompt).split(" ")
+        chunks = max(1, math.ceil(len(words) / self.chunk_tokens))
+        for start in range(0, len(words), self.chunk_tokens):
+            time.sleep(self.latency / chunks)
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content=" ".join(words[start:start + self.chunk_tokens]) + " "
+            ))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(prompt)))
+
+
+class FakeEmbeddings(Embeddings):
+    """Hash-based unit vectors; identical text always maps to the same vector."""
+
+    def __init__(self, dimensions: int = 256, latency: float = 0.0):
+        self.dimensions = dimensions
+        self.latency = latency
+        self.requests = 0
+
+    def _vector(self, text: str) -> List[float]:
+        rng = random.Random(_seed(text))
+        vector = [rng.gauss(0.0, 1.0) for _ in range(self.dimensions)]
+        norm = math.sqrt(sum(value * value for value in vector))
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.requests += 1
+        time.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def load_corpus(size: int, path: str = CORPUS_PATH) -> List[Dict]:
+    """
+    Load the recorded arXiv corpus, padded with synthetic papers to size.
+
+    Args:
+        size: Number of papers needed
+        path: Recorded corpus (see record_corpus)
+
+    Returns:
+        List of paper dictionaries in the search_api format
+    """
+    papers = []
+    if os.path.exists(path):
+        with open(path) as f:
+            papers = json.load(f)[:size]
+    for i in range(len(papers), size):
+        rng = random.Random(i)
+        topic = " ".join(rng.choice(WORDS) for _ in range(3))
+        papers.append({
+            "title": f"Synthetic paper {i}: {topic}",
+            "authors": [f"Author {rng.randint(1, 500)}" for _ in range(rng.randint(1, 5))],
+            "summary": " ".join(rng.choice(WORDS) for _ in range(180)),
+            "published": f"{2015 + i % 10}-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            "pdf_url": f"http://arxiv.org/pdf/synthetic.{i:05d}",
+            "entry_id": f"http://arxiv.org/abs/synthetic.{i:05d}",
+            "categories": [rng.choice(["cs.AI", "cs.LG", "cs.CL", "cs.CV", "quant-ph"])],
+            "primary_category": "cs.AI"
+        })
+    return papers
+
+
+class FakeArxiv:
+    """search_papers stand-in serving papers from a corpus."""
+
+    def __init__(self, corpus: List[Dict], latency: float = 0.0):
+        self.corpus = corpus
+        self.latency = latency
+
+    def search_papers(self, query: str, max_results: int = 5, sort_by: str = "relevance") -> List[Dict]:
+        time.sleep(self.latency)
+        return [dict(paper) for paper in self.corpus[:max_results]]
+
+
+def record_corpus(queries: List[str], max_results: int = 50, path: str = CORPUS_PATH) -> int:
+    """
+    Record live arXiv results for offline benchmarking.
+
+    Args:
+        queries: Queries to search
+        max_results: Results per query
+        path: Output file
+
+    Returns:
+        Number of unique papers recorded
+    """
+    from backend.tools.search_api import search_papers
+
+    papers = {}
+    for query in queries:
+        for paper in search_papers(query, max_results=max_results):
+            papers.setdefault(paper["entry_id"], paper)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(list(papers.values()), f, indent=1)
+    return len(papers)
+
+
+def _pdf_string(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: List[List[str]]) -> None:
+    """
+    Write a minimal PDF with one text line per entry of each page.
+
+    Args:
+        path: Output file
+        pages: Lines of text of every page
+    """
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        text = " T* ".join(f"({_pdf_string(line)}) Tj" for line in lines)
+        stream = f"BT /F1 10 Tf 12 TL 50 750 Td {text} ET"
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    data = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    data += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+PAPER_SECTIONS = ("Abstract", "1 Introduction", "2 Related Work", "3 Method", "4 Experiments",
+                  "5 Results", "6 Conclusion", "References")
+
+
+def write_paper_pdfs(directory: str, papers: List[Dict], pages: int = 8, lines_per_page: int = 40) -> None:
+    """
+    Write a synthetic PDF per paper, named after the last part of its pdf_url.
+
+    The text of each paper is deterministic, starts with its title and is
+    divided into the usual sections, spread evenly over the pages.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for paper in papers:
+        rng = random.Random(_seed(paper["pdf_url"]))
+        content = []
+        heading = None
+        for page in range(pages):
+            lines = [paper["title"]] if page == 0 else []
+            section = PAPER_SECTIONS[page * len(PAPER_SECTIONS) // pages]
+            if section != heading:
+                lines.append(section)
+                heading = section
+            lines += [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(lines_per_page)]
+            content.append(lines)
+        write_pdf(os.path.join(directory, paper["pdf_url"].rstrip("/").rsplit("/", 1)[-1]), content)
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    # HTTP/1.1 keeps connections alive so pooled clients reuse them
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_directory(directory: str, latency: float = 0.0):
+    """
+    Serve a directory over HTTP on localhost (arXiv PDF server stand-in).
+
+    Args:
+        directory: Directory whose files are served
+        latency: Seconds added to every request
+
+    Returns:
+        (server, base URL); call server.shutdown() when done
+    """
+    handler = type("Handler", (_QuietHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", 0),
+                                 lambda *args, **kwargs: handler(*args, directory=directory, **kwargs))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
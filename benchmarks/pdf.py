@@ -0,0 +1,82 @@
+"""
+PDF ingestion benchmark.
+
+Writes synthetic paper PDFs (benchmarks/fakes.write_paper_pdfs), serves
+them from a local HTTP stand-in for arXiv with a configurable per-request
+latency and ingests them with backend.tools.pdf_utils.PDFIngestor: once
+into an empty cache (download + extraction) and once more from the warm
+cache. Reports wall time, papers per second and extracted pages.
+
+Usage:
+    python -m benchmarks.pdf --papers 200 --pages 12
+    python -m benchmarks.pdf --papers 100 --latency 0.2 --download-workers 16 --processes 1 4
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.tools.pdf_utils import PDFIngestor
+from benchmarks.fakes import load_corpus, serve_directory, write_paper_pdfs
+
+
+def run_ingestion(ingestor: PDFIngestor, papers: List[Dict]) -> Dict:
+    """Ingest papers and count the extracted pages."""
+    started = time.perf_counter()
+    ingested = failed = pages = 0
+    for _, digest in ingestor.ingest(papers):
+        if digest is None:
+            failed += 1
+            continue
+        ingested += 1
+        pages += sum(1 for _ in ingestor.pages(digest))
+    wall = time.perf_counter() - started
+    return {"wall_s": wall, "papers_per_s": len(papers) / wall, "ingested": ingested,
+            "failed": failed, "pages": pages}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download + extraction benchmark of the PDF ingestion")
+    parser.add_argument("--papers", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=8, help="Pages per synthetic PDF")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every HTTP request")
+    parser.add_argument("--download-workers", type=int, default=8)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, os.cpu_count() or 1],
+                        help="Extraction process counts to compare")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = os.path.join(tmp, "pdfs")
+        papers = load_corpus(args.papers)
+        write_paper_pdfs(fixtures, papers, pages=args.pages)
+        server, base_url = serve_directory(fixtures, latency=args.latency)
+        local = [{**paper, "pdf_url": f"{base_url}/{paper['pdf_url'].rstrip('/').rsplit('/', 1)[-1]}"}
+                 for paper in papers]
+        try:
+            for processes in sorted(set(args.processes)):
+                cache_dir = os.path.join(tmp, f"cache-{processes}")
+                with PDFIngestor(cache_dir=cache_dir, download_workers=args.download_workers,
+                                 extract_processes=processes) as ingestor:
+                    for phase in ("cold", "warm"):
+                        result = {"processes": processes, "phase": phase, **run_ingestion(ingestor, local)}
+                        results.append(result)
+                        print(f"{processes:>2} processes  {phase:<5} {result['wall_s']:7.2f}s  "
+                              f"{result['papers_per_s']:7.1f} papers/s  {result['pages']} pages  "
+                              f"{result['failed']} failed")
+        finally:
+            server.shutdown()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Offline pipeline benchmark.
+
+Runs the real create_pipeline graph against deterministic stand-ins for the
+OpenAI chat models, OpenAI embeddings and arXiv, and reports throughput,
+p50/p95 latency per stage and call type, and peak memory.
+
+Usage:
+    python -m benchmarks.run --sizes 10 100 1000
+    python -m benchmarks.run --baseline-ref main
+    python -m benchmarks.run --save-baseline /tmp/baseline.json   # then --compare it on the same host
+    python -m benchmarks.run --record-corpus "transformers" "quantum computing"
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Never reach OpenAI or the on-disk response cache from a benchmark
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ["LLM_CACHE"] = "0"
+
+from benchmarks.fakes import FakeArxiv, FakeChatModel, FakeEmbeddings, load_corpus, record_corpus
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(q / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def install_fakes(args) -> FakeArxiv:
+    """Point the LLM client and search agent at the offline stand-ins."""
+    import backend.llm_client as llm_client
+    import backend.agents.search_agent as search_agent
+
+    llm_client.llm_mini = FakeChatModel(
+        model_name="gpt-4o-mini", latency=args.llm_latency, output_tokens=args.output_tokens
+    )
+    llm_client.llm_standard = FakeChatModel(
+        model_name="gpt-4o", latency=args.report_latency, output_tokens=args.output_tokens * 4
+    )
+    arxiv = FakeArxiv(load_corpus(max(args.sizes)), latency=args.search_latency)
+    search_agent.search_papers = arxiv.search_papers
+    return arxiv
+
+
+def run_once(size: int, args, trace_memory: bool = False) -> Dict:
+    """Run the pipeline once on a fresh vector store and collect its metrics."""
+    from backend.graph.pipeline_graph import create_pipeline
+    from backend.memory.vector_store import VectorStoreFAISS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vector_store = VectorStoreFAISS(
+            index_path=os.path.join(tmp, "index"),
+            embedding_cache_path=os.path.join(tmp, "embeddings.sqlite"),
+            embeddings=FakeEmbeddings(latency=args.embedding_latency)
+        )
+        pipeline = create_pipeline(
+            vector_store,
+            max_workers=args.workers,
+            streaming=args.streaming,
+            fused=args.fused,
+            max_results=size
+        )
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        result = pipeline.invoke({
+            "query": "benchmark query",
+            "papers": [],
+            "extractions": [],
+            "analyses": [],
+            "final_report": ""
+        })
+        wall = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+        if trace_memory:
+            tracemalloc.stop()
+
+    return {"wall_s": wall, "peak_bytes": peak, "papers": len(result["analyses"]),
+            "run_report": result["run_report"]}
+
+
+def benchmark_size(size: int, args) -> Dict:
+    """Benchmark one paper count: a warm-up run, timed repeats and one memory-traced run."""
+    # First-use costs (imports, lazy clients, FAISS) would otherwise land in the first timed run
+    run_once(size, args)
+    runs = [run_once(size, args) for _ in range(args.repeat)]
+    memory_run = run_once(size, args, trace_memory=True)
+
+    walls = [run["wall_s"] for run in runs]
+    stages = {}
+    calls = {}
+    for run in runs:
+        for node, seconds in run["run_report"]["nodes"].items():
+            stages.setdefault(node, []).append(seconds)
+        for event in run["run_report"]["events"]:
+            if event["kind"] != "node":
+                calls.setdefault(f"{event['kind']}:{event['name']}", []).append(event["duration_s"])
+
+    def summary(values):
+        return {"p50_s": percentile(values, 50), "p95_s": percentile(values, 95)}
+
+    return {
+        "papers": size,
+        # Fastest run: scheduling noise only ever slows a run down
+        "throughput_papers_per_s": size / min(walls),
+        "wall": summary(walls),
+        "stages": {node: summary(values) for node, values in stages.items()},
+        "calls": {name: {**summary(values), "count": len(values) // len(runs)}
+                  for name, values in calls.items()},
+        "peak_memory_mb": memory_run["peak_bytes"] / 1e6
+    }
+
+
+def print_results(results: Dict[str, Dict]) -> None:
+    """Print a human readable summary."""
+    for size, result in results.items():
+        print(f"\n{size} papers: {result['throughput_papers_per_s']:.1f} papers/s, "
+              f"wall p50 {result['wall']['p50_s']:.3f}s p95 {result['wall']['p95_s']:.3f}s, "
+              f"peak {result['peak_memory_mb']:.1f} MB")
+        for node, stats in result["stages"].items():
+            print(f"  stage {node:<10} p50 {stats['p50_s']:.4f}s  p95 {stats['p95_s']:.4f}s")
+        for name, stats in result["calls"].items():
+            print(f"  call  {name:<35} x{stats['count']:<5} p50 {stats['p50_s']:.4f}s  p95 {stats['p95_s']:.4f}s")
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """
+    Compare results with a stored baseline.
+
+    Returns:
+        Human readable regressions (empty if none)
+    """
+    regressions = []
+    for size, result in results.items():
+        base = baseline.get(size)
+        if base is None:
+            continue
+        if result["throughput_papers_per_s"] < base["throughput_papers_per_s"] * (1 - tolerance):
+            regressions.append(f"{size} papers: throughput {result['throughput_papers_per_s']:.1f} "
+                               f"< baseline {base['throughput_papers_per_s']:.1f} papers/s")
+        if result["wall"]["p95_s"] > base["wall"]["p95_s"] * (1 + tolerance):
+            regressions.append(f"{size} papers: wall p95 {result['wall']['p95_s']:.3f}s "
+                               f"> baseline {base['wall']['p95_s']:.3f}s")
+        if result["peak_memory_mb"] > base["peak_memory_mb"] * (1 + tolerance):
+            regressions.append(f"{size} papers: peak memory {result['peak_memory_mb']:.1f} MB "
+                               f"> baseline {base['peak_memory_mb']:.1f} MB")
+    return regressions
+
+
+def benchmark_argv(args) -> List[str]:
+    """Command line options that define the benchmark workload."""
+    argv = ["--sizes", *map(str, args.sizes), "--repeat", str(args.repeat), "--workers", str(args.workers),
+            "--llm-latency", str(args.llm_latency), "--report-latency", str(args.report_latency),
+            "--embedding-latency", str(args.embedding_latency), "--search-latency", str(args.search_latency),
+            "--output-tokens", str(args.output_tokens)]
+    return argv + (["--streaming"] if args.streaming else []) + (["--fused"] if args.fused else [])
+
+
+def run_baseline(ref: str, args) -> Dict[str, Dict]:
+    """
+    Run the same workload at another git revision on this host.
+
+    Absolute timings only mean something on the machine that produced
+    them, so the baseline is measured next to the current tree instead of
+    being read from a committed file. The revision is checked out in a
+    temporary git worktree.
+
+    Args:
+        ref: Git revision to benchmark (e.g. "main" or a commit hash)
+        args: Parsed arguments of this run
+
+    Returns:
+        Results of the revision, keyed by size like benchmark_size's
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        worktree = os.path.join(tmp, "baseline")
+        output = os.path.join(tmp, "baseline.json")
+        subprocess.run(["git", "-C", ROOT, "worktree", "add", "--detach", "--quiet", worktree, ref], check=True)
+        try:
+            print(f"Benchmarking baseline {ref}...")
+            subprocess.run([sys.executable, "-m", "benchmarks.run", *benchmark_argv(args), "--output", output],
+                           cwd=worktree, check=True, stdout=subprocess.DEVNULL)
+            with open(output) as f:
+                return json.load(f)
+        finally:
+            subprocess.run(["git", "-C", ROOT, "worktree", "remove", "--force", worktree], check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline research pipeline benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per size")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument("--fused", action="store_true")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds per mini call")
+    parser.add_argument("--report-latency", type=float, default=0.0, help="Seconds per report call")
+    parser.add_argument("--embedding-latency", type=float, default=0.0, help="Seconds per embedding request")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="Seconds per arXiv search")
+    parser.add_argument("--output-tokens", type=int, default=200, help="Tokens per mini response")
+    parser.add_argument("--compare", help="Baseline JSON to compare against (saved on this host)")
+    parser.add_argument("--baseline-ref", help="Git revision benchmarked on this host as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    parser.add_argument("--save-baseline", help="Write results to this baseline JSON")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--record-corpus", nargs="+", metavar="QUERY",
+                        help="Record live arXiv results for these queries and exit")
+    args = parser.parse_args()
+
+    if args.record_corpus:
+        print(f"Recorded {record_corpus(args.record_corpus)} papers")
+        return
+
+    baseline = None
+    if args.baseline_ref:
+        baseline = run_baseline(args.baseline_ref, args)
+    elif args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    install_fakes(args)
+    results = {}
+    for size in args.sizes:
+        print(f"Benchmarking {size} papers...")
+        results[str(size)] = benchmark_size(size, args)
+    print_results(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print("\nNo regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Startup-time benchmark.
+
+Imports each backend module in a fresh interpreter with ``-X importtime``
+and reports its cumulative import cost, plus the heaviest dependencies it
+pulls in. Each measurement is the median of several runs.
+
+Usage:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --modules backend.llm_client --top 10
+    python -m benchmarks.startup --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = [
+    "backend.instrumentation",
+    "backend.llm_client",
+    "backend.memory.vector_store",
+    "backend.tools.search_api",
+    "backend.graph.pipeline_graph",
+    "backend.shared",
+    "backend.main",
+]
+
+
+def import_times(module: str) -> Dict[str, Dict[str, float]]:
+    """
+    Import a module in a fresh interpreter and parse its -X importtime log.
+
+    Args:
+        module: Dotted module name
+
+    Returns:
+        Mapping of every imported module to its self and cumulative seconds
+    """
+    env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "sk-startup")}
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{completed.stderr[-2000:]}")
+
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = {"self_s": int(self_us) / 1e6, "cumulative_s": int(cumulative_us) / 1e6}
+    return times
+
+
+def measure(module: str, repeat: int, top: int) -> Dict:
+    """Median cumulative import time of a module and its heaviest top-level dependencies."""
+    runs = [import_times(module) for _ in range(repeat)]
+    total = statistics.median(run[module]["cumulative_s"] for run in runs)
+
+    # Self time summed per top-level package, other than the module's own package
+    own = module.split(".")[0]
+    packages = {}
+    for name, stats in runs[-1].items():
+        package = name.split(".")[0]
+        if package != own:
+            packages[package] = packages.get(package, 0.0) + stats["self_s"]
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {"module": module, "import_s": total, "dependencies": dict(heaviest)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time benchmark of the backend modules")
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument("--top", type=int, default=5, help="Heaviest dependencies shown per module")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results: List[Dict] = []
+    for module in args.modules:
+        result = measure(module, args.repeat, args.top)
+        results.append(result)
+        print(f"{module:<32} {result['import_s'] * 1000:8.1f} ms")
+        for package, seconds in result["dependencies"].items():
+            print(f"    {package:<28} {seconds * 1000:8.1f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Test metadata filters over analyses stored by the pipeline (offline)"""
+import os
+import sys
+import tempfile
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+# Never reach OpenAI or the on-disk response cache
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ["LLM_CACHE"] = "0"
+
+import backend.agents.search_agent as search_agent
+import backend.llm_client as llm_client
+from backend.graph.pipeline_graph import create_pipeline
+from backend.memory.vector_store import VectorStoreFAISS
+from benchmarks.fakes import FakeArxiv, FakeChatModel, FakeEmbeddings, load_corpus
+
+PAPERS = 12
+
+def _run_pipeline(tmp, **options):
+    """Run the pipeline on fake papers and return (vector store, papers)"""
+    llm_client.llm_mini = FakeChatModel(model_name="gpt-4o-mini")
+    llm_client.llm_standard = FakeChatModel(model_name="gpt-4o")
+    papers = load_corpus(PAPERS, path=os.path.join(tmp, "no-corpus.json"))
+    search_agent.search_papers = FakeArxiv(papers).search_papers
+
+    vector_store = VectorStoreFAISS(
+        index_path=os.path.join(tmp, "index"),
+        embedding_cache_path=os.path.join(tmp, "embeddings.sqlite"),
+        embeddings=FakeEmbeddings()
+    )
+    pipeline = create_pipeline(vector_store, max_results=PAPERS, **options)
+    pipeline.invoke({
+        "query": "filter test",
+        "papers": [],
+        "extractions": [],
+        "analyses": [],
+        "final_report": ""
+    })
+    return vector_store, papers
+
+def test_category_filter():
+    """Analyses stored by every pipeline mode can be filtered by arXiv category"""
+    for options in ({}, {"streaming": True}, {"fused": True}):
+        with tempfile.TemporaryDirectory() as tmp:
+            vector_store, papers = _run_pipeline(tmp, **options)
+            for category in {paper["categories"][0] for paper in papers}:
+                expected = {paper["entry_id"] for paper in papers if category in paper["categories"]}
+                results = vector_store.similarity_search("filter test", k=PAPERS, filters={"category": category})
+                assert {result["paper_id"] for result in results} == expected, (options, category)
+                assert all(category in result["categories"] for result in results)
+        print(f"✓ Category filter over pipeline analyses {options or '(default)'}")
+
+if __name__ == "__main__":
+    test_category_filter()
@@ -0,0 +1,89 @@
+"""Test PDF ingestion offline against local fixture PDFs"""
+import os
+import sys
+import tempfile
+from concurrent.futures.process import BrokenProcessPool
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from backend.tools.pdf_utils import PDFIngestor
+from benchmarks.fakes import serve_directory, write_pdf
+
+PAGES = [["Attention is all you need", "We propose a new architecture."], ["Results improve on baselines."]]
+
+def _fixtures(directory):
+    """Write the fixture files and serve them; returns (server, base URL)."""
+    write_pdf(os.path.join(directory, "paper.pdf"), PAGES)
+    write_pdf(os.path.join(directory, "mirror.pdf"), PAGES)
+    with open(os.path.join(directory, "page.html"), "w") as f:
+        f.write("<html>Not a PDF</html>")
+    with open(os.path.join(directory, "corrupt.pdf"), "wb") as f:
+        f.write(b"%PDF-1.4\n" + b"\x00garbage" * 200)
+    return serve_directory(directory)
+
+def _leftovers(cache_dir):
+    return [name for _, _, files in os.walk(cache_dir) for name in files
+            if name.endswith((".part", ".tmp"))]
+
+def test_pdf_ingestion():
+    """Download, extraction and the failure paths of PDFIngestor"""
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = os.path.join(tmp, "fixtures")
+        os.makedirs(fixtures)
+        server, base_url = _fixtures(fixtures)
+        try:
+            with PDFIngestor(cache_dir=os.path.join(tmp, "cache"), extract_processes=1) as ingestor:
+                papers = [{"title": name, "pdf_url": f"{base_url}/{name}"}
+                          for name in ("paper.pdf", "mirror.pdf", "page.html", "corrupt.pdf", "missing.pdf")]
+                papers.append({"title": "no url", "pdf_url": ""})
+                results = {paper["title"]: digest for paper, digest in ingestor.ingest(papers)}
+
+                # Every paper is yielded exactly once
+                assert set(results) == {paper["title"] for paper in papers}
+                # Identical files share one digest and one extraction
+                assert results["paper.pdf"] is not None
+                assert results["paper.pdf"] == results["mirror.pdf"]
+                text = ingestor.full_text(results["paper.pdf"])
+                assert "Attention is all you need" in text and "baselines" in text
+                assert [page["page"] for page in ingestor.pages(results["paper.pdf"])] == [1, 2]
+                # Non-PDF responses, corrupt PDFs, 404s and missing URLs fail without raising
+                for title in ("page.html", "corrupt.pdf", "missing.pdf", "no url"):
+                    assert results[title] is None, title
+                assert not _leftovers(ingestor.cache_dir)
+
+                # A cached URL is not downloaded again
+                assert ingestor.download(f"{base_url}/paper.pdf") == results["paper.pdf"]
+
+            with PDFIngestor(cache_dir=os.path.join(tmp, "small"), max_bytes=100) as ingestor:
+                # Downloads larger than max_bytes are abandoned
+                assert ingestor.download(f"{base_url}/paper.pdf") is None
+                assert not _leftovers(ingestor.cache_dir)
+        finally:
+            server.shutdown()
+    print("✓ PDF ingestion paths")
+
+def test_broken_pool_recovery():
+    """A crashed extraction worker does not disable extraction for good"""
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = os.path.join(tmp, "fixtures")
+        os.makedirs(fixtures)
+        server, base_url = _fixtures(fixtures)
+        try:
+            with PDFIngestor(cache_dir=os.path.join(tmp, "cache"), extract_processes=1) as ingestor:
+                # Kill the worker process, which breaks the pool
+                crash = ingestor._processes().submit(os._exit, 1)
+                try:
+                    crash.result()
+                    assert False, "worker should have died"
+                except BrokenProcessPool:
+                    pass
+                digest = ingestor.download(f"{base_url}/paper.pdf")
+                assert ingestor.extract([digest]) == {digest: True}
+        finally:
+            server.shutdown()
+    print("✓ Broken extraction pool replaced")
+
+if __name__ == "__main__":
+    test_pdf_ingestion()
+    test_broken_pool_recovery()